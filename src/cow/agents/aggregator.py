@@ -1,17 +1,87 @@
-import json
 import os
+import time
+from collections import deque
 from copy import copy
 
 from spade.agent import Agent
-from spade.behaviour import CyclicBehaviour, OneShotBehaviour
+from spade.behaviour import CyclicBehaviour, OneShotBehaviour, PeriodicBehaviour
 from spade.message import Message
+from spade.template import Template
+
+from agents.codec import decode_body, encode_body
+from agents.outbox import Outbox
+from agents.rules import HISTORY_DEPTH, default_rules
+from agents.shard_ring import analyzer_jid
+from agents.spool import Spool, backfill_messages
+from agents.summary import WindowSummarizer, combine_summaries, reading_summary
+
+CHANNELS = ('temperature', 'pH', 'activity', 'pulse')
+BACKFILL_CHUNK = int(os.getenv("BACKFILL_CHUNK", "500"))
+OUTBOX_SIZE = int(os.getenv("OUTBOX_SIZE", "64"))
+# EDGE_RULES=True: reguły analizatora liczone na miejscu, do analizatora od razu idą tylko eskalacje,
+# a zwykłe profile wolniejszą ścieżką podsumowań
+EDGE_RULES = os.getenv("EDGE_RULES", "False") == "True"
+# z ostatnimi znanymi wartościami każdy istotny odczyt dawałby osobny profil - wysyłamy najwyżej jeden na takt czujników
+PROFILE_PERIOD = float(os.getenv("PROFILE_PERIOD", "1"))
+# SUMMARY_WINDOW > 0: zamiast profilu co odczyt jedno podsumowanie na okno (w sekundach)
+SUMMARY_WINDOW = float(os.getenv("SUMMARY_WINDOW", "30" if EDGE_RULES else "0"))
+WATCH_DURATION = 120
+# reguła, która dalej działa, eskaluje ponownie po ESCALATION_RETRY sekundach - efektor mógł odmówić albo zawieść,
+# a powtórkę polecenia, które jeszcze trwa, analizator i tak odrzuci
+ESCALATION_RETRY = float(os.getenv("ESCALATION_RETRY", "60"))
+# te same progi, od których reagują reguły analizatora
+ALERT_THRESHOLDS = {"temperature": (None, 39.0), "pH": (6.0, None), "pulse": (None, 90)}
+
+
+def no_messages():
+    # SPADE kopiuje każdą wiadomość do skrzynki każdego pasującego zachowania, a zachowanie bez szablonu
+    # pasuje do wszystkiego - te, które nic nie odbierają, dostają szablon, którego nikt nie wysyła
+    template = Template()
+    template.set_metadata("mailbox", "none")
+    return template
 
 
 class Aggregator(Agent):
     def __init__(self):
         self.cow_name = os.getenv("NAME")
         super().__init__(f"aggregator-{self.cow_name}@xmpp_server", os.getenv("PASSWORD"))
+        self.analyzer_jid = analyzer_jid(self.cow_name)
         self.data = {}
+        self.sources = {}
+        spool_dir = os.getenv("SPOOL_DIR")
+        self.spool = Spool(
+            capacity=int(os.getenv("SPOOL_SIZE", "3600")),
+            overflow_path=os.path.join(spool_dir, f"{self.cow_name}.spool") if spool_dir else None,
+            overflow_capacity=int(os.getenv("SPOOL_DISK_SIZE", "86400"))
+        )
+        # None - brak informacji o obecności analizatora, wysyłamy normalnie
+        self.analyzer_available = None
+        self.replaying = False
+        self.sensors = []
+        # z deadbandem lub adaptacyjnym próbkowaniem czujniki nie raportują co takt -
+        # profil budujemy z ostatnich znanych wartości
+        self.keep_last_known = (
+            os.getenv("DEADBAND", "False") == "True"
+            or os.getenv("ADAPTIVE_SAMPLING", "False") == "True"
+        )
+        self.profile_metadata = {}
+        self.outbox = Outbox(OUTBOX_SIZE)
+        # przy regułach na brzegu przekroczenia progów obsługują eskalacje, a nie podsumowania
+        thresholds = {} if EDGE_RULES else ALERT_THRESHOLDS
+        self.summarizer = WindowSummarizer(SUMMARY_WINDOW, thresholds) if SUMMARY_WINDOW > 0 else None
+        # bez okna podsumowań zbiera odczyty nadpisane przed wysłaniem profilu (np. z jednej paczki)
+        self.profile_summarizer = WindowSummarizer(0, {})
+        # 0 - profil od razu po odczycie; tryb podsumowań ma własne okno
+        self.profile_period = PROFILE_PERIOD if self.keep_last_known and self.summarizer is None else 0
+        self.profile_pending = False
+        self.alert_crossed = False
+        self.rules = []
+        if EDGE_RULES:
+            self.rules = default_rules()
+            self.rule_history = deque(maxlen=HISTORY_DEPTH)
+            # nazwa działającej reguły -> czas ostatniej eskalacji
+            self.firing = {}
+            self.profile_metadata["edge-rules"] = "True"
 
     class AggregateData(CyclicBehaviour):
         def __init__(self, data_aggregator):
@@ -22,37 +92,222 @@ class Aggregator(Agent):
             message = await self.receive(timeout=3)
 
             if message:
-                data = json.loads(message.body)
+                data = decode_body(message)
                 self.data_aggregator(data)
             else:
                 print("Did not received any message")
 
-    class ForwardProfile(OneShotBehaviour):
-        def __init__(self, profile):
+    class ForwardPendingProfile(PeriodicBehaviour):
+        async def run(self):
+            if self.agent.profile_pending:
+                self.agent.profile_pending = False
+                self.agent.forward_profile()
+
+    class SendProfiles(CyclicBehaviour):
+        async def run(self):
+            name, queued_at, profile = await self.agent.outbox.get()
+            message = Message(to=self.agent.analyzer_jid)
+            message.set_metadata("performative", "inform")
+            encode_body(message, {name: profile})
+            for key, value in self.agent.profile_metadata.items():
+                message.set_metadata(key, value)
+            await self.send(message)
+            self.agent.outbox.record_sent(queued_at)
+            if self.agent.outbox.sent % 1000 == 0:
+                print(f"[{self.agent.jid}]: Outbox {self.agent.outbox.stats()}")
+
+    class SendEscalation(OneShotBehaviour):
+        def __init__(self, escalation):
             super().__init__()
-            self.profile = profile
+            self.escalation = escalation
 
         async def run(self):
-            message = Message(to="cows-analyzer@xmpp_server", body=json.dumps(self.profile))
+            message = Message(to=self.agent.analyzer_jid)
             message.set_metadata("performative", "inform")
+            encode_body(message, self.escalation)
+            for key, value in self.agent.profile_metadata.items():
+                message.set_metadata(key, value)
             await self.send(message)
+            print(f"[{self.agent.jid}]: Escalated {[request['reason'] for request in self.escalation['requests']]}")
+
+    class ReplaySpool(OneShotBehaviour):
+        async def run(self):
+            try:
+                while len(self.agent.spool):
+                    entries, sources = self.agent.spool.drain()
+                    for backfill in backfill_messages(entries, sources, CHANNELS, BACKFILL_CHUNK):
+                        message = Message(to=self.agent.analyzer_jid)
+                        message.set_metadata("performative", "inform")
+                        encode_body(message, backfill)
+                        await self.send(message)
+                    print(f"[{self.agent.jid}]: Replayed {len(entries)} spooled profiles")
+            finally:
+                self.agent.replaying = False
 
     async def setup(self):
         behaviour = self.AggregateData(data_aggregator=self.aggregate_data)
         self.add_behaviour(behaviour)
+        self.add_behaviour(self.SendProfiles(), no_messages())
+        if self.profile_period > 0:
+            self.add_behaviour(self.ForwardPendingProfile(self.profile_period), no_messages())
+        self.watch_analyzer_presence()
+
+    def watch_analyzer_presence(self):
+        self.presence.on_available = self.on_presence_available
+        self.presence.on_unavailable = self.on_presence_unavailable
+        self.presence.subscribe(self.analyzer_jid)
+
+    def on_presence_available(self, peer_jid, *args):
+        if str(peer_jid).split("/")[0] != self.analyzer_jid:
+            return
+        self.analyzer_available = True
+        if len(self.spool) and not self.replaying:
+            self.replaying = True
+            self.add_behaviour(self.ReplaySpool())
+
+    def on_presence_unavailable(self, peer_jid, *args):
+        if str(peer_jid).split("/")[0] != self.analyzer_jid:
+            return
+        print(f"[{self.jid}]: Analyzer unavailable, spooling profiles")
+        self.analyzer_available = False
 
     def aggregate_data(self, data):
+        if data.get("type") == "WATCH_CLOSELY":
+            self.watch_closely(data.get("duration", 120))
+            return
+
+        # paczka odczytów to jedna porcja - profil powstaje dopiero po całej paczce
+        self.aggregate_readings(data.get("readings", [data]))
+
+    def watch_closely(self, duration):
+        print(f"[{self.jid}]: Watching closely for {duration} seconds")
+        for sensor in self.sensors:
+            sensor.watch_closely(duration)
+
+    def aggregate_readings(self, readings):
+        updated = False
+        for data in readings:
+            updated = self.update_data(data) or updated
+        if not updated or not self.is_profile_ready():
+            return
+        if self.rules:
+            self.evaluate_rules()
+        if not self.is_summary_due():
+            return
+        if self.profile_period > 0:
+            self.profile_pending = True
+            return
+        self.forward_profile()
+
+    def evaluate_rules(self, now=None):
+        now = now or time.time()
+        self.rule_history.append({"sensors": dict(self.data)})
+        history = list(self.rule_history)
+        requests = []
+        firing = {}
+        for rule in self.rules:
+            result = rule.analyze(self.cow_name, history)
+            if not result:
+                continue
+            escalated_at = self.firing.get(rule.name)
+            # eskalujemy w chwili zadziałania reguły i potem co ESCALATION_RETRY, a nie przy każdym profilu
+            if escalated_at is None or now - escalated_at >= ESCALATION_RETRY:
+                requests.append(result)
+                escalated_at = now
+            firing[rule.name] = escalated_at
+        self.firing = firing
+        if not requests:
+            return
+
+        self.watch_closely(WATCH_DURATION)
+        self.add_behaviour(self.SendEscalation({
+            "type": "ESCALATION",
+            "cow_name": self.cow_name,
+            "requests": requests,
+            "sensors": dict(self.data)
+        }))
+
+    def is_summary_due(self):
+        if self.summarizer is None:
+            return True
+        return self.alert_crossed or self.summarizer.is_due()
+
+    def update_data(self, data):
+        updated = False
         for key, value in data.items():
             if key in ['temperature', 'pH', 'activity', 'pulse']:
-                if key in self.data.keys(): self.data[key] = value
-                else: self.data |= {key: value}
-                if self.is_profile_ready():
-                    self.forward_profile()
+                self.data[key] = value
+                self.update_source(key, data)
+                summarizer = self.summarizer or self.profile_summarizer
+                if summarizer.add(key, value):
+                    self.alert_crossed = True
+                updated = True
+        return updated
+
+    def update_source(self, key, data):
+        if "seq" not in data:
+            return
+        # "first" to najstarszy numer odczytu zużyty od ostatniego profilu - analizator nie liczy
+        # odczytów nadpisanych tutaj jako zgubionych
+        source = self.sources.setdefault(key, {"first": data["seq"]})
+        source["seq"] = data["seq"]
+        source["timestamp"] = data["timestamp"]
 
     def is_profile_ready(self):
-        return all(key in self.data.keys() for key in ('temperature', 'pH', 'activity', 'pulse'))
+        return all(key in self.data.keys() for key in CHANNELS)
+
+    def is_spooling(self):
+        # podczas odtwarzania nowe profile też trafiają do bufora, żeby nie wyprzedzić zaległych
+        return self.analyzer_available is False or self.replaying
+
+    def spool_profile(self, profile):
+        timestamp = max((source["timestamp"] for source in self.sources.values()), default=time.time())
+        self.spool.put(self.cow_name, timestamp, profile, self.sources)
+        self.sources = {}
+
+    def take_profile(self):
+        # bez ostatnich znanych wartości słownik i tak byłby wyczyszczony - oddajemy go zamiast kopiować
+        if self.keep_last_known:
+            return copy(self.data)
+        profile, self.data = self.data, {}
+        return profile
+
+    def flush_summary(self):
+        if self.summarizer is None:
+            # wartości w profilu to ostatnie odczyty - kanały z kilkoma odczytami dostają ich podsumowanie
+            summary = {channel: part for channel, part in self.profile_summarizer.flush().items() if part["count"] > 1}
+            return summary or None
+        self.alert_crossed = False
+        return self.summarizer.flush()
 
     def forward_profile(self):
-        behaviour = self.ForwardProfile(profile={self.cow_name: copy(self.data)})
-        self.add_behaviour(behaviour)
-        self.data.clear()
+        summary = self.flush_summary()
+        if self.is_spooling():
+            # podsumowanie okna jedzie w zbuforowanym wpisie, a nie przepada razem z łączem
+            self.spool_profile(self.take_profile() | ({"summary": summary} if summary else {}))
+            return
+        profile = self.take_profile()
+        if summary:
+            profile["summary"] = summary
+        if self.sources:
+            profile["sources"] = self.sources
+            self.sources = {}
+        self.outbox.put(self.cow_name, profile, merge=coalesce_profiles)
+
+
+def coalesce_profiles(older, newer):
+    # odczyty z zastąpionego profilu liczą się jako zużyte, a nie zgubione
+    for channel, source in older.get("sources", {}).items():
+        newer.setdefault("sources", {}).setdefault(channel, source)["first"] = source["first"]
+    # statystyki obu okien się sumują - wartość bez podsumowania to pojedynczy odczyt
+    if older.get("summary") or newer.get("summary"):
+        newer["summary"] = combine_summaries(profile_summary(older), profile_summary(newer))
+    return newer
+
+
+def profile_summary(profile):
+    summary = dict(profile.get("summary") or {})
+    for channel, value in profile.items():
+        if channel not in summary and isinstance(value, (int, float)):
+            summary[channel] = reading_summary(value)
+    return summary
@@ -0,0 +1,67 @@
+import os
+
+from spade.agent import Agent
+from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
+from spade.message import Message
+
+from agents.aggregator import no_messages
+from agents.codec import decode_body, encode_body
+from agents.hub_table import HubTable, cow_name_from_sensor
+from agents.shard_ring import split_by_analyzer
+
+CHANNELS = ('temperature', 'pH', 'activity', 'pulse')
+HUB_TICK = float(os.getenv("HUB_TICK", "1"))
+
+
+class AggregatorHub(Agent):
+    def __init__(self, index):
+        super().__init__(f"aggregator-hub-{index}@xmpp_server", os.getenv("PASSWORD"))
+        keep_last_known = (
+            os.getenv("DEADBAND", "False") == "True"
+            or os.getenv("ADAPTIVE_SAMPLING", "False") == "True"
+        )
+        self.table = HubTable(CHANNELS, keep_last_known)
+        # krowa -> JID-y jej czujników, poznane z odczytów - tam trafiają podpowiedzi analizatora
+        self.sensor_jids = {}
+
+    class AggregateData(CyclicBehaviour):
+        async def run(self):
+            message = await self.receive(timeout=3)
+            if not message:
+                return
+
+            data = decode_body(message)
+            if data.get("type") == "WATCH_CLOSELY":
+                await self.forward_hint(data)
+                return
+
+            cow_name = cow_name_from_sensor(message.sender)
+            self.agent.sensor_jids.setdefault(cow_name, set()).add(str(message.sender).split("/")[0])
+            for reading in data.get("readings", [data]):
+                self.agent.table.update(cow_name, reading)
+
+        async def forward_hint(self, data):
+            # czujniki siedzą w kontenerach krów - hub przekazuje im podpowiedź jak samodzielny agregator
+            sensor_jids = sorted(self.agent.sensor_jids.get(data.get("cow_name"), ()))
+            for sensor_jid in sensor_jids:
+                message = Message(to=sensor_jid)
+                message.set_metadata("performative", "inform")
+                encode_body(message, data)
+                await self.send(message)
+            print(f"[{self.agent.jid}]: Watch hint for {data.get('cow_name')} forwarded to {len(sensor_jids)} sensors")
+
+    class ForwardProfiles(PeriodicBehaviour):
+        async def run(self):
+            profiles = self.agent.table.collect()
+            if not profiles:
+                return
+
+            for analyzer, group in split_by_analyzer(profiles).items():
+                message = Message(to=analyzer)
+                message.set_metadata("performative", "inform")
+                encode_body(message, group)
+                await self.send(message)
+
+    async def setup(self):
+        self.add_behaviour(self.AggregateData())
+        self.add_behaviour(self.ForwardProfiles(period=HUB_TICK), no_messages())
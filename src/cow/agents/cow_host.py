@@ -0,0 +1,75 @@
+import time
+from copy import deepcopy
+
+from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
+from spade.template import Template
+
+from agents.aggregator import Aggregator, no_messages
+
+
+class CowHost(Aggregator):
+    def __init__(self, sensors, effectors):
+        super().__init__()
+        self.sensors = sensors
+        self.effectors = {effector.device: effector for effector in effectors}
+        for effector in effectors:
+            effector.attach(self)
+        self.profile_metadata["devices"] = ",".join(self.effectors)
+        # odczyty wszystkich czujników przychodzą jedną paczką na takt - profil może iść od razu
+        self.profile_period = 0
+
+    class ReadSensors(PeriodicBehaviour):
+        def __init__(self, sensors, data_aggregator, period=1):
+            super().__init__(period)
+            self.sensors = sensors
+            self.data_aggregator = data_aggregator
+            self.next_sample_at = {}
+
+        async def run(self):
+            now = time.time()
+            readings = []
+            for sensor in self.sensors:
+                if now < self.next_sample_at.get(sensor, 0):
+                    continue
+                data = sensor.collect_data()
+                if sensor.sampling:
+                    self.next_sample_at[sensor] = now + sensor.sampling.next_period(data)
+                if sensor.deadband_filter and not sensor.deadband_filter.is_significant(data):
+                    continue
+                readings.append(sensor.stamp(data))
+            if readings:
+                self.data_aggregator(readings)
+
+    class RouteRequests(CyclicBehaviour):
+        def __init__(self, effectors):
+            super().__init__()
+            self.effectors = effectors
+
+        async def run(self):
+            message = await self.receive(timeout=10)
+            if not message:
+                return
+
+            device = message.get_metadata("device")
+            effector = self.effectors.get(device)
+            if effector is None:
+                print(f"[{self.agent.jid}]: Request for unknown device {device}")
+                return
+
+            print(f"[{effector.jid}]: Received request from {message.sender}")
+            effector.callback(deepcopy(message))
+
+    async def setup(self):
+        # wiadomości odbierają tylko RouteRequests i AggregateData - pozostałe zachowania nie mogą ich gromadzić
+        self.add_behaviour(self.ReadSensors(sensors=self.sensors, data_aggregator=self.aggregate_readings), no_messages())
+
+        template = Template()
+        template.set_metadata("performative", "request")
+        self.add_behaviour(self.RouteRequests(effectors=self.effectors), template)
+
+        template = Template()
+        template.set_metadata("performative", "inform")
+        self.add_behaviour(self.AggregateData(data_aggregator=self.aggregate_data), template)
+
+        self.add_behaviour(self.SendProfiles(), no_messages())
+        self.watch_analyzer_presence()
@@ -1,4 +1,3 @@
-import json
 import os
 from random import uniform
 from time import sleep
@@ -7,6 +6,8 @@ from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour, OneShotBehaviour
 from spade.message import Message
 
+from agents.codec import decode_body, encode_body
+
 from copy import deepcopy
 
 
@@ -17,6 +18,8 @@ class Effector(Agent):
         self.sleep_time = float(os.getenv("SLEEP_TIME"))
         self.free = True
         self.value = None
+        self.device = type
+        self.host = None
         super().__init__(f"effector-{type}-{self.cow_name}@xmpp_server", os.getenv("PASSWORD"))
 
     class GetRequest(CyclicBehaviour):
@@ -86,7 +89,7 @@ class Effector(Agent):
         async def run(self):
             reply = self.message.make_reply()
             reply.set_metadata("performative", "done")
-            reply.body = json.dumps(self.data)
+            encode_body(reply, self.data)
             print(f"[{self.jid}]: success {reply}")
             await self.send(reply)
 
@@ -100,7 +103,16 @@ class Effector(Agent):
 
         async def run(self):
            sleep(self.sleep_time)
-           self.take_action(json.loads(self.message.body))
+           self.take_action(decode_body(self.message))
+
+    def attach(self, host):
+        self.host = host
+
+    def add_behaviour(self, behaviour, template=None):
+        if self.host is not None:
+            self.host.add_behaviour(behaviour, template)
+        else:
+            super().add_behaviour(behaviour, template)
 
     def refuse(self, message):
         behaviour = self.RefuseRequest(message, self.jid)
@@ -0,0 +1,62 @@
+import os
+import zlib
+
+HUB_COUNT = int(os.getenv("HUB_COUNT", "0"))
+
+
+def hub_index(cow_name, hub_count):
+    # crc32 zamiast hash() - ten sam przydział w każdym kontenerze, niezależnie od PYTHONHASHSEED
+    return zlib.crc32(cow_name.encode("utf-8")) % hub_count
+
+
+def aggregator_jid(cow_name, hub_count=HUB_COUNT):
+    if hub_count > 0:
+        return f"aggregator-hub-{hub_index(cow_name, hub_count)}@xmpp_server"
+    return f"aggregator-{cow_name}@xmpp_server"
+
+
+def cow_name_from_sensor(sender):
+    # czujniki mają JID "{krowa}-{KlasaCzujnika}@xmpp_server"
+    return str(sender).split("@")[0].rsplit("-", 1)[0]
+
+
+class HubTable:
+    def __init__(self, channels, keep_last_known=False):
+        self.channels = channels
+        self.index = {channel: i for i, channel in enumerate(channels)}
+        self.keep_last_known = keep_last_known
+        # krowa -> wiersz wartości w kolejności self.channels
+        self.rows = {}
+        self.sources = {}
+        self.changed = set()
+
+    def update(self, cow_name, reading):
+        row = self.rows.get(cow_name)
+        if row is None:
+            row = self.rows[cow_name] = [None] * len(self.channels)
+        for key, value in reading.items():
+            i = self.index.get(key)
+            if i is None:
+                continue
+            row[i] = value
+            self.changed.add(cow_name)
+            if "seq" in reading:
+                source = self.sources.setdefault(cow_name, {}).setdefault(key, {"first": reading["seq"]})
+                source["seq"] = reading["seq"]
+                source["timestamp"] = reading["timestamp"]
+
+    def collect(self):
+        profiles = {}
+        for cow_name in self.changed:
+            row = self.rows[cow_name]
+            if None in row:
+                continue
+            profile = dict(zip(self.channels, row))
+            sources = self.sources.pop(cow_name, None)
+            if sources:
+                profile["sources"] = sources
+            profiles[cow_name] = profile
+            if not self.keep_last_known:
+                self.rows[cow_name] = [None] * len(self.channels)
+        self.changed = set()
+        return profiles
@@ -0,0 +1,57 @@
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class Outbox:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.pending = OrderedDict()
+        self.ready = asyncio.Event()
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.latency_last = 0.0
+        self.latency_max = 0.0
+        self.latency_sum = 0.0
+
+    def __len__(self):
+        return len(self.pending)
+
+    def put(self, key, payload, merge=None):
+        if key in self.pending:
+            # czekający profil zastępujemy nowszym - analizator potrzebuje tylko najświeższego
+            _, older = self.pending.pop(key)
+            if merge:
+                payload = merge(older, payload)
+            self.coalesced += 1
+        elif len(self.pending) >= self.capacity:
+            self.pending.popitem(last=False)
+            self.dropped += 1
+        self.pending[key] = (time.monotonic(), payload)
+        self.ready.set()
+
+    async def get(self):
+        while not self.pending:
+            self.ready.clear()
+            await self.ready.wait()
+        key, (queued_at, payload) = self.pending.popitem(last=False)
+        return key, queued_at, payload
+
+    def record_sent(self, queued_at):
+        latency = time.monotonic() - queued_at
+        self.sent += 1
+        self.latency_last = latency
+        self.latency_max = max(self.latency_max, latency)
+        self.latency_sum += latency
+
+    def stats(self):
+        return {
+            "depth": len(self.pending),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "latency_last": self.latency_last,
+            "latency_max": self.latency_max,
+            "latency_avg": self.latency_sum / self.sent if self.sent else 0.0
+        }
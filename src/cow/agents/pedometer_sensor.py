@@ -4,6 +4,12 @@ from agents.sensor import Sensor
 
 
 class PedometerSensor(Sensor):
+    deadband = 0.1
+    relative_deadband = True
+    # aktywność > 0.2 to tylko połowa warunku reguł stresu i głodu - szybko próbkujemy przy samym progu
+    watch_thresholds = (0.2,)
+    watch_margin = 0.05
+
     def __init__(self):
         super().__init__()
         self.activity = 1
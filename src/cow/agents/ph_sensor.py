@@ -4,6 +4,10 @@ from agents.sensor import Sensor
 
 
 class PHSensor(Sensor):
+    deadband = 0.05
+    normal_band = (6.0, None)
+    watch_margin = 0.2
+
     def __init__(self):
         super().__init__()
         self.pH = 6.5
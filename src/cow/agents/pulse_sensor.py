@@ -4,6 +4,11 @@ from agents.sensor import Sensor
 
 
 class PulseSensor(Sensor):
+    deadband = 0.05
+    relative_deadband = True
+    normal_band = (None, 90)
+    watch_margin = 10
+
     def __init__(self):
         super().__init__()
         self.pulse = 60
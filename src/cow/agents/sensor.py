@@ -1,34 +1,182 @@
-import json
 import os
+import time
 
 from spade.agent import Agent
 from spade.message import Message
-from spade.behaviour import PeriodicBehaviour
+from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
+
+from agents.aggregator import no_messages
+from agents.codec import decode_body, encode_body
+from agents.hub_table import aggregator_jid
+
+
+class Deadband:
+    def __init__(self, threshold, relative=False, max_silence=60):
+        self.threshold = threshold
+        self.relative = relative
+        self.max_silence = max_silence
+        self.last_reported = None
+        self.last_reported_at = None
+
+    def is_significant(self, data):
+        now = time.time()
+        if self.last_reported is None or now - self.last_reported_at >= self.max_silence:
+            return self.report(data, now)
+
+        for key, value in data.items():
+            previous = self.last_reported.get(key)
+            if previous is None:
+                return self.report(data, now)
+            threshold = self.threshold * abs(previous) if self.relative else self.threshold
+            if abs(value - previous) > threshold:
+                return self.report(data, now)
+        return False
+
+    def report(self, data, now):
+        self.last_reported = dict(data)
+        self.last_reported_at = now
+        return True
+
+
+class AdaptiveSampling:
+    def __init__(self, normal_band, margin, fast_period, slow_period, thresholds=()):
+        self.low, self.high = normal_band
+        self.margin = margin
+        self.thresholds = thresholds
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.watch_until = 0
+
+    def watch_closely(self, duration):
+        self.watch_until = max(self.watch_until, time.time() + duration)
+
+    def next_period(self, data):
+        if time.time() < self.watch_until:
+            return self.fast_period
+        for value in data.values():
+            if self.low is not None and value < self.low + self.margin:
+                return self.fast_period
+            if self.high is not None and value > self.high - self.margin:
+                return self.fast_period
+            if any(abs(value - threshold) < self.margin for threshold in self.thresholds):
+                return self.fast_period
+        return self.slow_period
 
 
 class Sensor(Agent):
+    deadband = 0.0
+    relative_deadband = False
+    # zakres wartości uznawanych przez reguły analizatora za normalne (None = brak granicy)
+    normal_band = (None, None)
+    watch_margin = 0.0
+    # progi warunków łączonych z innym kanałem - po żadnej stronie wartość nie jest sama w sobie alarmowa
+    watch_thresholds = ()
+
     def __init__(self):
         super().__init__(f"{os.getenv("NAME")}-{self.__class__.__name__}@xmpp_server", os.getenv("PASSWORD"))
+        self.sequence = 0
+        self.deadband_filter = None
+        if os.getenv("DEADBAND", "False") == "True":
+            self.deadband_filter = Deadband(
+                threshold=self.deadband,
+                relative=self.relative_deadband,
+                max_silence=float(os.getenv("MAX_SILENCE", "60"))
+            )
+        self.sampling = None
+        if os.getenv("ADAPTIVE_SAMPLING", "False") == "True":
+            self.sampling = AdaptiveSampling(
+                normal_band=self.normal_band,
+                margin=self.watch_margin,
+                fast_period=float(os.getenv("FAST_PERIOD", "1")),
+                slow_period=float(os.getenv("SLOW_PERIOD", "5")),
+                thresholds=self.watch_thresholds
+            )
 
     class ForwardData(PeriodicBehaviour):
-        def __init__(self, data_provider, period=1):
+        def __init__(self, data_provider, stamp, deadband_filter=None, sampling=None, period=1):
             super().__init__(period)
             self.data_provider = data_provider
-            self.aggregator_name = f"aggregator-{os.getenv("NAME")}@xmpp_server"
+            self.stamp = stamp
+            self.deadband_filter = deadband_filter
+            self.sampling = sampling
+            self.aggregator_name = aggregator_jid(os.getenv("NAME"))
+            self.batch_size = int(os.getenv("BATCH_SIZE", "1"))
+            self.batch_window = float(os.getenv("BATCH_WINDOW", "0"))
+            self.batch = []
+            self.batch_started = None
 
         async def run(self):
             data = self.data_provider()
-            await self.forward_data(data)
+            if self.sampling:
+                self.period = self.sampling.next_period(data)
+
+            if self.deadband_filter and not self.deadband_filter.is_significant(data):
+                # nieistotny odczyt nie trafia do paczki, ale nie może wstrzymać paczki, której okno już minęło
+                await self.flush_batch()
+                return
+
+            data = self.stamp(data)
+            if not self.is_batching():
+                await self.forward_data(data)
+                return
+
+            self.add_to_batch(data)
+            await self.flush_batch()
+
+        async def flush_batch(self):
+            if self.batch and self.is_batch_ready():
+                await self.forward_data({"readings": self.batch})
+                self.batch = []
+
+        def is_batching(self):
+            return self.batch_size > 1 or self.batch_window > 0
+
+        def add_to_batch(self, data):
+            if not self.batch:
+                self.batch_started = data["timestamp"]
+            self.batch.append(data)
+
+        def is_batch_ready(self):
+            if self.batch_size > 1 and len(self.batch) >= self.batch_size:
+                return True
+            return self.batch_window > 0 and time.time() - self.batch_started >= self.batch_window
 
         async def forward_data(self, data):
-            message = Message(to=self.aggregator_name, body=json.dumps(data))
+            message = Message(to=self.aggregator_name)
             message.set_metadata("performative", "inform")
+            encode_body(message, data)
 
             await self.send(message)
 
+    class ReceiveHints(CyclicBehaviour):
+        async def run(self):
+            # w trybie huba podpowiedzi analizatora przychodzą do czujnika wiadomością
+            message = await self.receive(timeout=10)
+            if not message:
+                return
+            data = decode_body(message)
+            if data.get("type") == "WATCH_CLOSELY":
+                self.agent.watch_closely(data.get("duration", 120))
+
     async def setup(self):
-        behaviour = self.ForwardData(data_provider=self.collect_data)
-        self.add_behaviour(behaviour)
+        behaviour = self.ForwardData(
+            data_provider=self.collect_data,
+            stamp=self.stamp,
+            deadband_filter=self.deadband_filter,
+            sampling=self.sampling
+        )
+        # podpowiedzi huba odbiera tylko ReceiveHints - ForwardData nie może gromadzić ich kopii
+        self.add_behaviour(behaviour, no_messages())
+        if self.sampling:
+            self.add_behaviour(self.ReceiveHints())
+
+    def stamp(self, data):
+        self.sequence += 1
+        return data | {"seq": self.sequence, "timestamp": time.time()}
+
+    def watch_closely(self, duration):
+        if self.sampling:
+            self.sampling.watch_closely(duration)
 
     def collect_data(self):
         raise NotImplemented
@@ -0,0 +1,60 @@
+import bisect
+import hashlib
+import os
+from functools import lru_cache
+
+# ANALYZER_SHARDS > 0: krowy rozdzielone między analizatory cows-analyzer-{i} według pierścienia haszującego
+ANALYZER_SHARDS = int(os.getenv("ANALYZER_SHARDS", "0"))
+VIRTUAL_NODES = 64
+PRIMARY_SHARD = 0
+
+
+def ring_hash(key):
+    # md5 zamiast hash() - ten sam pierścień w każdym kontenerze, niezależnie od PYTHONHASHSEED
+    return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    def __init__(self, shards, virtual_nodes=VIRTUAL_NODES):
+        # każdy shard w wielu punktach pierścienia - dołożenie shardu przenosi ok. 1/N krów
+        points = sorted((ring_hash(f"{shard}#{node}"), shard) for shard in shards for node in range(virtual_nodes))
+        self.hashes = [point for point, _ in points]
+        self.shards = [shard for _, shard in points]
+
+    def shard_for(self, key):
+        i = bisect.bisect(self.hashes, ring_hash(key)) % len(self.hashes)
+        return self.shards[i]
+
+
+@lru_cache(maxsize=None)
+def ring(shard_count):
+    return HashRing(range(shard_count))
+
+
+def shard_jid(index):
+    return f"cows-analyzer-{index}@xmpp_server"
+
+
+@lru_cache(maxsize=None)
+def analyzer_jid(cow_name, shard_count=ANALYZER_SHARDS):
+    if shard_count > 0:
+        return shard_jid(ring(shard_count).shard_for(cow_name))
+    return "cows-analyzer@xmpp_server"
+
+
+def split_by_analyzer(profiles, shard_count=ANALYZER_SHARDS):
+    groups = {}
+    for cow_name, profile in profiles.items():
+        groups.setdefault(analyzer_jid(cow_name, shard_count), {})[cow_name] = profile
+    return groups
+
+
+def merge_shard_reports(report, shard_reports, now, max_age):
+    # shard_reports: shard -> (czas odbioru, raport); milczący shard wypada z raportu zamiast wisieć ze starymi danymi
+    merged = dict(report)
+    for shard, (received_at, shard_report) in list(shard_reports.items()):
+        if now - received_at > max_age:
+            del shard_reports[shard]
+            continue
+        merged.update(shard_report)
+    return merged
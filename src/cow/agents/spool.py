@@ -0,0 +1,84 @@
+import json
+import os
+from collections import deque
+
+
+class Spool:
+    def __init__(self, capacity, overflow_path=None, overflow_capacity=0):
+        self.capacity = capacity
+        self.overflow_path = overflow_path
+        self.overflow_capacity = overflow_capacity
+        self.entries = deque()
+        self.sources = {}
+        self.overflowed = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self.overflowed + len(self.entries)
+
+    def put(self, name, timestamp, sensors, sources=None):
+        if len(self.entries) >= self.capacity:
+            self.overflow(self.entries.popleft())
+        self.entries.append((name, timestamp, sensors))
+        if sources:
+            self.merge_sources(name, sources)
+
+    def merge_sources(self, name, sources):
+        merged = self.sources.setdefault(name, {})
+        for channel, source in sources.items():
+            if channel not in merged:
+                merged[channel] = dict(source)
+                continue
+            merged[channel]["first"] = min(merged[channel]["first"], source["first"])
+            merged[channel]["seq"] = max(merged[channel]["seq"], source["seq"])
+            merged[channel]["timestamp"] = max(merged[channel]["timestamp"], source["timestamp"])
+
+    def overflow(self, entry):
+        if self.overflow_path is None or self.overflowed >= self.overflow_capacity:
+            self.dropped += 1
+            return
+        with open(self.overflow_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.overflowed += 1
+
+    def drain(self):
+        entries = []
+        if self.overflowed:
+            with open(self.overflow_path) as f:
+                entries = [tuple(json.loads(line)) for line in f]
+            os.remove(self.overflow_path)
+            self.overflowed = 0
+        entries.extend(self.entries)
+        self.entries.clear()
+        sources, self.sources = self.sources, {}
+        return entries, sources
+
+
+def backfill_messages(entries, sources, channels, chunk_size):
+    messages = []
+    profiles = {}
+    summaries = {}
+    rows_in_chunk = 0
+    for name, timestamp, sensors in entries:
+        profiles.setdefault(name, []).append([timestamp] + [sensors.get(channel) for channel in channels])
+        # statystyki okna z trybu podsumowań jadą obok wierszy, żeby analizator ich nie zgubił
+        if sensors.get("summary"):
+            summaries.setdefault(name, []).append([timestamp, sensors["summary"]])
+        rows_in_chunk += 1
+        if rows_in_chunk >= chunk_size:
+            messages.append(backfill_message(channels, profiles, summaries))
+            profiles = {}
+            summaries = {}
+            rows_in_chunk = 0
+    if profiles or not messages:
+        messages.append(backfill_message(channels, profiles, summaries))
+    # numery sekwencyjne idą w ostatniej paczce, żeby analizator liczył straty po wstawieniu wszystkich wierszy
+    messages[-1]["sources"] = sources
+    return messages
+
+
+def backfill_message(channels, profiles, summaries):
+    message = {"type": "PROFILE_BACKFILL", "channels": list(channels), "profiles": profiles}
+    if summaries:
+        message["summaries"] = summaries
+    return message
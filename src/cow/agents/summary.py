@@ -0,0 +1,99 @@
+import time
+
+
+class ChannelSummary:
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+        self.last = None
+        self.mean = 0.0
+        self.m2 = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.last = value
+        # Welford - wariancja liczona na bieżąco, bez trzymania próbek
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+
+    def merge(self, part):
+        # równoległa wersja Welforda (Chan) - dokładamy od razu całe podsumowanie
+        count = self.count + part["count"]
+        delta = part["sum"] / part["count"] - self.mean
+        self.m2 += part["var"] * part["count"] + delta * delta * self.count * part["count"] / count
+        self.mean += delta * part["count"] / count
+        self.count = count
+        self.sum += part["sum"]
+        self.min = part["min"] if self.min is None else min(self.min, part["min"])
+        self.max = part["max"] if self.max is None else max(self.max, part["max"])
+        self.last = part["last"]
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min,
+            "max": self.max,
+            "last": self.last,
+            "var": self.m2 / self.count if self.count else 0.0
+        }
+
+
+class WindowSummarizer:
+    def __init__(self, window, thresholds):
+        self.window = window
+        # kanał -> (dolna, górna) granica; przekroczenie w którąkolwiek stronę wysyła podsumowanie od razu
+        self.thresholds = thresholds
+        self.channels = {}
+        self.started_at = None
+        self.alerting = set()
+
+    def add(self, channel, value):
+        if self.started_at is None:
+            self.started_at = time.time()
+        self.channels.setdefault(channel, ChannelSummary()).add(value)
+        return self.update_alert(channel, value)
+
+    def update_alert(self, channel, value):
+        low, high = self.thresholds.get(channel, (None, None))
+        alerting = (low is not None and value < low) or (high is not None and value > high)
+        crossed = alerting != (channel in self.alerting)
+        if alerting:
+            self.alerting.add(channel)
+        else:
+            self.alerting.discard(channel)
+        return crossed
+
+    def is_due(self, now=None):
+        if self.started_at is None:
+            return False
+        return (now or time.time()) - self.started_at >= self.window
+
+    def flush(self):
+        summary = {channel: channel_summary.snapshot() for channel, channel_summary in self.channels.items()}
+        self.channels = {}
+        self.started_at = None
+        return summary
+
+
+def reading_summary(value):
+    return {"count": 1, "sum": value, "min": value, "max": value, "last": value, "var": 0.0}
+
+
+def combine_summaries(older, newer):
+    # podsumowania kolejnych okien tego samego bytu w jedno, w formacie ChannelSummary.snapshot
+    combined = {}
+    for channel in list(older) + [channel for channel in newer if channel not in older]:
+        summary = ChannelSummary()
+        for part in (older.get(channel), newer.get(channel)):
+            if part:
+                summary.merge(part)
+        combined[channel] = summary.snapshot()
+    return combined
+
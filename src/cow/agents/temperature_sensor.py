@@ -4,6 +4,10 @@ from agents.sensor import Sensor
 
 
 class TemperatureSensor(Sensor):
+    deadband = 0.2
+    normal_band = (None, 39.0)
+    watch_margin = 0.5
+
     def __init__(self):
         super().__init__()
         self.temperature = 40
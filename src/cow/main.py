@@ -1,5 +1,10 @@
+import os
+
 import spade
 from agents.aggregator import Aggregator
+from agents.aggregator_hub import AggregatorHub
+from agents.hub_table import HUB_COUNT
+from agents.cow_host import CowHost
 from agents.temperature_sensor import TemperatureSensor
 from agents.pedometer_sensor import PedometerSensor
 from agents.ph_sensor import PHSensor
@@ -10,10 +15,30 @@ from agents.feeder_effector import FeederEffector
 from agents.sprinkler_effector import SprinklerEffector
 
 
-async def main():
-    aggregator_agent = Aggregator()
-    await aggregator_agent.start(auto_register=True)
-    print("Aggregator started")
+async def start_cow_host():
+    sensors = [TemperatureSensor(), PedometerSensor(), PHSensor(), PulseSensor()]
+    effectors = [SprinklerEffector(), FeederEffector(), BrushEffector(), FanEffector()]
+
+    cow_host = CowHost(sensors, effectors)
+    await cow_host.start(auto_register=True)
+    print("Cow host started")
+    return cow_host
+
+
+async def start_hub():
+    hub = AggregatorHub(int(os.getenv("HUB_INDEX")))
+    await hub.start(auto_register=True)
+    print(f"Aggregator hub {hub.jid} started")
+    return hub
+
+
+async def start_agents():
+    # z HUB_COUNT > 0 czujniki wysyłają do huba zagrody, a nie do własnego agregatora
+    aggregator_agent = None
+    if HUB_COUNT == 0:
+        aggregator_agent = Aggregator()
+        await aggregator_agent.start(auto_register=True)
+        print("Aggregator started")
 
     temperature_sensor = TemperatureSensor()
     await temperature_sensor.start(auto_register=True)
@@ -39,6 +64,21 @@ async def main():
     fan = FanEffector()
     await fan.start(auto_register=True)
 
+    if aggregator_agent is None:
+        return temperature_sensor
+    aggregator_agent.sensors = [temperature_sensor, pedometer_sensor, ph_sensor, pulse_sensor]
+    return aggregator_agent
+
+
+async def main():
+    # COW_HOST_MODE=True: jedno połączenie XMPP na krowę zamiast dziewięciu agentów
+    if os.getenv("HUB_INDEX") is not None:
+        aggregator_agent = await start_hub()
+    elif os.getenv("COW_HOST_MODE", "False") == "True":
+        aggregator_agent = await start_cow_host()
+    else:
+        aggregator_agent = await start_agents()
+
     with open("/tmp/agent_ready", "w") as f:
         f.write("ready")
 
@@ -0,0 +1,39 @@
+class CommandTracker:
+    def __init__(self, cooldown):
+        self.cooldown = cooldown
+        # (byt, efektor, stan) -> (conversation-id, początek); rozmowa zawsze kończy się odpowiedzią
+        # albo wygaśnięciem w ConversationManager, więc wpis trzymamy aż do finish()
+        self.in_flight = {}
+        self.keys = {}
+        self.completed = {}
+        self.suppressed = 0
+
+    def should_send(self, key, now, ignore_cooldown=False):
+        entry = self.in_flight.get(key)
+        if entry is not None:
+            self.suppressed += 1
+            return False
+
+        finished_at = self.completed.get(key)
+        if finished_at is not None and now - finished_at >= self.cooldown:
+            del self.completed[key]
+            finished_at = None
+        if finished_at is not None and not ignore_cooldown:
+            self.suppressed += 1
+            return False
+        return True
+
+    def stats(self):
+        return {"in_flight": len(self.in_flight), "suppressed": self.suppressed}
+
+    def start(self, key, conversation_id, now):
+        self.in_flight[key] = (conversation_id, now)
+        self.keys[conversation_id] = key
+
+    def finish(self, conversation_id, now):
+        key = self.keys.pop(conversation_id, None)
+        if key is None:
+            return
+        if self.in_flight.get(key, (None,))[0] == conversation_id:
+            del self.in_flight[key]
+        self.completed[key] = now
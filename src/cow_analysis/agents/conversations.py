@@ -0,0 +1,59 @@
+import heapq
+
+REQUESTED = "REQUESTED"
+AGREED = "AGREED"
+DONE = "DONE"
+REFUSED = "REFUSED"
+FAILED = "FAILED"
+TIMED_OUT = "TIMED_OUT"
+
+
+class ConversationManager:
+    def __init__(self, request_timeout, action_timeout):
+        # czas na agree/refuse od wysłania żądania
+        self.request_timeout = request_timeout
+        # czas na done/failure od agree
+        self.action_timeout = action_timeout
+        self.conversations = {}
+        self.deadlines = []
+
+    def __len__(self):
+        return len(self.conversations)
+
+    def get(self, conversation_id):
+        return self.conversations.get(conversation_id)
+
+    def start(self, conversation_id, conversation, now):
+        conversation["state"] = REQUESTED
+        self.conversations[conversation_id] = conversation
+        self.schedule(conversation_id, now + self.request_timeout)
+
+    def schedule(self, conversation_id, deadline):
+        self.conversations[conversation_id]["deadline"] = deadline
+        heapq.heappush(self.deadlines, (deadline, conversation_id))
+
+    def transition(self, conversation_id, state, now):
+        conversation = self.conversations.get(conversation_id)
+        if conversation is None:
+            return None
+        conversation["state"] = state
+        if state == AGREED:
+            self.schedule(conversation_id, now + self.action_timeout)
+        else:
+            # stan końcowy - wpis znika od razu, jego termin na stercie zostanie pominięty
+            del self.conversations[conversation_id]
+        return conversation
+
+    def expire(self, now):
+        expired = []
+        while self.deadlines and self.deadlines[0][0] <= now:
+            deadline, conversation_id = heapq.heappop(self.deadlines)
+            conversation = self.conversations.get(conversation_id)
+            # nieaktualny termin: rozmowa skończona albo przesunięta po agree
+            if conversation is None or conversation["deadline"] != deadline:
+                continue
+            del self.conversations[conversation_id]
+            conversation["timed_out_in"] = conversation["state"]
+            conversation["state"] = TIMED_OUT
+            expired.append((conversation_id, conversation))
+        return expired
@@ -1,6 +1,5 @@
-import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import time
 from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour
@@ -10,25 +9,95 @@ from spade.message import Message
 from spade.template import Template
 from spade.behaviour import PeriodicBehaviour
 
-import json
-from datetime import datetime
 import asyncio
 
-HISTORY_DEPTH = 1
+import numpy as np
+
+from agents.codec import CODEC, decode_body, encode_body, set_body
+from agents.command_tracker import CommandTracker
+from agents.conversations import AGREED, DONE, FAILED, REFUSED, ConversationManager
+from agents.event_queue import CoalescingQueue
+from agents.history import History
+from agents.link_monitor import LinkMonitor
+from agents.offload import LoopLag, make_executor, offload
+from agents.report_delta import DeltaReporter, split_report
+from agents.rules import HISTORY_DEPTH, default_rules
+from agents.rolling import RollingProfile
+from agents.rule_index import RuleIndex
+from agents.shard_ring import ANALYZER_SHARDS, PRIMARY_SHARD, merge_shard_reports, shard_jid
+from agents.wal import WriteAheadLog
+
+WATCH_DURATION = float(os.getenv("WATCH_DURATION", "120"))
+REORDER_WINDOW = float(os.getenv("REORDER_WINDOW", "0.5"))
+REPORT_WINDOW = timedelta(hours=6)
+# powtórzenia tego samego polecenia tłumimy, dopóki trwa rozmowa, i jeszcze przez COMMAND_COOLDOWN po niej
+COMMAND_COOLDOWN = float(os.getenv("COMMAND_COOLDOWN", "30"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "10"))
+ACTION_TIMEOUT = float(os.getenv("ACTION_TIMEOUT", "60"))
+CHANNELS = ('temperature', 'pH', 'activity', 'pulse')
+# historia na byt ograniczona liczbą wpisów i czasem - pamięć analizatora nie rośnie z czasem działania
+HISTORY_CAPACITY = int(os.getenv("HISTORY_CAPACITY", "21600"))
+HISTORY_RETENTION = float(os.getenv("HISTORY_RETENTION", str(REPORT_WINDOW.total_seconds())))
+# RULE_BATCH_PERIOD > 0: reguły liczone co takt naraz dla całego stada zamiast przy każdym profilu
+RULE_BATCH_PERIOD = float(os.getenv("RULE_BATCH_PERIOD", "0"))
+# przy ANALYZER_SHARDS > 0 ten analizator to shard SHARD_INDEX; shard główny scala raporty pozostałych
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", str(PRIMARY_SHARD)))
+SHARD_REPORT_MAX_AGE = float(os.getenv("SHARD_REPORT_MAX_AGE", "45"))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+# DELTA_REPORTS=True: pełna migawka co FULL_REPORT_EVERY raportów, pomiędzy nimi tylko byty,
+# których statystyki zmieniły się o więcej niż REPORT_TOLERANCE
+DELTA_REPORTS = os.getenv("DELTA_REPORTS", "False") == "True"
+REPORT_TOLERANCE = float(os.getenv("REPORT_TOLERANCE", "0.05"))
+FULL_REPORT_EVERY = int(os.getenv("FULL_REPORT_EVERY", "20"))
+REPORT_CHUNK = int(os.getenv("REPORT_CHUNK", "50"))
+# HISTORY_DIR ustawione: profile trafiają do dziennika na dysku i po restarcie odtwarzamy z niego okno raportu
+HISTORY_DIR = os.getenv("HISTORY_DIR")
+HISTORY_FLUSH_PERIOD = float(os.getenv("HISTORY_FLUSH_PERIOD", "1"))
+HISTORY_SEGMENT_SIZE = int(os.getenv("HISTORY_SEGMENT_SIZE", str(16 * 1024 * 1024)))
+
+
+def no_messages():
+    # SPADE kopiuje każdą wiadomość do skrzynki każdego pasującego zachowania, a zachowanie bez szablonu
+    # pasuje do wszystkiego - wiadomości odbiera tylko MessageRouter, reszta dostaje szablon, którego nikt nie wysyła
+    template = Template()
+    template.set_metadata("mailbox", "none")
+    return template
+
 
 class CowsAnalyzer(Agent):
     def __init__(self):
-        super().__init__(f"cows-analyzer@xmpp_server", os.getenv("PASSWORD"))
+        jid = shard_jid(SHARD_INDEX) if ANALYZER_SHARDS > 0 else "cows-analyzer@xmpp_server"
+        super().__init__(jid, os.getenv("PASSWORD"))
         self.data = {
             "cows": {
                 "current": {},
-                "history": {}
+                "history": History(CHANNELS, HISTORY_CAPACITY, HISTORY_RETENTION)
             }
         }
-        self.events = asyncio.Queue()
+        # co najwyżej jedno oczekujące PROFILE_UPDATED na byt, żądania efektorów w kolejności
+        self.events = CoalescingQueue("cow_name")
         self.profile_queue = asyncio.Queue()     # wiadomości od agregatorów
         self.effector_queue = asyncio.Queue() 
-        self.conversations = {} 
+        self.conversations = ConversationManager(REQUEST_TIMEOUT, ACTION_TIMEOUT)
+        self.command_tracker = CommandTracker(COMMAND_COOLDOWN)
+        self.aggregators = {}
+        self.link_monitor = LinkMonitor(reorder_window=REORDER_WINDOW)
+        # statystyki okna raportu aktualizowane przy każdym profilu
+        self.rolling = {}
+        # zaległe profile z niedokończonego odtworzenia bufora agregatora
+        self.pending_backfill = {}
+        self.watch_hints = {}
+        self.wal = WriteAheadLog(HISTORY_DIR, HISTORY_SEGMENT_SIZE, HISTORY_RETENTION) if HISTORY_DIR else None
+        self.device_hosts = {}
+        # krowy, których reguły liczy agregator - tutaj przychodzą tylko eskalacje
+        self.edge_rules = set()
+        # ostatni raport każdego z pozostałych shardów (tylko na shardzie głównym)
+        self.shard_reports = {}
+        self.shard_chunks = {}
+        # ciężkie obliczenia (raport, reguły stada) opcjonalnie poza pętlą zdarzeń
+        self.executor = make_executor()
+        self.loop_lag = LoopLag()
+        self.delta_reporter = DeltaReporter(CHANNELS, REPORT_TOLERANCE, FULL_REPORT_EVERY)
 
     class MessageRouterBehaviour(CyclicBehaviour):
         async def run(self):
@@ -43,13 +112,19 @@ class CowsAnalyzer(Agent):
                 await self.agent.profile_queue.put(msg)
                 return
 
+            if sender.startswith("cows-analyzer-") and perf == "inform":
+                payload = decode_body(msg)
+                if payload.get("type") == "SHARD_REPORT":
+                    self.agent.receive_shard_report(payload)
+                return
+
             if perf in ("agree", "refuse", "done", "failure"):
                 await self.agent.effector_queue.put(msg)
                 return
             # Farmer -> Analyzer (sterowanie efektorem)
             if sender.startswith("farmer@") and perf in ("request", "inform"):
                 try:
-                    payload = json.loads(msg.body)
+                    payload = decode_body(msg)
                 except Exception:
                     return
 
@@ -64,37 +139,212 @@ class CowsAnalyzer(Agent):
                     print("[CowsAnalyzer] FARMER_EFFECTOR_REQUEST queued")
                     return
 
+                if payload.get("type") == "REPORT_RESYNC":
+                    # farmer zgubił raport różnicowy - następny będzie pełny
+                    self.agent.delta_reporter.request_resync()
+                    print("[CowsAnalyzer] REPORT_RESYNC requested by farmer")
+                    return
+
             print("[Router] Ignored message:", msg)
 
     class ProfileConsumerBehaviour(CyclicBehaviour):
         async def run(self):
-            msg = await self.agent.profile_queue.get()
+            try:
+                msg = await asyncio.wait_for(self.agent.profile_queue.get(), timeout=max(REORDER_WINDOW, 0.1))
+            except asyncio.TimeoutError:
+                await self.agent.release_profiles()
+                return
 
-            data = json.loads(msg.body)
+            data = decode_body(msg)
+            if data.get("type") == "PROFILE_BACKFILL":
+                self.agent.register_profile_source(data["profiles"], str(msg.sender).split("/")[0], hosts_devices=False)
+                self.agent.save_backfill(data)
+                return
+
+            if data.get("type") == "ESCALATION":
+                self.agent.register_profile_source(
+                    {data["cow_name"]: None},
+                    str(msg.sender).split("/")[0],
+                    hosts_devices=bool(msg.get_metadata("devices")),
+                    edge_rules=True
+                )
+                await self.agent.escalate(data)
+                return
+
+            self.agent.register_profile_source(
+                data,
+                str(msg.sender).split("/")[0],
+                hosts_devices=bool(msg.get_metadata("devices")),
+                edge_rules=msg.get_metadata("edge-rules") == "True"
+            )
             await self.agent.save_profile(data)
 
+    def receive_shard_report(self, payload):
+        # raport shardu przychodzi w kawałkach - do scalenia trafia dopiero komplet jednego report_id, po kolei
+        shard, chunk = payload["shard"], payload.get("chunk", 0)
+        if chunk == 0:
+            self.shard_chunks[shard] = {"report_id": payload.get("report_id"), "next": 0, "report": {}}
+        partial = self.shard_chunks.get(shard)
+        if partial is None or payload.get("report_id") != partial["report_id"] or chunk != partial["next"]:
+            # kawałek innego raportu albo po zgubionym - niepełny raport porzucamy, scali się następny
+            self.shard_chunks.pop(shard, None)
+            return
+        partial["report"].update(payload["report"])
+        partial["next"] = chunk + 1
+        if partial["next"] == payload.get("total", 1):
+            self.shard_reports[shard] = (time.time(), self.shard_chunks.pop(shard)["report"])
+
+    def register_profile_source(self, message_data, aggregator_jid, hosts_devices, edge_rules=False):
+        for cow_name in message_data:
+            self.aggregators[cow_name] = aggregator_jid
+            if hosts_devices:
+                self.device_hosts[cow_name] = aggregator_jid
+            if edge_rules:
+                self.edge_rules.add(cow_name)
+
+    async def escalate(self, escalation):
+        # reguły zadziałały już w agregatorze - od razu uruchamiamy efektory
+        print(f"[CowsAnalyzer] Escalation from {escalation['cow_name']}: {[r['reason'] for r in escalation['requests']]}")
+        for request in escalation["requests"]:
+            await self.events.put(request)
+
 
     async def save_profile(self, message_data):
+        received_at = time.time()
         for cow_name, sensors in message_data.items():
+            sources = sensors.pop("sources", None)
+            summary = sensors.pop("summary", None)
+            if not self.link_monitor.observe(cow_name, sources, received_at):
+                continue
+
+            timestamp = max(source["timestamp"] for source in sources.values()) if sources else received_at
             profile = {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                "received_at": datetime.fromtimestamp(received_at, timezone.utc).isoformat(),
                 "sensors": sensors
             }
+            if summary:
+                profile["summary"] = summary
+            if sources:
+                profile["changed"] = list(sources)
+            self.link_monitor.push(cow_name, timestamp, profile)
+        await self.release_profiles()
+
+    def save_backfill(self, message_data):
+        channels = message_data["channels"]
+        for cow_name, rows in message_data["profiles"].items():
+            if not rows:
+                continue
+            # podsumowania okien zbuforowanych profili - trafiają do WAL i do okna kroczącego
+            summaries = {timestamp: summary for timestamp, summary in message_data.get("summaries", {}).get(cow_name, [])}
+            backfill = []
+            for row in rows:
+                profile = {"sensors": {channel: value for channel, value in zip(channels, row[1:]) if value is not None}}
+                if row[0] in summaries:
+                    profile["summary"] = summaries[row[0]]
+                backfill.append((row[0], profile))
+            if self.wal is not None:
+                for timestamp, profile in backfill:
+                    self.wal.append(cow_name, timestamp, profile)
+            self.pending_backfill.setdefault(cow_name, []).extend(backfill)
+
+        # sources niesie tylko ostatnia paczka - historię i okno scalamy raz na całe odtworzenie, nie co paczkę
+        if "sources" not in message_data:
+            return
+        for cow_name, backfill in self.pending_backfill.items():
+            # zaległe profile wpinamy w historię jednym scaleniem i bez zdarzeń - na stare dane nie reagujemy
+            history = self.data["cows"]["history"].merge(cow_name, backfill)
+            self.data["cows"]["current"][cow_name] = history[-1]
+            # kolumny historii nie mają podsumowań okien - do okna kroczącego dokładamy tylko zaległe wpisy
+            self.rolling_for(cow_name).merge(backfill)
+            print(f"[Backfill] {cow_name}: {len(backfill)} profiles")
+        self.pending_backfill = {}
+
+        for cow_name, sources in message_data["sources"].items():
+            self.link_monitor.observe(cow_name, sources, received_at=None)
+
+    def restore_history(self):
+        started = time.time()
+        replayed = {}
+        for cow_name, timestamp, sensors, summary in self.wal.replay(since=started - HISTORY_RETENTION):
+            profile = {"timestamp": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(), "sensors": sensors}
+            if summary:
+                profile["summary"] = summary
+            replayed.setdefault(cow_name, []).append((timestamp, profile))
+
+        for cow_name, entries in replayed.items():
+            # zaległe profile dopisywane były po nowszych - porządkujemy przed wpięciem
+            entries.sort(key=lambda entry: entry[0])
+            self.data["cows"]["history"].merge(cow_name, entries)
+            self.data["cows"]["current"][cow_name] = entries[-1][1]
+            rolling = self.rolling_for(cow_name)
+            for timestamp, profile in entries:
+                rolling.add(timestamp, profile)
+
+        count = sum(len(entries) for entries in replayed.values())
+        print(f"[History] Restored {count} profiles of {len(replayed)} entities in {time.time() - started:.2f}s")
+
+    class FlushHistoryBehaviour(PeriodicBehaviour):
+        async def run(self):
+            batch = self.agent.wal.take_batch()
+            if batch:
+                # zapis i fsync w wątku - pętla zdarzeń nie czeka na dysk
+                await asyncio.get_running_loop().run_in_executor(None, self.agent.wal.write_batch, batch)
+
+        async def on_end(self):
+            self.agent.wal.write_batch(self.agent.wal.take_batch())
+            self.agent.wal.close()
+
+    def rolling_for(self, cow_name):
+        rolling = self.rolling.get(cow_name)
+        if rolling is None:
+            rolling = self.rolling[cow_name] = RollingProfile(CHANNELS, REPORT_WINDOW.total_seconds())
+        return rolling
+
+    def herd_matrix(self):
+        names = []
+        rows = []
+        for cow_name, series in self.data["cows"]["history"].items():
+            if len(series):
+                names.append(cow_name)
+                rows.append(series.values[series.end - 1])
+        if not names:
+            return names, {}
+        matrix = np.stack(rows)
+        return names, {channel: matrix[:, j] for j, channel in enumerate(CHANNELS)}
+
+    def watch_hint(self, cow_name):
+        aggregator_jid = self.aggregators.get(cow_name)
+        now = time.time()
+        if aggregator_jid is None or now - self.watch_hints.get(cow_name, 0) < WATCH_DURATION / 2:
+            return None
+
+        self.watch_hints[cow_name] = now
+        msg = Message(to=aggregator_jid)
+        msg.set_metadata("performative", "inform")
+        encode_body(msg, {
+            "type": "WATCH_CLOSELY",
+            "cow_name": cow_name,
+            "duration": WATCH_DURATION
+        })
+        return msg
+
+    async def release_profiles(self):
+        for cow_name, timestamp, profile in self.link_monitor.pop_ready(time.time()):
             self.data["cows"]["current"][cow_name] = profile
-            self.data["cows"]["history"].setdefault(cow_name, []).append(profile)
+            self.data["cows"]["history"].append(cow_name, timestamp, profile)
+            self.rolling_for(cow_name).add(timestamp, profile)
+            if self.wal is not None:
+                self.wal.append(cow_name, timestamp, profile)
             await self.events.put({
                 "type": "PROFILE_UPDATED",
-                "cow_name": cow_name
+                "cow_name": cow_name,
+                "channels": profile.get("changed")
                 })    
     
     class AnalyzeProfilesBehaviour(CyclicBehaviour):
         async def on_start(self):
-            self.rules = [
-                FeverAnalysis(),
-                OverheatingAnalysis(),
-                StressAnalysis(),
-                HungerAnalysis()
-            ]
+            self.rules = RuleIndex(default_rules())
         
         async def run(self):
             event = await self.agent.events.get()
@@ -111,12 +361,23 @@ class CowsAnalyzer(Agent):
 
         async def handle_profile_update(self, event):
             cow_name = event["cow_name"]
-            history = self.agent.data["cows"]["history"].get(cow_name, [])
+            if cow_name in self.agent.edge_rules or RULE_BATCH_PERIOD > 0:
+                return
+            series = self.agent.data["cows"]["history"].get(cow_name)
+            if len(series) < HISTORY_DEPTH:
+                return
+            # warunki reguł liczone wprost na kolumnach ostatnich wpisów, jak w trybie całego stada
+            readings = series.tail(HISTORY_DEPTH)
 
-            for rule in self.rules:
-                result = rule.analyze(cow_name, history)
-                if result:
-                    await self.agent.events.put(result)
+            for rule in self.rules.affected(event.get("channels")):
+                if np.all(rule.condition(readings)):
+                    await self.agent.events.put(rule.request(cow_name, series.sensors(series.end - 1)))
+                    await self.send_watch_hint(cow_name)
+
+        async def send_watch_hint(self, cow_name):
+            msg = self.agent.watch_hint(cow_name)
+            if msg:
+                await self.send(msg)
 
         async def handle_effector_request(self, event):
             cow_name = event["cow_name"]
@@ -124,11 +385,17 @@ class CowsAnalyzer(Agent):
             turn_on = event.get("turn_on")
             reason = event.get("reason", "unknown")
 
+            key = (cow_name, effector, turn_on)
+            # polecenie farmera jest świadome - pomija okres karencji, ale nie trwającą rozmowę
+            if not self.agent.command_tracker.should_send(key, time.time(), ignore_cooldown=reason == "farmer_request"):
+                return
+
             conversation = EffectorConversation(
                 cow_name=cow_name,
                 effector=effector,
                 turn_on=turn_on,
-                reason=reason
+                reason=reason,
+                host_jid=self.agent.device_hosts.get(cow_name)
             )
 
 
@@ -137,6 +404,7 @@ class CowsAnalyzer(Agent):
             template.set_metadata("conversation-id", conversation.conversation_id)
 
             self.agent.add_behaviour(conversation, template)
+            self.agent.command_tracker.start(key, conversation.conversation_id, time.time())
 
 
             print(
@@ -144,6 +412,31 @@ class CowsAnalyzer(Agent):
                 f"(cow={cow_name}, effector={effector}, reason={reason})"
             )
 
+    class BatchRulesBehaviour(PeriodicBehaviour):
+        async def on_start(self):
+            self.rules = default_rules()
+            self.firing = {rule.name: set() for rule in self.rules}
+
+        async def run(self):
+            names, herd = self.agent.herd_matrix()
+            if not names:
+                return
+
+            active = np.fromiter((name not in self.agent.edge_rules for name in names), dtype=bool, count=len(names))
+            # herd to kopia z herd_matrix - można ją liczyć poza pętlą zdarzeń
+            masks = await offload(self.agent.executor, rule_masks, self.rules, herd, active)
+            for rule, mask in zip(self.rules, masks):
+                firing = self.firing[rule.name]
+                previous = np.fromiter((name in firing for name in names), dtype=bool, count=len(names))
+                # zdarzenie tylko dla krów, u których reguła właśnie zaczęła działać
+                for i in np.flatnonzero(mask & ~previous):
+                    sensors = {channel: float(values[i]) for channel, values in herd.items()}
+                    await self.agent.events.put(rule.request(names[i], sensors))
+                    msg = self.agent.watch_hint(names[i])
+                    if msg:
+                        await self.send(msg)
+                self.firing[rule.name] = {names[i] for i in np.flatnonzero(mask)}
+
     class EffectorResponseHandler(CyclicBehaviour):
         async def run(self):
             msg = await self.agent.effector_queue.get()
@@ -167,52 +460,87 @@ class CowsAnalyzer(Agent):
             )
 
             if perf == "agree":
+                self.agent.conversations.transition(cid, AGREED, time.time())
                 return
 
             if perf == "refuse":
                 await self.inform_farmer(conversation, "REFUSED")
+                self.finish(cid, REFUSED)
                 return
 
             if perf == "done":
+                self.finish(cid, DONE)
                 return
 
             if perf == "failure":
                 await self.inform_farmer(conversation, "FAILURE", msg.body)
+                self.finish(cid, FAILED)
                 return
 
+        def finish(self, cid, state):
+            now = time.time()
+            self.agent.conversations.transition(cid, state, now)
+            self.agent.command_tracker.finish(cid, now)
+
 
         async def inform_farmer(self, conversation, status, details=None):
-            msg = Message(to="farmer@xmpp_server")
-            msg.set_metadata("performative", "inform")
+            await self.send(self.agent.farmer_inform(conversation, status, details))
+
+    class LoopLagBehaviour(CyclicBehaviour):
+        async def run(self):
+            # o ile później niż powinien wraca sen - miara zablokowania pętli zdarzeń
+            started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self.agent.loop_lag.record(time.monotonic() - started - LOOP_LAG_INTERVAL)
 
-            msg.body = json.dumps({
-                "cow_name": conversation["cow_name"],
-                "effector": conversation["effector"],
-                "status": status,
-                "reason": conversation["reason"],
-                "details": details,
-                "timestamp": datetime.utcnow().isoformat()
-            })
+    class ConversationTimeoutBehaviour(PeriodicBehaviour):
+        async def run(self):
+            now = time.time()
+            for cid, conversation in self.agent.conversations.expire(now):
+                self.agent.command_tracker.finish(cid, now)
+                details = f"No reply from effector (state: {conversation['timed_out_in']})"
+                await self.send(self.agent.farmer_inform(conversation, "TIMEOUT", details))
 
-            await self.send(msg)
+    def farmer_inform(self, conversation, status, details=None):
+        msg = Message(to="farmer@xmpp_server")
+        msg.set_metadata("performative", "inform")
 
-            print(
-                f"[Farmer] cow={conversation['cow_name']} "
-                f"effector={conversation['effector']} "
-                f"status={status}"
-            )
+        encode_body(msg, {
+            "cow_name": conversation["cow_name"],
+            "effector": conversation["effector"],
+            "status": status,
+            "reason": conversation["reason"],
+            "details": details,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+        print(
+            f"[Farmer] cow={conversation['cow_name']} "
+            f"effector={conversation['effector']} "
+            f"status={status}"
+        )
+        return msg
 
     async def setup(self) -> None:
+        # agregatory subskrybują naszą obecność, żeby wiedzieć, kiedy buforować profile
+        self.presence.approve_all = True
+        if self.wal is not None:
+            self.restore_history()
+            self.add_behaviour(self.FlushHistoryBehaviour(period=HISTORY_FLUSH_PERIOD), no_messages())
         self.add_behaviour(self.MessageRouterBehaviour())
-        self.add_behaviour(self.ProfileConsumerBehaviour())
-        self.add_behaviour(self.AnalyzeProfilesBehaviour())
-        self.add_behaviour(self.EffectorResponseHandler())
-        self.add_behaviour(PeriodicReportBehaviour(period=15))
+        self.add_behaviour(self.ProfileConsumerBehaviour(), no_messages())
+        self.add_behaviour(self.AnalyzeProfilesBehaviour(), no_messages())
+        self.add_behaviour(self.EffectorResponseHandler(), no_messages())
+        self.add_behaviour(PeriodicReportBehaviour(period=15), no_messages())
+        self.add_behaviour(self.ConversationTimeoutBehaviour(period=1), no_messages())
+        self.add_behaviour(self.LoopLagBehaviour(), no_messages())
+        if RULE_BATCH_PERIOD > 0:
+            self.add_behaviour(self.BatchRulesBehaviour(period=RULE_BATCH_PERIOD), no_messages())
 
 
 class EffectorConversation(OneShotBehaviour):
 
-    def __init__(self, cow_name, effector, turn_on, reason):
+    def __init__(self, cow_name, effector, turn_on, reason, host_jid=None):
         super().__init__()
 
         self.cow_name = cow_name
@@ -222,17 +550,17 @@ class EffectorConversation(OneShotBehaviour):
 
         self.conversation_id = str(uuid.uuid4())
 
-        self.effector_jid = f"effector-{effector}-{cow_name}@xmpp_server"
+        self.effector_jid = host_jid or f"effector-{effector}-{cow_name}@xmpp_server"
         self.farmer_jid = "farmer@xmpp_server"
 
     async def run(self):
-        self.agent.conversations[self.conversation_id] = {
+        self.agent.conversations.start(self.conversation_id, {
             "cow_name": self.cow_name,
             "effector": self.effector,
             "turn_on": self.turn_on,
             "reason": self.reason,
             "started_at": datetime.utcnow().isoformat()
-        }
+        }, time.time())
         await self.send_request()
 
 
@@ -241,8 +569,9 @@ class EffectorConversation(OneShotBehaviour):
         msg = Message(to=self.effector_jid)
         msg.set_metadata("performative", "request")
         msg.set_metadata("conversation-id", self.conversation_id)
+        msg.set_metadata("device", self.effector)
 
-        msg.body = json.dumps({
+        encode_body(msg, {
             "cow_name": self.cow_name,
             "turn_on": self.turn_on,
             "reason": self.reason,
@@ -258,162 +587,89 @@ class EffectorConversation(OneShotBehaviour):
 class PeriodicReportBehaviour(PeriodicBehaviour):
 
     async def run(self):
-        report = self.build_report()
+        # w pętli tylko zebranie migawek okien; złożenie raportu i kodowanie idą do executora
+        now = datetime.utcnow()
+        window = {"from": (now - REPORT_WINDOW).isoformat(), "to": now.isoformat()}
+        # w trybie różnicowym okno idzie raz na raport, a nie przy każdym wpisie
+        report = await offload(
+            self.agent.executor, render_report,
+            self.collect_stats(), None if DELTA_REPORTS else window
+        )
 
-        msg = Message(to="farmer@xmpp_server")
-        msg.set_metadata("performative", "inform")
+        if ANALYZER_SHARDS > 0 and SHARD_INDEX != PRIMARY_SHARD:
+            await self.send_to_primary(report)
+            return
+        report = merge_shard_reports(report, self.agent.shard_reports, time.time(), SHARD_REPORT_MAX_AGE)
 
-        msg.body = json.dumps({
+        payload = {
             "type": "PERIODIC_REPORT",
             "timestamp": datetime.utcnow().isoformat(),
             "report": report
+        }
+        if DELTA_REPORTS:
+            payload.update(self.agent.delta_reporter.encode(report, window))
+        chunks, size = await self.send_chunked("farmer@xmpp_server", payload)
+
+        print(f"[Report] Periodic report sent to farmer ({payload.get('mode', 'full')}, {chunks} chunks, {size} bytes)")
+        print(f"[Report] {payload['report']}")
+        print(f"[LoopLag] {self.agent.loop_lag.stats()}")
+        print(f"[Events] {self.agent.events.stats()}")
+        print(f"[Commands] {self.agent.command_tracker.stats()}")
+        self.agent.loop_lag.reset()
+
+    async def send_to_primary(self, report):
+        chunks, _ = await self.send_chunked(shard_jid(PRIMARY_SHARD), {
+            "type": "SHARD_REPORT",
+            "shard": SHARD_INDEX,
+            "report": report
         })
+        print(f"[Report] Shard report with {len(report)} cows sent to {shard_jid(PRIMARY_SHARD)} in {chunks} chunks")
+
+    async def send_chunked(self, to, payload):
+        # po REPORT_CHUNK wpisów na wiadomość - rozmiar stanzy nie rośnie z wielkością stada
+        parts = list(split_report(payload, REPORT_CHUNK, str(uuid.uuid4())))
+        size = 0
+        for part in parts:
+            msg = Message(to=to)
+            msg.set_metadata("performative", "inform")
+            set_body(msg, await offload(self.agent.executor, CODEC.encode, part))
+            await self.send(msg)
+            size += len(msg.body)
+        return len(parts), size
 
-        await self.send(msg)
-
-        print("[Report] Periodic report sent to farmer")
-        print(f"[Report] {report}")
-
-    def build_report(self):
-        report = {}
-
-        now = datetime.utcnow()
-        window_start = now - timedelta(hours=6)
-
-        history = self.agent.data["cows"]["history"]
-
-        for cow_name, profiles in history.items():
-            recent = [
-                p for p in profiles
-                if datetime.fromisoformat(p["timestamp"]) >= window_start
-            ]
+    def collect_stats(self):
+        stats = {}
+        now_epoch = time.time()
 
-            if not recent:
+        for cow_name, rolling in self.agent.rolling.items():
+            rolling.expire(now_epoch)
+            snapshot = rolling.snapshot()
+            if snapshot["temperature"] is None:
                 continue
+            stats[cow_name] = (snapshot, self.agent.link_monitor.stats(cow_name))
 
-            def stats(values):
-                return {
-                    "last": values[-1],
-                    "avg": sum(values) / len(values),
-                    "min": min(values),
-                    "max": max(values),
-                }
-
-            temps = [p["sensors"]["temperature"] for p in recent]
-            phs   = [p["sensors"]["pH"] for p in recent]
-            acts  = [p["sensors"]["activity"] for p in recent]
-            pulses = [p["sensors"]["pulse"] for p in recent]
-
-            report[cow_name] = {
-                "temperature": stats(temps),
-                "pH": stats(phs),
-                "activity": stats(acts),
-                "pulse": stats(pulses),
-                "samples": len(recent),
-                "from": window_start.isoformat(),
-                "to": now.isoformat(),
-            }
-
-        return report
-
-
-class AnalysisRule:
-    name = "BASE"
-    def analyze(self, cow_name, history):
-        raise NotImplementedError
-
-class FeverAnalysis(AnalysisRule):
-    name = "FEVER"
-
-    def analyze(self, cow_name, history):
-        if len(history) < HISTORY_DEPTH:
-            return None
-
-        temps = [
-            p["sensors"]["temperature"]
-            for p in history[-HISTORY_DEPTH:]
-        ]
+        return stats
 
-        if all(t > 40.0 for t in temps):
-            return {
-                "type": "EFFECTOR_REQUEST",
-                "cow_name": cow_name,
-                "effector": "sprinkler",
-                "reason": "fever",
-                "turn_on": "True",
-                "details": f"Fever. Cow's temperature is {temps[-1]} deg Celsius."
-            }
-
-        return None
-
-class OverheatingAnalysis(AnalysisRule):
-    name = "OVERHEATING"
-
-    def analyze(self, cow_name, history):
-        if len(history) < HISTORY_DEPTH:
-            return None
-
-        temps = [
-            p["sensors"]["temperature"]
-            for p in history[-HISTORY_DEPTH:]
-        ]
-
-        if all(t > 39.0 for t in temps):
-            return {
-                "type": "EFFECTOR_REQUEST",
-                "cow_name": cow_name,
-                "effector": "fan",
-                "reason": "overheating",
-                "turn_on": "True",
-                "details": f"Overheating. Cow's temperature is {temps[-1]} deg Celsius"
-            }
-
-        return None
-
-class StressAnalysis(AnalysisRule):
-    name = "STRESS"
 
-    def analyze(self, cow_name, history):
-        if len(history) < HISTORY_DEPTH:
-            return None
-
-        pulses = [
-            p["sensors"]["pulse"]
-            for p in history[-HISTORY_DEPTH:]
-        ]
-
-        activity = history[-1]["sensors"]["activity"]
-
-        if sum(pulses) / len(pulses) > 90 and activity > 0.2:
-            return {
-                "type": "EFFECTOR_REQUEST",
-                "cow_name": cow_name,
-                "effector": "brush",
-                "reason": "stress",
-                "turn_on": "True",
-                "details": f"Stress. Cow's pulse: {pulses[-1]} and activity: {activity} are high."
-            }
+def render_report(stats, window=None):
+    report = {}
 
-        return None
-
-class HungerAnalysis(AnalysisRule):
-    name = "HUNGER"
-
-    def analyze(self, cow_name, history):
-        if len(history) < HISTORY_DEPTH:
-            return None
+    for cow_name, (snapshot, link) in stats.items():
+        report[cow_name] = {
+            "temperature": snapshot["temperature"],
+            "pH": snapshot["pH"],
+            "activity": snapshot["activity"],
+            "pulse": snapshot["pulse"],
+            "samples": snapshot["temperature"]["count"],
+            "link": link,
+        }
+        if window:
+            report[cow_name].update(window)
 
-        ph = history[-1]["sensors"]["pH"]
-        activity = history[-1]["sensors"]["activity"]
+    return report
 
-        if ph < 6.0 and activity > 0.2:
-            return {
-                "type": "EFFECTOR_REQUEST",
-                "cow_name": cow_name,
-                "effector": "feeder",
-                "reason": "hunger",
-                "turn_on": "True",
-                "details": f"The cow is probably hungry. Cow's ph: {ph} and activity: {activity} are low."
-            }
 
-        return None
+def rule_masks(rules, herd, active):
+    # NaN (brak odczytu) nie spełnia żadnego progu
+    with np.errstate(invalid="ignore"):
+        return [np.asarray(rule.condition(herd), dtype=bool) & active for rule in rules]
@@ -0,0 +1,149 @@
+from collections import deque
+
+from agents.summary import reading_summary
+
+# okno dzielone na tyle kubełków stałej szerokości (dla 6 h - minutowe) - pamięć nie zależy od liczby próbek
+BUCKETS = 360
+
+
+class RollingStats:
+    def __init__(self, span, buckets=BUCKETS):
+        self.span = span
+        self.width = span / buckets
+        # kubełki [indeks, count, sum, sum_squares, min, max] rosnąco po indeksie
+        self.buckets = deque()
+        # kolejki monotoniczne (indeks kubełka, wartość): minimums rosnąco, maximums malejąco -
+        # czoło to minimum/maksimum okna
+        self.minimums = deque()
+        self.maximums = deque()
+        self.count = 0
+        self.sum = 0.0
+        self.sum_squares = 0.0
+        self.last = None
+        self.last_timestamp = None
+
+    def add(self, timestamp, part):
+        index = self.insert(timestamp, part)
+        if index == self.buckets[-1][0]:
+            bucket = self.buckets[-1]
+            push_extreme(self.minimums, index, bucket[4], lambda kept, new: kept >= new)
+            push_extreme(self.maximums, index, bucket[5], lambda kept, new: kept <= new)
+        else:
+            # próbka do starszego kubełka - kolejki min/max budujemy od nowa
+            self.rebuild_extremes()
+        self.expire(self.last_timestamp)
+
+    def merge(self, entries):
+        # zaległe próbki dokładamy do ich kubełków, a kolejki min/max budujemy raz na całe scalenie
+        if not entries:
+            return
+        for timestamp, part in entries:
+            self.insert(timestamp, part)
+        self.rebuild_extremes()
+        self.expire(self.last_timestamp)
+
+    def insert(self, timestamp, part):
+        count = part["count"]
+        total = part["sum"]
+        sum_squares = part["var"] * count + total * total / count
+        index = int(timestamp // self.width)
+        bucket = self.bucket(index)
+        bucket[1] += count
+        bucket[2] += total
+        bucket[3] += sum_squares
+        bucket[4] = min(bucket[4], part["min"])
+        bucket[5] = max(bucket[5], part["max"])
+        self.count += count
+        self.sum += total
+        self.sum_squares += sum_squares
+        if self.last_timestamp is None or timestamp >= self.last_timestamp:
+            self.last = part["last"]
+            self.last_timestamp = timestamp
+        return index
+
+    def bucket(self, index):
+        # nowe próbki trafiają do ostatniego kubełka, zaległe szukamy od końca
+        position = len(self.buckets)
+        while position and self.buckets[position - 1][0] > index:
+            position -= 1
+        if position and self.buckets[position - 1][0] == index:
+            return self.buckets[position - 1]
+        bucket = [index, 0, 0.0, 0.0, float("inf"), float("-inf")]
+        self.buckets.insert(position, bucket)
+        return bucket
+
+    def rebuild_extremes(self):
+        self.minimums.clear()
+        self.maximums.clear()
+        for index, _, _, _, minimum, maximum in self.buckets:
+            push_extreme(self.minimums, index, minimum, lambda kept, new: kept >= new)
+            push_extreme(self.maximums, index, maximum, lambda kept, new: kept <= new)
+
+    def expire(self, now):
+        # kubełek wypada, gdy cały jest starszy niż okno - okno ma od span do span + width
+        cutoff = (now - self.span) // self.width
+        while self.buckets and self.buckets[0][0] < cutoff:
+            _, count, total, sum_squares, _, _ = self.buckets.popleft()
+            self.count -= count
+            self.sum -= total
+            self.sum_squares -= sum_squares
+        while self.minimums and self.minimums[0][0] < cutoff:
+            self.minimums.popleft()
+        while self.maximums and self.maximums[0][0] < cutoff:
+            self.maximums.popleft()
+        if not self.buckets:
+            self.count = 0
+            self.sum = 0.0
+            self.sum_squares = 0.0
+
+    def snapshot(self):
+        if not self.count:
+            return None
+        avg = self.sum / self.count
+        return {
+            "last": self.last,
+            "avg": avg,
+            "min": self.minimums[0][1],
+            "max": self.maximums[0][1],
+            "var": max(0.0, self.sum_squares / self.count - avg * avg),
+            "count": self.count
+        }
+
+
+def push_extreme(extremes, index, value, dominated):
+    # wartość ostatniego kubełka mogła się tylko poprawić - zastępuje jego poprzedni wpis
+    while extremes and (extremes[-1][0] == index or dominated(extremes[-1][1], value)):
+        extremes.pop()
+    extremes.append((index, value))
+
+
+class RollingProfile:
+    def __init__(self, channels, span):
+        self.channels = {channel: RollingStats(span) for channel in channels}
+
+    def add(self, timestamp, profile):
+        for channel, part in self.parts(profile):
+            self.channels[channel].add(timestamp, part)
+
+    def merge(self, entries):
+        parts = {channel: [] for channel in self.channels}
+        for timestamp, profile in entries:
+            for channel, part in self.parts(profile):
+                parts[channel].append((timestamp, part))
+        for channel, stats in self.channels.items():
+            stats.merge(parts[channel])
+
+    def parts(self, profile):
+        summary = profile.get("summary", {})
+        for channel in self.channels:
+            if channel in summary:
+                yield channel, summary[channel]
+            elif profile["sensors"].get(channel) is not None:
+                yield channel, reading_summary(profile["sensors"][channel])
+
+    def expire(self, now):
+        for stats in self.channels.values():
+            stats.expire(now)
+
+    def snapshot(self):
+        return {channel: stats.snapshot() for channel, stats in self.channels.items()}
@@ -0,0 +1,18 @@
+class RuleIndex:
+    def __init__(self, rules):
+        self.rules = rules
+        # kanał -> reguły, które go czytają
+        self.by_channel = {}
+        for rule in rules:
+            for channel in rule.channels:
+                self.by_channel.setdefault(channel, []).append(rule)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def affected(self, channels):
+        # bez informacji o zmienionych kanałach liczymy wszystko
+        if channels is None:
+            return self.rules
+        names = {rule.name for channel in channels for rule in self.by_channel.get(channel, ())}
+        return [rule for rule in self.rules if rule.name in names]
@@ -0,0 +1,149 @@
+HISTORY_DEPTH = 1
+
+
+class AnalysisRule:
+    name = "BASE"
+    # kanały czujników czytane przez regułę - analizator liczy ją tylko, gdy któryś się zmienił
+    channels = ()
+    def analyze(self, cow_name, history):
+        raise NotImplementedError
+
+    # warunek na ostatnich odczytach - działa zarówno dla liczb, jak i dla kolumn NumPy całego stada
+    def condition(self, readings):
+        raise NotImplementedError
+
+    def request(self, cow_name, sensors):
+        raise NotImplementedError
+
+class FeverAnalysis(AnalysisRule):
+    name = "FEVER"
+    channels = ("temperature",)
+
+    def analyze(self, cow_name, history):
+        if len(history) < HISTORY_DEPTH:
+            return None
+
+        temps = [
+            p["sensors"]["temperature"]
+            for p in history[-HISTORY_DEPTH:]
+        ]
+
+        if all(t > 40.0 for t in temps):
+            return self.request(cow_name, history[-1]["sensors"])
+
+        return None
+
+    def condition(self, readings):
+        return readings["temperature"] > 40.0
+
+    def request(self, cow_name, sensors):
+        return {
+            "type": "EFFECTOR_REQUEST",
+            "cow_name": cow_name,
+            "effector": "sprinkler",
+            "reason": "fever",
+            "turn_on": "True",
+            "details": f"Fever. Cow's temperature is {sensors['temperature']} deg Celsius."
+        }
+
+class OverheatingAnalysis(AnalysisRule):
+    name = "OVERHEATING"
+    channels = ("temperature",)
+
+    def analyze(self, cow_name, history):
+        if len(history) < HISTORY_DEPTH:
+            return None
+
+        temps = [
+            p["sensors"]["temperature"]
+            for p in history[-HISTORY_DEPTH:]
+        ]
+
+        if all(t > 39.0 for t in temps):
+            return self.request(cow_name, history[-1]["sensors"])
+
+        return None
+
+    def condition(self, readings):
+        return readings["temperature"] > 39.0
+
+    def request(self, cow_name, sensors):
+        return {
+            "type": "EFFECTOR_REQUEST",
+            "cow_name": cow_name,
+            "effector": "fan",
+            "reason": "overheating",
+            "turn_on": "True",
+            "details": f"Overheating. Cow's temperature is {sensors['temperature']} deg Celsius"
+        }
+
+class StressAnalysis(AnalysisRule):
+    name = "STRESS"
+    channels = ("pulse", "activity")
+
+    def analyze(self, cow_name, history):
+        if len(history) < HISTORY_DEPTH:
+            return None
+
+        pulses = [
+            p["sensors"]["pulse"]
+            for p in history[-HISTORY_DEPTH:]
+        ]
+
+        activity = history[-1]["sensors"]["activity"]
+
+        if sum(pulses) / len(pulses) > 90 and activity > 0.2:
+            return self.request(cow_name, history[-1]["sensors"])
+
+        return None
+
+    def condition(self, readings):
+        return (readings["pulse"] > 90) & (readings["activity"] > 0.2)
+
+    def request(self, cow_name, sensors):
+        return {
+            "type": "EFFECTOR_REQUEST",
+            "cow_name": cow_name,
+            "effector": "brush",
+            "reason": "stress",
+            "turn_on": "True",
+            "details": f"Stress. Cow's pulse: {sensors['pulse']} and activity: {sensors['activity']} are high."
+        }
+
+class HungerAnalysis(AnalysisRule):
+    name = "HUNGER"
+    channels = ("pH", "activity")
+
+    def analyze(self, cow_name, history):
+        if len(history) < HISTORY_DEPTH:
+            return None
+
+        ph = history[-1]["sensors"]["pH"]
+        activity = history[-1]["sensors"]["activity"]
+
+        if ph < 6.0 and activity > 0.2:
+            return self.request(cow_name, history[-1]["sensors"])
+
+        return None
+
+    def condition(self, readings):
+        return (readings["pH"] < 6.0) & (readings["activity"] > 0.2)
+
+    def request(self, cow_name, sensors):
+        return {
+            "type": "EFFECTOR_REQUEST",
+            "cow_name": cow_name,
+            "effector": "feeder",
+            "reason": "hunger",
+            "turn_on": "True",
+            "details": f"The cow is probably hungry. Cow's ph: {sensors['pH']} and activity: {sensors['activity']} are low."
+        }
+
+
+def default_rules():
+    return [
+        FeverAnalysis(),
+        OverheatingAnalysis(),
+        StressAnalysis(),
+        HungerAnalysis()
+    ]
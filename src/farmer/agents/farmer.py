@@ -1,10 +1,13 @@
 import os
-import json
 from datetime import datetime, timedelta
 from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour, PeriodicBehaviour
 from spade.message import Message
 
+from agents.codec import decode_body, encode_body
+from agents.report_state import ReportState
+from agents.shard_ring import analyzer_jid
+
 
 class FarmerAgent(Agent):
     def __init__(self):
@@ -12,6 +15,8 @@ class FarmerAgent(Agent):
 
         self.last_reports = {"spatial": None, "cow": None}
         self.last_sources = {"spatial": None, "cow": None}
+        # raporty różnicowe składamy tutaj; last_reports to zawsze pełny obraz
+        self.report_states = {"spatial": ReportState(), "cow": ReportState()}
 
         self.last_command = {}
         self.command_log = []
@@ -54,9 +59,9 @@ class FarmerAgent(Agent):
         if not self._should_send(key, bool(turn_on), cooldown_s=30):
             return
 
-        msg = Message(to="cows-analyzer@xmpp_server")
+        msg = Message(to=analyzer_jid(cow_name))
         msg.set_metadata("performative", "request")
-        msg.body = json.dumps({
+        encode_body(msg, {
             "type": "FARMER_EFFECTOR_REQUEST",
             "scope": "cow",
             "cow_name": cow_name,
@@ -83,7 +88,7 @@ class FarmerAgent(Agent):
 
         msg = Message(to="spacial-analyzer@xmpp_server")
         msg.set_metadata("performative", "request")
-        msg.body = json.dumps({
+        encode_body(msg, {
             "type": "FARMER_EFFECTOR_REQUEST",
             "scope": "room",
             "room_part_name": room_part_name,
@@ -183,7 +188,7 @@ class FarmerAgent(Agent):
                 return
 
             try:
-                payload = json.loads(msg.body) if msg.body else {}
+                payload = decode_body(msg) if msg.body else {}
             except Exception:
                 return
 
@@ -203,21 +208,40 @@ class FarmerAgent(Agent):
                 return
 
             sender = str(msg.sender)
-            report = payload.get("report")
             ts = payload.get("timestamp")
 
             if "spatial-analyzer" in sender or "spacial-analyzer" in sender:
+                report = await self.apply_report("spatial", payload, msg.sender)
+                if report is None:
+                    return
                 self.agent.last_reports["spatial"] = report
                 self.agent.last_sources["spatial"] = ts
-                print(self.agent.narrate_spatial(report, ts))
+                # rysujemy tylko wpisy, które właśnie przyszły - przy kawałkach tabela rośnie po kolei
+                print(self.agent.narrate_spatial(payload.get("report") or {}, ts))
                 return
 
             if "cow-analyzer" in sender or "cows-analyzer" in sender:
+                report = await self.apply_report("cow", payload, msg.sender)
+                if report is None:
+                    return
                 self.agent.last_reports["cow"] = report
                 self.agent.last_sources["cow"] = ts
-                print(self.agent.narrate_cows(report, ts))
+                # rysujemy tylko wpisy, które właśnie przyszły - przy kawałkach tabela rośnie po kolei
+                print(self.agent.narrate_cows(payload.get("report") or {}, ts))
                 return
 
+        async def apply_report(self, kind, payload, sender):
+            state = self.agent.report_states[kind]
+            if state.apply(payload):
+                msg = Message(to=str(sender).split("/")[0])
+                msg.set_metadata("performative", "request")
+                encode_body(msg, {"type": "REPORT_RESYNC", "timestamp": datetime.utcnow().isoformat()})
+                await self.send(msg)
+                print(f"[Farmer] Gap in {kind} reports, resync requested")
+            if state.awaiting_full:
+                return None
+            return state.report
+
     class PeriodicControl(PeriodicBehaviour):
         async def run(self):
             # Tu nie musimy drukować "START CYKLU", bo tabelki będą się pojawiać i tak
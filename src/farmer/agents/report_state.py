@@ -0,0 +1,51 @@
+class ReportState:
+    def __init__(self):
+        self.report = None
+        self.window = None
+        self.seq = None
+        self.awaiting_full = False
+        # raport w trakcie składania z kawałków: id, numer następnego kawałka i nazwy już odebrane
+        self.pending = None
+
+    def apply(self, payload):
+        # zwraca True, gdy po luce w numeracji trzeba poprosić nadawcę o pełny raport
+        mode = payload.get("mode")
+        chunk = payload.get("chunk", 0)
+        if chunk == 0:
+            if mode == "delta" and (self.report is None or self.seq is None or payload["seq"] != self.seq + 1):
+                # delta bez poprzedniczki - do pełnego raportu ignorujemy kolejne delty
+                return self.gap(mode)
+            self.pending = {"report_id": payload.get("report_id"), "next": 0, "names": set()}
+            if self.report is None:
+                self.report = {}
+        elif self.pending is None or payload.get("report_id") != self.pending["report_id"] or chunk != self.pending["next"]:
+            return self.gap(mode)
+
+        # kawałki nanosimy od razu - widok odświeża się, zanim przyjdzie reszta raportu
+        self.pending["next"] = chunk + 1
+        self.pending["names"].update(payload["report"])
+        self.report.update(payload["report"])
+        for name in payload.get("removed", []):
+            self.report.pop(name, None)
+        if chunk + 1 < payload.get("total", 1):
+            return False
+
+        if mode != "delta":
+            # pełny raport: znika wszystko, czego w nim nie było
+            for name in [name for name in self.report if name not in self.pending["names"]]:
+                del self.report[name]
+        self.pending = None
+        self.seq = payload.get("seq")
+        self.window = payload.get("window")
+        self.awaiting_full = False
+        return False
+
+    def gap(self, mode):
+        self.pending = None
+        if mode is None:
+            # raporty bez numeracji są zawsze pełne - wystarczy poczekać na następny
+            return False
+        request = not self.awaiting_full
+        self.seq = None
+        self.awaiting_full = True
+        return request
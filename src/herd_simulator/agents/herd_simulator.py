@@ -0,0 +1,69 @@
+import os
+
+import numpy as np
+from spade.agent import Agent
+from spade.behaviour import PeriodicBehaviour
+from spade.message import Message
+
+from agents.codec import encode_body
+from agents.shard_ring import split_by_analyzer
+
+
+class Herd:
+    def __init__(self, size, prefix, seed=None):
+        self.names = [f"{prefix}-{i:05d}" for i in range(size)]
+        self.rng = np.random.default_rng(seed)
+        # te same wartości początkowe co pojedyncze czujniki krowy
+        self.temperature = np.full(size, 40.0)
+        self.pH = np.full(size, 6.5)
+        self.pulse = np.full(size, 60.0)
+        self.activity = np.full(size, 1.0)
+
+    def step(self):
+        size = len(self.names)
+        self.temperature += self.rng.uniform(-0.5, 0.5, size)
+        self.pH += self.rng.uniform(-0.1, 0.1, size)
+        self.pulse += self.rng.uniform(-2, 2, size)
+        self.activity *= self.rng.uniform(0.8, 1.2, size)
+
+    def profiles(self, start, stop):
+        columns = zip(
+            self.names[start:stop],
+            self.temperature[start:stop].tolist(),
+            self.pH[start:stop].tolist(),
+            self.activity[start:stop].tolist(),
+            self.pulse[start:stop].tolist(),
+        )
+        return {
+            name: {"temperature": temperature, "pH": ph, "activity": activity, "pulse": pulse}
+            for name, temperature, ph, activity, pulse in columns
+        }
+
+
+class HerdSimulator(Agent):
+    def __init__(self):
+        self.herd_name = os.getenv("NAME", "herd")
+        self.herd_size = int(os.getenv("HERD_SIZE", "1000"))
+        self.chunk_size = int(os.getenv("HERD_CHUNK", "250"))
+        seed = os.getenv("HERD_SEED")
+        self.herd = Herd(self.herd_size, self.herd_name, int(seed) if seed else None)
+        super().__init__(f"aggregator-{self.herd_name}@xmpp_server", os.getenv("PASSWORD"))
+
+    class SimulateHerd(PeriodicBehaviour):
+        def __init__(self, herd, chunk_size, period=1):
+            super().__init__(period)
+            self.herd = herd
+            self.chunk_size = chunk_size
+
+        async def run(self):
+            self.herd.step()
+            for start in range(0, len(self.herd.names), self.chunk_size):
+                profiles = self.herd.profiles(start, start + self.chunk_size)
+                for analyzer, group in split_by_analyzer(profiles).items():
+                    message = Message(to=analyzer)
+                    message.set_metadata("performative", "inform")
+                    encode_body(message, group)
+                    await self.send(message)
+
+    async def setup(self):
+        self.add_behaviour(self.SimulateHerd(herd=self.herd, chunk_size=self.chunk_size))
@@ -0,0 +1,26 @@
+import asyncio
+import spade
+from agents.herd_simulator import HerdSimulator
+
+
+async def main():
+    herd_simulator = HerdSimulator()
+
+    while True:
+        try:
+            await herd_simulator.start(auto_register=True)
+            print(f"Herd simulator started ({herd_simulator.herd_size} cows)")
+            break
+        except Exception as e:
+            print("XMPP not ready, retrying in 5s:", e)
+            await asyncio.sleep(5)
+
+    with open("/tmp/agent_ready", "w") as f:
+        f.write("ready")
+
+    await spade.wait_until_finished(herd_simulator)
+    print("Agents finished")
+
+
+if __name__ == "__main__":
+    spade.run(main())
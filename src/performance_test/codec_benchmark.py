@@ -0,0 +1,144 @@
+import csv
+import os
+import sys
+import timeit
+from random import seed, uniform
+from xml.sax.saxutils import escape
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(SRC_DIR, "cow"))
+# okno raportu i statystyki łącza liczą te same klasy co analizator
+sys.path.insert(1, os.path.join(SRC_DIR, "cow_analysis"))
+
+from agents.codec import CODECS, JsonCodec  # noqa: E402
+from agents.link_monitor import LinkMonitor  # noqa: E402
+from agents.rolling import RollingProfile  # noqa: E402
+from agents.summary import WindowSummarizer  # noqa: E402
+
+OUT_CSV = "data/codec_summary.csv"
+REPEAT = 2000
+START = 1767225600.0
+COW_CHANNELS = ("temperature", "pH", "activity", "pulse")
+
+
+def cow_readings():
+    return {
+        "temperature": 38.5 + uniform(-1, 1),
+        "pH": 6.5 + uniform(-0.3, 0.3),
+        "activity": uniform(0.5, 1.5),
+        "pulse": 60 + uniform(-10, 10),
+    }
+
+
+def reading(channel, value, seq):
+    # kształt Sensor.stamp
+    return {channel: value, "seq": seq, "timestamp": START + seq}
+
+
+def sources(channels, seq):
+    return {channel: {"first": seq, "seq": seq, "timestamp": START + seq} for channel in channels}
+
+
+def cow_profile(name):
+    # Aggregator.forward_profile: ostatnie wartości, numery odczytów, a przy paczkach podsumowanie
+    summarizer = WindowSummarizer(0, {})
+    for _ in range(10):
+        for channel, value in cow_readings().items():
+            summarizer.add(channel, value)
+    summary = summarizer.flush()
+    profile = {channel: part["last"] for channel, part in summary.items()}
+    profile["summary"] = summary
+    profile["sources"] = sources(COW_CHANNELS, 10)
+    return {name: profile}
+
+
+def space_profile(name, compact):
+    profile = {"temperature": 20.5, "humidity": 51.2, "sources": sources(("temperature", "humidity"), 1)}
+    # w trybie kompaktowym pozycja idzie raz, w SESSION_HELLO
+    if not compact:
+        profile |= {"position_x": 0.0, "position_y": 0.0}
+    return {name: profile}
+
+
+def report_entry():
+    # render_report z okna kroczącego i statystyk łącza, jak w analizatorze
+    rolling = RollingProfile(COW_CHANNELS, 6 * 3600)
+    link = LinkMonitor(reorder_window=0)
+    for seq in range(1, 601):
+        rolling.add(START + seq, {"sensors": cow_readings()})
+        link.observe("krasula", sources(COW_CHANNELS, seq), START + seq + 0.05)
+    snapshot = rolling.snapshot()
+    return {
+        **{channel: snapshot[channel] for channel in COW_CHANNELS},
+        "samples": snapshot["temperature"]["count"],
+        "link": link.stats("krasula"),
+        "from": "2026-01-01T00:00:00",
+        "to": "2026-01-01T06:00:00",
+    }
+
+
+def payloads(compact):
+    # oba kodeki dostają te same wartości - różnią się tylko tym, czego tryb kompaktowy nie wysyła
+    seed(7)
+    return {
+        "sensor_reading": reading("temperature", 38.5 + uniform(-1, 1), 1),
+        "sensor_batch_10": {"readings": [reading("pulse", 60 + uniform(-2, 2), seq) for seq in range(1, 11)]},
+        "cow_profile": cow_profile("krasula"),
+        "space_profile": space_profile("obora1", compact),
+        "effector_request": {
+            "cow_name": "krasula",
+            "turn_on": "True",
+            "reason": "fever",
+            "timestamp": "2026-01-01T00:00:00.000000",
+        },
+        "report_100_cows": {
+            "type": "PERIODIC_REPORT",
+            "timestamp": "2026-01-01T06:00:00.000000",
+            "report": {f"cow-{i}": report_entry() for i in range(100)},
+        },
+    }
+
+
+def stanza_size(body):
+    stanza = (
+        '<message to="cows-analyzer@xmpp_server" from="aggregator-krasula@xmpp_server/1" type="chat">'
+        f"<body>{escape(body)}</body></message>"
+    )
+    return len(stanza.encode("utf-8"))
+
+
+def main():
+    rows = []
+    by_codec = {codec.name: payloads(compact=codec.name != JsonCodec.name) for codec in CODECS.values()}
+    for payload_name in by_codec[JsonCodec.name]:
+        for codec in CODECS.values():
+            payload = by_codec[codec.name][payload_name]
+            body = codec.encode(payload)
+            encode_us = timeit.timeit(lambda: codec.encode(payload), number=REPEAT) / REPEAT * 1e6
+            decode_us = timeit.timeit(lambda: codec.decode(body), number=REPEAT) / REPEAT * 1e6
+            rows.append({
+                "payload": payload_name,
+                "codec": codec.name,
+                "body_bytes": len(body),
+                "stanza_bytes": stanza_size(body),
+                "encode_us": round(encode_us, 2),
+                "decode_us": round(decode_us, 2),
+            })
+
+    print(f"{'payload':<18} {'codec':<8} {'body':>8} {'stanza':>8} {'enc [us]':>10} {'dec [us]':>10}")
+    for row in rows:
+        print(
+            f"{row['payload']:<18} {row['codec']:<8} {row['body_bytes']:>8} {row['stanza_bytes']:>8} "
+            f"{row['encode_us']:>10} {row['decode_us']:>10}"
+        )
+
+    os.makedirs(os.path.dirname(OUT_CSV), exist_ok=True)
+    with open(OUT_CSV, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+    print("Zapisano:", OUT_CSV)
+
+
+if __name__ == "__main__":
+    main()
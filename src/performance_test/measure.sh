@@ -11,6 +11,13 @@ COW_MEM_SUM=0
 COW_MEM_MAX=0
 COW_SECONDS=0
 
+# --------- analizator krów ---------
+ANALYZER_CPU_SUM=0
+ANALYZER_CPU_MAX=0
+ANALYZER_MEM_SUM=0
+ANALYZER_MEM_MAX=0
+ANALYZER_SECONDS=0
+
 # --------- xmpp ---------
 XMPP_CPU_SUM=0
 XMPP_CPU_MAX=0
@@ -25,6 +32,8 @@ while [ $SECONDS -lt $END ]; do
   # suma w TEJ sekundzie
   COW_CPU_SEC=0
   COW_MEM_SEC=0
+  ANALYZER_CPU_SEC=0
+  ANALYZER_MEM_SEC=0
   XMPP_CPU_SEC=0
   XMPP_MEM_SEC=0
 
@@ -43,7 +52,11 @@ while [ $SECONDS -lt $END ]; do
       continue
     fi
 
-    if [[ "$NAME" == *cow* ]] && [[ "$NAME" != *cow_analyzer* ]]; then
+    if [[ "$NAME" == *cow_analyzer* ]]; then
+      ANALYZER_CPU_SEC=$(echo "$ANALYZER_CPU_SEC + $CPU_VAL" | bc)
+      ANALYZER_MEM_SEC=$(echo "$ANALYZER_MEM_SEC + $MEM_MB" | bc)
+
+    elif [[ "$NAME" == *cow* ]] || [[ "$NAME" == *herd* ]]; then
       COW_CPU_SEC=$(echo "$COW_CPU_SEC + $CPU_VAL" | bc)
       COW_MEM_SEC=$(echo "$COW_MEM_SEC + $MEM_MB" | bc)
 
@@ -65,6 +78,14 @@ while [ $SECONDS -lt $END ]; do
   (( $(echo "$COW_CPU_SEC > $COW_CPU_MAX" | bc -l) )) && COW_CPU_MAX=$COW_CPU_SEC
   (( $(echo "$COW_MEM_SEC > $COW_MEM_MAX" | bc -l) )) && COW_MEM_MAX=$COW_MEM_SEC
 
+  # --- analizator ---
+  ANALYZER_CPU_SUM=$(echo "$ANALYZER_CPU_SUM + $ANALYZER_CPU_SEC" | bc)
+  ANALYZER_MEM_SUM=$(echo "$ANALYZER_MEM_SUM + $ANALYZER_MEM_SEC" | bc)
+  ((ANALYZER_SECONDS++))
+
+  (( $(echo "$ANALYZER_CPU_SEC > $ANALYZER_CPU_MAX" | bc -l) )) && ANALYZER_CPU_MAX=$ANALYZER_CPU_SEC
+  (( $(echo "$ANALYZER_MEM_SEC > $ANALYZER_MEM_MAX" | bc -l) )) && ANALYZER_MEM_MAX=$ANALYZER_MEM_SEC
+
   # --- xmpp ---
   XMPP_CPU_SUM=$(echo "$XMPP_CPU_SUM + $XMPP_CPU_SEC" | bc)
   XMPP_MEM_SUM=$(echo "$XMPP_MEM_SUM + $XMPP_MEM_SEC" | bc)
@@ -80,11 +101,14 @@ done
 COW_CPU_AVG=$(echo "scale=2; $COW_CPU_SUM / $COW_SECONDS" | bc)
 COW_MEM_AVG=$(echo "scale=2; $COW_MEM_SUM / $COW_SECONDS" | bc)
 
+ANALYZER_CPU_AVG=$(echo "scale=2; $ANALYZER_CPU_SUM / $ANALYZER_SECONDS" | bc)
+ANALYZER_MEM_AVG=$(echo "scale=2; $ANALYZER_MEM_SUM / $ANALYZER_SECONDS" | bc)
+
 XMPP_CPU_AVG=$(echo "scale=2; $XMPP_CPU_SUM / $XMPP_SECONDS" | bc)
 XMPP_MEM_AVG=$(echo "scale=2; $XMPP_MEM_SUM / $XMPP_SECONDS" | bc)
 
 # --------- zapis ---------
-OUT="data/summary.csv"
+OUT=${OUT:-data/summary.csv}
 mkdir -p data
 
 if [ ! -f "$OUT" ]; then
@@ -92,4 +116,5 @@ if [ ! -f "$OUT" ]; then
 fi
 
 echo "$COWS_COUNT,cows,$COW_CPU_AVG,$COW_CPU_MAX,$COW_MEM_AVG,$COW_MEM_MAX" >> "$OUT"
+echo "$COWS_COUNT,analyzer,$ANALYZER_CPU_AVG,$ANALYZER_CPU_MAX,$ANALYZER_MEM_AVG,$ANALYZER_MEM_MAX" >> "$OUT"
 echo "$COWS_COUNT,xmpp,$XMPP_CPU_AVG,$XMPP_CPU_MAX,$XMPP_MEM_AVG,$XMPP_MEM_MAX" >> "$OUT"
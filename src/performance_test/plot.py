@@ -16,6 +16,8 @@ df = df.sort_values("cows_count")
 
 cows = df[df["group"] == "cows"]
 xmpp = df[df["group"] == "xmpp"]
+# starsze pomiary nie mają wiersza analizatora
+analyzer = df[df["group"] == "analyzer"]
 
 plt.figure(figsize=(8, 5))
 plt.plot(
@@ -26,6 +28,11 @@ plt.plot(
     xmpp["cows_count"], xmpp["cpu_avg"],
     marker="s", label="XMPP", color="#F2E01D"
 )
+if not analyzer.empty:
+    plt.plot(
+        analyzer["cows_count"], analyzer["cpu_avg"],
+        marker="^", label="analizator", color="#3A6EA5"
+    )
 
 plt.xlabel("Liczba krów")
 plt.ylabel("Średnie zużycie CPU [%]")
@@ -46,6 +53,11 @@ plt.plot(
     xmpp["cows_count"], xmpp["cpu_max"],
     marker="s", label="XMPP", color="#F2E01D"
 )
+if not analyzer.empty:
+    plt.plot(
+        analyzer["cows_count"], analyzer["cpu_max"],
+        marker="^", label="analizator", color="#3A6EA5"
+    )
 
 plt.xlabel("Liczba krów")
 plt.ylabel("Maksymalne zużycie CPU [%]")
@@ -66,6 +78,11 @@ plt.plot(
     xmpp["cows_count"], xmpp["ram_avg"],
     marker="s", label="XMPP", color="#F2E01D"
 )
+if not analyzer.empty:
+    plt.plot(
+        analyzer["cows_count"], analyzer["ram_avg"],
+        marker="^", label="analizator", color="#3A6EA5"
+    )
 
 plt.xlabel("Liczba krów")
 plt.ylabel("Średnie zużycie RAM [MiB]")
@@ -86,6 +103,11 @@ plt.plot(
     xmpp["cows_count"], xmpp["ram_max"],
     marker="s", label="XMPP", color="#F2E01D"
 )
+if not analyzer.empty:
+    plt.plot(
+        analyzer["cows_count"], analyzer["ram_max"],
+        marker="^", label="analizator", color="#3A6EA5"
+    )
 
 plt.xlabel("Liczba krów")
 plt.ylabel("Maksymalne zużycie RAM [MiB]")
@@ -0,0 +1,28 @@
+#!/usr/bin/env bash
+set -e
+
+HERD_LIST=(1000 2500 5000 10000)
+
+
+WARMUP=60
+MEASURE=120
+
+for N in "${HERD_LIST[@]}"; do
+  echo "=============================="
+  echo " Benchmark symulatora stada: $N krów"
+  echo "=============================="
+
+  docker compose --profile herd down -v
+
+  HERD_SIZE=$N docker compose --profile herd up -d --scale cow=0
+
+  echo "Warm-up (${WARMUP}s)..."
+  sleep $WARMUP
+
+  echo "Pomiar (${MEASURE}s)..."
+  OUT=data/herd_summary.csv DURATION=$MEASURE ./measure.sh $N
+
+  docker compose --profile herd down -v
+done
+
+echo "Benchmark zakończony"
@@ -1,4 +1,3 @@
-import json
 import os
 from random import uniform
 from time import sleep
@@ -7,6 +6,8 @@ from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour, OneShotBehaviour
 from spade.message import Message
 
+from agents.codec import decode_body, encode_body
+
 
 class Effector(Agent):
     def __init__(self, type: str):
@@ -85,7 +86,7 @@ class Effector(Agent):
         async def run(self):
             reply = self.message.make_reply()
             reply.set_metadata("performative", "done")
-            reply.body = json.dumps(self.data)
+            encode_body(reply, self.data)
             print(f"[{self.jid}]: success {reply}")
             await self.send(reply)
 
@@ -99,7 +100,7 @@ class Effector(Agent):
 
         async def run(self):
            sleep(self.sleep_time)
-           self.take_action(json.loads(self.message.body))
+           self.take_action(decode_body(self.message))
 
     def refuse(self, message):
         behaviour = self.RefuseRequest(message, self.jid)
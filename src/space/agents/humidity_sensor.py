@@ -4,6 +4,11 @@ from agents.sensor import Sensor
 
 
 class HumiditySensor(Sensor):
+    deadband = 0.02
+    relative_deadband = True
+    normal_band = (None, 53.0)
+    watch_margin = 2.0
+
     def __init__(self):
         super().__init__()
         self.humidity = 50
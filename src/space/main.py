@@ -21,6 +21,7 @@ async def main():
             await humidity_sensor.start(auto_register=True)
             await air_conditioner.start(auto_register=True)
             print("All agents started")
+            aggregator_agent.sensors = [temperature_sensor, humidity_sensor]
             break
         except Exception as e:
             print("XMPP not ready, retrying in 5s:", e)
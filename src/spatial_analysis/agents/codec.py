@@ -0,0 +1,218 @@
+import base64
+import json
+import os
+import struct
+
+SCHEMA_VERSION = 4
+
+# Napisy z tej tabeli (klucze i częste wartości) kodowane są jednym bajtem.
+# Tabelę wolno tylko rozszerzać na końcu, podbijając SCHEMA_VERSION - starsze wiadomości
+# dekodują się wtedy bez zmian.
+SYMBOLS = (
+    "temperature", "pH", "activity", "pulse", "humidity",
+    "position_x", "position_y", "timestamp", "readings", "type",
+    "cow_name", "room_part_name", "effector", "turn_on", "reason",
+    "details", "status", "report", "last", "avg", "min", "max",
+    "samples", "from", "to", "True", "False", "turned_on",
+    "PERIODIC_REPORT", "FARMER_EFFECTOR_REQUEST", "SESSION_HELLO",
+    "SESSION_HELLO_REQUEST", "scope", "cow", "room", "name",
+    # wersja 2
+    "seq", "first", "sources", "received_at", "link", "WATCH_CLOSELY", "duration",
+    # wersja 3
+    "PROFILE_BACKFILL", "channels", "profiles", "summary", "count", "sum", "var",
+)
+SYMBOL_INDEX = {symbol: index for index, symbol in enumerate(SYMBOLS)}
+
+# float32 tylko dla liczb, które odtwarza dokładnie (np. 40.25) - pozostałe idą jako float64, bez zaokrągleń
+INT64_MIN, INT64_MAX = -2 ** 63, 2 ** 63 - 1
+
+MAGIC = 0xFA
+
+NIL, FALSE, TRUE = 0xC0, 0xC2, 0xC3
+FLOAT32, FLOAT64, INT64 = 0xCA, 0xCB, 0xD3
+# wersja 4: liczby całkowite spoza int64 zapisane dziesiętnie, jak w JSON
+BIGINT = 0xD6
+SYMBOL, STR8, STR32 = 0xD4, 0xD9, 0xDB
+ARRAY32, MAP32 = 0xDD, 0xDF
+FIXMAP, FIXARRAY, FIXSTR = 0x80, 0x90, 0xA0
+
+
+class JsonCodec:
+    name = "json"
+
+    def encode(self, payload):
+        return json.dumps(payload)
+
+    def decode(self, body):
+        return json.loads(body)
+
+
+class CompactCodec:
+    name = "compact"
+
+    def encode(self, payload):
+        out = bytearray((MAGIC, SCHEMA_VERSION))
+        self.pack(payload, out)
+        return base64.b64encode(bytes(out)).decode("ascii")
+
+    def decode(self, body):
+        raw = base64.b64decode(body)
+        if len(raw) < 2 or raw[0] != MAGIC:
+            raise ValueError("Not a compact payload")
+        if raw[1] > SCHEMA_VERSION:
+            raise ValueError(f"Unsupported schema version {raw[1]}")
+        value, _ = self.unpack(raw, 2)
+        return value
+
+    def pack(self, value, out):
+        if value is None:
+            out.append(NIL)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, int):
+            if 0 <= value < 0x80:
+                out.append(value)
+            elif INT64_MIN <= value <= INT64_MAX:
+                out.append(INT64)
+                out += struct.pack("<q", value)
+            else:
+                encoded = str(value).encode("ascii")
+                out.append(BIGINT)
+                out += struct.pack("<I", len(encoded))
+                out += encoded
+        elif isinstance(value, float):
+            packed = self.pack_float32(value)
+            if packed is not None:
+                out.append(FLOAT32)
+                out += packed
+            else:
+                out.append(FLOAT64)
+                out += struct.pack("<d", value)
+        elif isinstance(value, str):
+            self.pack_str(value, out)
+        elif isinstance(value, (list, tuple)):
+            self.pack_header(len(value), FIXARRAY, ARRAY32, out)
+            for item in value:
+                self.pack(item, out)
+        elif isinstance(value, dict):
+            self.pack_header(len(value), FIXMAP, MAP32, out)
+            for key, item in value.items():
+                self.pack_str(str(key), out)
+                self.pack(item, out)
+        else:
+            raise TypeError(f"Cannot encode {type(value).__name__}")
+
+    def pack_float32(self, value):
+        try:
+            packed = struct.pack("<f", value)
+        except OverflowError:
+            return None
+        return packed if struct.unpack("<f", packed)[0] == value else None
+
+    def pack_str(self, value, out):
+        index = SYMBOL_INDEX.get(value)
+        if index is not None:
+            out.append(SYMBOL)
+            out.append(index)
+            return
+        encoded = value.encode("utf-8")
+        if len(encoded) < 32:
+            out.append(FIXSTR | len(encoded))
+        elif len(encoded) < 256:
+            out.append(STR8)
+            out.append(len(encoded))
+        else:
+            out.append(STR32)
+            out += struct.pack("<I", len(encoded))
+        out += encoded
+
+    def pack_header(self, size, fixed, large, out):
+        if size < 16:
+            out.append(fixed | size)
+        else:
+            out.append(large)
+            out += struct.pack("<I", size)
+
+    def unpack(self, raw, pos):
+        tag = raw[pos]
+        pos += 1
+        if tag < 0x80:
+            return tag, pos
+        if tag == NIL:
+            return None, pos
+        if tag == TRUE:
+            return True, pos
+        if tag == FALSE:
+            return False, pos
+        if tag == INT64:
+            return struct.unpack_from("<q", raw, pos)[0], pos + 8
+        if tag == BIGINT:
+            size = struct.unpack_from("<I", raw, pos)[0]
+            return int(raw[pos + 4:pos + 4 + size].decode("ascii")), pos + 4 + size
+        if tag == FLOAT32:
+            return struct.unpack_from("<f", raw, pos)[0], pos + 4
+        if tag == FLOAT64:
+            return struct.unpack_from("<d", raw, pos)[0], pos + 8
+        if tag == SYMBOL:
+            return SYMBOLS[raw[pos]], pos + 1
+        if FIXSTR <= tag < FIXSTR + 32:
+            return self.unpack_str(raw, pos, tag - FIXSTR)
+        if tag == STR8:
+            return self.unpack_str(raw, pos + 1, raw[pos])
+        if tag == STR32:
+            return self.unpack_str(raw, pos + 4, struct.unpack_from("<I", raw, pos)[0])
+        if FIXARRAY <= tag < FIXARRAY + 16:
+            return self.unpack_array(raw, pos, tag - FIXARRAY)
+        if tag == ARRAY32:
+            return self.unpack_array(raw, pos + 4, struct.unpack_from("<I", raw, pos)[0])
+        if FIXMAP <= tag < FIXMAP + 16:
+            return self.unpack_map(raw, pos, tag - FIXMAP)
+        if tag == MAP32:
+            return self.unpack_map(raw, pos + 4, struct.unpack_from("<I", raw, pos)[0])
+        raise ValueError(f"Unknown tag {tag:#x}")
+
+    def unpack_str(self, raw, pos, size):
+        return raw[pos:pos + size].decode("utf-8"), pos + size
+
+    def unpack_array(self, raw, pos, size):
+        items = []
+        for _ in range(size):
+            item, pos = self.unpack(raw, pos)
+            items.append(item)
+        return items, pos
+
+    def unpack_map(self, raw, pos, size):
+        items = {}
+        for _ in range(size):
+            key, pos = self.unpack(raw, pos)
+            items[key], pos = self.unpack(raw, pos)
+        return items, pos
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), CompactCodec())}
+CODEC = CODECS[os.getenv("CODEC", "json")]
+
+
+def is_compact():
+    return CODEC.name != JsonCodec.name
+
+
+def encode_body(message, payload):
+    set_body(message, CODEC.encode(payload))
+
+
+def set_body(message, body):
+    # body zakodowane wcześniej przez CODEC.encode, np. poza pętlą zdarzeń
+    message.body = body
+    message.set_metadata("encoding", CODEC.name)
+    message.set_metadata("schema", str(SCHEMA_VERSION))
+
+
+def decode_body(message):
+    encoding = message.get_metadata("encoding") or JsonCodec.name
+    codec = CODECS.get(encoding)
+    if codec is None:
+        raise ValueError(f"Unknown encoding {encoding}")
+    return codec.decode(message.body)
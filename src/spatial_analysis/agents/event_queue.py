@@ -0,0 +1,50 @@
+import asyncio
+from collections import deque
+
+
+def merge_channels(queued, new):
+    if queued is None or new is None:
+        return None
+    return list(dict.fromkeys(queued + new))
+
+
+class CoalescingQueue:
+    def __init__(self, key):
+        # pole zdarzenia PROFILE_UPDATED identyfikujące krowę / część pomieszczenia
+        self.key = key
+        self.items = deque()
+        self.pending = {}
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+
+    def qsize(self):
+        return len(self.items)
+
+    def stats(self):
+        return {"depth": len(self.items), "coalesced": self.coalesced}
+
+    async def put(self, event):
+        self.put_nowait(event)
+
+    def put_nowait(self, event):
+        if event["type"] == "PROFILE_UPDATED":
+            entity = event[self.key]
+            queued = self.pending.get(entity)
+            if queued is not None:
+                # reguły i tak czytają najnowszą historię - wystarczy poszerzyć listę zmienionych kanałów
+                queued["channels"] = merge_channels(queued.get("channels"), event.get("channels"))
+                self.coalesced += 1
+                return
+            event = dict(event)
+            self.pending[entity] = event
+        self.items.append(event)
+        self.ready.set()
+
+    async def get(self):
+        while not self.items:
+            self.ready.clear()
+            await self.ready.wait()
+        event = self.items.popleft()
+        if event["type"] == "PROFILE_UPDATED":
+            del self.pending[event[self.key]]
+        return event
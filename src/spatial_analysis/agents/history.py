@@ -0,0 +1,132 @@
+from datetime import datetime, timezone
+
+import numpy as np
+
+INITIAL_ROWS = 64
+
+
+class Series:
+    def __init__(self, channels, capacity, retention=None):
+        self.channels = channels
+        self.index = {channel: i for i, channel in enumerate(channels)}
+        self.capacity = capacity
+        # retencja w sekundach względem najnowszego wpisu (None = tylko limit liczby wpisów)
+        self.retention = retention
+        # kolumny: znaczniki czasu epoch (float64) i kanały czujników (float32, NaN = brak odczytu)
+        self.timestamps = np.empty(INITIAL_ROWS, dtype=np.float64)
+        self.values = np.full((INITIAL_ROWS, len(channels)), np.nan, dtype=np.float32)
+        self.start = 0
+        self.end = 0
+
+    def __len__(self):
+        return self.end - self.start
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("series index out of range")
+        return self.profile(self.start + index)
+
+    def append(self, timestamp, sensors):
+        if self.end == len(self.timestamps):
+            self.make_room()
+        self.timestamps[self.end] = timestamp
+        self.values[self.end] = self.row(sensors)
+        self.end += 1
+        self.expire(timestamp)
+
+    def row(self, sensors):
+        row = np.full(len(self.channels), np.nan, dtype=np.float32)
+        for channel, value in sensors.items():
+            i = self.index.get(channel)
+            if i is not None and value is not None:
+                row[i] = value
+        return row
+
+    def make_room(self):
+        # wiersze starsze niż start są już nieważne - przy połowie zajętości wystarczy je zsunąć,
+        # inaczej podwajamy bufor (koszt zamortyzowany O(1) na wpis)
+        size = len(self)
+        allocated = len(self.timestamps)
+        if size * 2 > allocated:
+            allocated *= 2
+        timestamps = np.empty(allocated, dtype=np.float64)
+        values = np.full((allocated, len(self.channels)), np.nan, dtype=np.float32)
+        timestamps[:size] = self.timestamps[self.start:self.end]
+        values[:size] = self.values[self.start:self.end]
+        self.timestamps, self.values = timestamps, values
+        self.start, self.end = 0, size
+
+    def expire(self, now):
+        self.start = max(self.start, self.end - self.capacity)
+        if self.retention is not None:
+            self.start += int(np.searchsorted(self.timestamps[self.start:self.end], now - self.retention))
+
+    def profile(self, i):
+        return {
+            "timestamp": datetime.fromtimestamp(self.timestamps[i], timezone.utc).isoformat(),
+            "sensors": self.sensors(i)
+        }
+
+    def sensors(self, i):
+        return {
+            channel: float(self.values[i, j])
+            for j, channel in enumerate(self.channels)
+            if not np.isnan(self.values[i, j])
+        }
+
+    def tail(self, count):
+        # ostatnie wiersze jako kolumny kanałów - reguły liczą na nich bez składania słowników profili
+        rows = self.values[max(self.start, self.end - count):self.end]
+        return {channel: rows[:, j] for j, channel in enumerate(self.channels)}
+
+    def replace(self, timestamps, values):
+        size = len(timestamps)
+        allocated = max(INITIAL_ROWS, 2 * size)
+        self.timestamps = np.empty(allocated, dtype=np.float64)
+        self.values = np.full((allocated, len(self.channels)), np.nan, dtype=np.float32)
+        self.timestamps[:size] = timestamps
+        self.values[:size] = values
+        self.start, self.end = 0, size
+        if size:
+            self.expire(float(timestamps[-1]))
+
+
+class History:
+    def __init__(self, channels, capacity, retention=None):
+        self.channels = channels
+        self.capacity = capacity
+        self.retention = retention
+        self.series = {}
+
+    def __contains__(self, entity):
+        return entity in self.series
+
+    def get(self, entity):
+        series = self.series.get(entity)
+        if series is None:
+            series = self.series[entity] = Series(self.channels, self.capacity, self.retention)
+        return series
+
+    def items(self):
+        return self.series.items()
+
+    def append(self, entity, timestamp, profile):
+        self.get(entity).append(timestamp, profile["sensors"])
+
+    def merge(self, entity, entries):
+        # zaległe wpisy scalamy z kolumnami jednym sortowaniem zamiast wstawiać po kolei
+        series = self.get(entity)
+        timestamps = np.concatenate([
+            series.timestamps[series.start:series.end],
+            np.array([timestamp for timestamp, _ in entries], dtype=np.float64)
+        ])
+        values = np.concatenate([
+            series.values[series.start:series.end],
+            np.array([series.row(profile["sensors"]) for _, profile in entries], dtype=np.float32).reshape(-1, len(self.channels))
+        ])
+        order = np.argsort(timestamps, kind="stable")
+        series.replace(timestamps[order], values[order])
+        return series
+
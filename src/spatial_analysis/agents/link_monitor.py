@@ -0,0 +1,92 @@
+import heapq
+from collections import deque
+from itertools import count
+
+
+class LinkMonitor:
+    def __init__(self, reorder_window=0.5, seen_depth=64):
+        self.reorder_window = reorder_window
+        self.seen_depth = seen_depth
+        self.channels = {}
+        self.counters = {}
+        self.pending = []
+        self.released = {}
+        self.order = count()
+
+    def observe(self, entity, sources, received_at):
+        counters = self.counters.setdefault(entity, {
+            "received": 0, "lost": 0, "duplicates": 0, "late": 0, "timed": 0,
+            "delay_last": 0.0, "delay_max": 0.0, "delay_sum": 0.0
+        })
+        counters["received"] += 1
+        if not sources:
+            return True
+
+        fresh = False
+        for channel, source in sources.items():
+            fresh = self.observe_channel(counters, (entity, channel), source) or fresh
+
+        # odtwarzane zaległości nie mówią nic o bieżącym opóźnieniu łącza
+        if received_at is None:
+            return fresh
+
+        delay = max(0.0, received_at - max(source["timestamp"] for source in sources.values()))
+        counters["timed"] += 1
+        counters["delay_last"] = delay
+        counters["delay_max"] = max(counters["delay_max"], delay)
+        counters["delay_sum"] += delay
+        return fresh
+
+    def observe_channel(self, counters, key, source):
+        seq = source["seq"]
+        first = source.get("first", seq)
+        state = self.channels.get(key)
+
+        # czujnik po restarcie zaczyna numerację od nowa, ale jego znaczniki czasu idą dalej
+        if state is None or (seq <= state["seq"] and source["timestamp"] > state["timestamp"]):
+            self.channels[key] = {"seq": seq, "timestamp": source["timestamp"], "seen": deque([seq], maxlen=self.seen_depth)}
+            return True
+
+        if seq in state["seen"]:
+            counters["duplicates"] += 1
+            return False
+
+        state["seen"].append(seq)
+        if seq < state["seq"]:
+            counters["late"] += 1
+            counters["lost"] = max(0, counters["lost"] - 1)
+            return True
+
+        if first > state["seq"] + 1:
+            counters["lost"] += first - state["seq"] - 1
+        state["seq"] = seq
+        state["timestamp"] = source["timestamp"]
+        return True
+
+    def push(self, entity, timestamp, profile):
+        heapq.heappush(self.pending, (timestamp, next(self.order), entity, profile))
+
+    def pop_ready(self, now):
+        ready = []
+        while self.pending and self.pending[0][0] <= now - self.reorder_window:
+            timestamp, _, entity, profile = heapq.heappop(self.pending)
+            # starszy niż już wydany profil - przyszedł po oknie porządkowania
+            if timestamp < self.released.get(entity, float("-inf")):
+                continue
+            self.released[entity] = timestamp
+            ready.append((entity, timestamp, profile))
+        return ready
+
+    def stats(self, entity):
+        counters = self.counters.get(entity)
+        if not counters:
+            return None
+        return {
+            "received": counters["received"],
+            "lost": counters["lost"],
+            "duplicates": counters["duplicates"],
+            "late": counters["late"],
+            "delay_last": counters["delay_last"],
+            "delay_max": counters["delay_max"],
+            "delay_avg": counters["delay_sum"] / counters["timed"] if counters["timed"] else 0.0,
+        }
@@ -0,0 +1,53 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+# ANALYSIS_EXECUTOR: "none" - wszystko w pętli zdarzeń, "thread" - pula wątków (NumPy zwalnia GIL),
+# "process" - pula procesów dla obliczeń w czystym Pythonie
+ANALYSIS_EXECUTOR = os.getenv("ANALYSIS_EXECUTOR", "none")
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "2"))
+
+
+def make_executor(kind=ANALYSIS_EXECUTOR, workers=ANALYSIS_WORKERS):
+    if kind == "thread":
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+    if kind == "process":
+        return ProcessPoolExecutor(max_workers=workers)
+    if kind != "none":
+        raise ValueError(f"Unknown analysis executor {kind}")
+    return None
+
+
+async def offload(executor, function, *args):
+    # funkcja dostaje kopie danych - nie może dotykać stanu agenta, który w tym czasie zmienia pętla
+    if executor is None:
+        return function(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, function, *args)
+
+
+class LoopLag:
+    def __init__(self):
+        self.last = 0.0
+        self.max = 0.0
+        self.total = 0.0
+        self.count = 0
+
+    def record(self, lag):
+        lag = max(0.0, lag)
+        self.last = lag
+        self.max = max(self.max, lag)
+        self.total += lag
+        self.count += 1
+
+    def stats(self):
+        return {
+            "last": round(self.last, 4),
+            "max": round(self.max, 4),
+            "avg": round(self.total / self.count, 4) if self.count else 0.0,
+            "count": self.count
+        }
+
+    def reset(self):
+        self.max = 0.0
+        self.total = 0.0
+        self.count = 0
@@ -0,0 +1,62 @@
+STAT_KEYS = ("last", "avg", "min", "max")
+
+
+class DeltaReporter:
+    def __init__(self, channels, tolerance, full_every):
+        self.channels = channels
+        self.tolerance = tolerance
+        # co ile raportów różnicowych wysyłamy pełną migawkę
+        self.full_every = full_every
+        self.seq = 0
+        # to, co odbiorca ma u siebie: ostatnio wysłany wpis każdego bytu
+        self.sent = {}
+        self.deltas_since_full = None
+
+    def request_resync(self):
+        self.deltas_since_full = None
+
+    def encode(self, report, window):
+        self.seq += 1
+        if self.deltas_since_full is None or self.deltas_since_full >= self.full_every:
+            self.sent = dict(report)
+            self.deltas_since_full = 0
+            return {"mode": "full", "seq": self.seq, "window": window, "report": report}
+
+        self.deltas_since_full += 1
+        changed = {name: entry for name, entry in report.items() if self.changed(self.sent.get(name), entry)}
+        removed = [name for name in self.sent if name not in report]
+        for name in removed:
+            del self.sent[name]
+        self.sent.update(changed)
+        return {"mode": "delta", "seq": self.seq, "window": window, "report": changed, "removed": removed}
+
+    def changed(self, previous, entry):
+        # liczniki próbek i stan łącza rosną co profil - o wysłaniu decydują tylko statystyki kanałów
+        if previous is None:
+            return True
+        for channel in self.channels:
+            old, new = previous.get(channel), entry.get(channel)
+            if old is None or new is None:
+                if old is not new:
+                    return True
+                continue
+            if any(abs(new[key] - old[key]) > self.tolerance for key in STAT_KEYS):
+                return True
+        return False
+
+
+def split_report(payload, chunk_size, report_id):
+    # chunk_size <= 0: raport w jednej wiadomości; lista usuniętych idzie tylko w pierwszym kawałku
+    names = list(payload["report"])
+    if chunk_size <= 0:
+        chunk_size = max(1, len(names))
+    total = max(1, -(-len(names) // chunk_size))
+    for chunk in range(total):
+        part = dict(payload)
+        part["report"] = {name: payload["report"][name] for name in names[chunk * chunk_size:(chunk + 1) * chunk_size]}
+        part["report_id"] = report_id
+        part["chunk"] = chunk
+        part["total"] = total
+        if chunk:
+            part.pop("removed", None)
+        yield part
@@ -1,6 +1,5 @@
-import json
 import os
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import time
 from spade.agent import Agent
 from spade.behaviour import CyclicBehaviour
@@ -10,11 +9,57 @@ from spade.message import Message
 from spade.template import Template
 from spade.behaviour import PeriodicBehaviour
 
-import json
-from datetime import datetime
 import asyncio
 
+import numpy as np
+
+from agents.codec import CODEC, decode_body, encode_body, set_body
+from agents.command_tracker import CommandTracker
+from agents.conversations import AGREED, DONE, FAILED, REFUSED, ConversationManager
+from agents.event_queue import CoalescingQueue
+from agents.history import History
+from agents.link_monitor import LinkMonitor
+from agents.offload import LoopLag, make_executor, offload
+from agents.report_delta import DeltaReporter, split_report
+from agents.rolling import RollingProfile
+from agents.rule_index import RuleIndex
+from agents.wal import WriteAheadLog
+
 HISTORY_DEPTH = 1
+WATCH_DURATION = float(os.getenv("WATCH_DURATION", "120"))
+REORDER_WINDOW = float(os.getenv("REORDER_WINDOW", "0.5"))
+REPORT_WINDOW = timedelta(hours=6)
+# powtórzenia tego samego polecenia tłumimy, dopóki trwa rozmowa, i jeszcze przez COMMAND_COOLDOWN po niej
+COMMAND_COOLDOWN = float(os.getenv("COMMAND_COOLDOWN", "30"))
+REQUEST_TIMEOUT = float(os.getenv("REQUEST_TIMEOUT", "10"))
+ACTION_TIMEOUT = float(os.getenv("ACTION_TIMEOUT", "60"))
+CHANNELS = ('temperature', 'humidity')
+# historia na byt ograniczona liczbą wpisów i czasem - pamięć analizatora nie rośnie z czasem działania
+HISTORY_CAPACITY = int(os.getenv("HISTORY_CAPACITY", "21600"))
+HISTORY_RETENTION = float(os.getenv("HISTORY_RETENTION", str(REPORT_WINDOW.total_seconds())))
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+# DELTA_REPORTS=True: pełna migawka co FULL_REPORT_EVERY raportów, pomiędzy nimi tylko byty,
+# których statystyki zmieniły się o więcej niż REPORT_TOLERANCE
+DELTA_REPORTS = os.getenv("DELTA_REPORTS", "False") == "True"
+REPORT_TOLERANCE = float(os.getenv("REPORT_TOLERANCE", "0.05"))
+FULL_REPORT_EVERY = int(os.getenv("FULL_REPORT_EVERY", "20"))
+REPORT_CHUNK = int(os.getenv("REPORT_CHUNK", "50"))
+# HISTORY_DIR ustawione: profile trafiają do dziennika na dysku i po restarcie odtwarzamy z niego okno raportu
+HISTORY_DIR = os.getenv("HISTORY_DIR")
+HISTORY_FLUSH_PERIOD = float(os.getenv("HISTORY_FLUSH_PERIOD", "1"))
+HISTORY_SEGMENT_SIZE = int(os.getenv("HISTORY_SEGMENT_SIZE", str(16 * 1024 * 1024)))
+# prośbę o SESSION_HELLO ponawiamy co HELLO_RETRY sekund, z odstępem podwajanym do HELLO_RETRY_MAX
+HELLO_RETRY = float(os.getenv("HELLO_RETRY", "5"))
+HELLO_RETRY_MAX = float(os.getenv("HELLO_RETRY_MAX", "300"))
+
+
+def no_messages():
+    # SPADE kopiuje każdą wiadomość do skrzynki każdego pasującego zachowania, a zachowanie bez szablonu
+    # pasuje do wszystkiego - wiadomości odbiera tylko MessageRouter, reszta dostaje szablon, którego nikt nie wysyła
+    template = Template()
+    template.set_metadata("mailbox", "none")
+    return template
+
 
 class SpatialAnalyzer(Agent):
     def __init__(self):
@@ -22,13 +67,30 @@ class SpatialAnalyzer(Agent):
         self.data = {
             "room_parts": {
                 "current": {},
-                "history": {}
+                "history": History(CHANNELS, HISTORY_CAPACITY, HISTORY_RETENTION),
+                "metadata": {}
             }
         }
-        self.events = asyncio.Queue()
+        # co najwyżej jedno oczekujące PROFILE_UPDATED na byt, żądania efektorów w kolejności
+        self.events = CoalescingQueue("room_part_name")
         self.profile_queue = asyncio.Queue()     # wiadomości od agregatorów
         self.effector_queue = asyncio.Queue() 
-        self.conversations = {} 
+        self.conversations = ConversationManager(REQUEST_TIMEOUT, ACTION_TIMEOUT)
+        self.command_tracker = CommandTracker(COMMAND_COOLDOWN)
+        self.aggregators = {}
+        self.link_monitor = LinkMonitor(reorder_window=REORDER_WINDOW)
+        # statystyki okna raportu aktualizowane przy każdym profilu
+        self.rolling = {}
+        # zaległe profile z niedokończonego odtworzenia bufora agregatora
+        self.pending_backfill = {}
+        self.watch_hints = {}
+        # agregator -> (najwcześniejsza kolejna prośba o SESSION_HELLO, bieżący odstęp)
+        self.hello_requests = {}
+        # złożenie i kodowanie raportu opcjonalnie poza pętlą zdarzeń
+        self.executor = make_executor()
+        self.loop_lag = LoopLag()
+        self.delta_reporter = DeltaReporter(CHANNELS, REPORT_TOLERANCE, FULL_REPORT_EVERY)
+        self.wal = WriteAheadLog(HISTORY_DIR, HISTORY_SEGMENT_SIZE, HISTORY_RETENTION) if HISTORY_DIR else None
 
     class MessageRouterBehaviour(CyclicBehaviour):
         async def run(self):
@@ -49,7 +111,7 @@ class SpatialAnalyzer(Agent):
             # Farmer -> Analyzer (sterowanie efektorem)
             if sender.startswith("farmer@") and perf in ("request", "inform"):
                 try:
-                    payload = json.loads(msg.body)
+                    payload = decode_body(msg)
                 except Exception:
                     return
 
@@ -64,35 +126,180 @@ class SpatialAnalyzer(Agent):
                     print("[SpatialAnalyzer] FARMER_EFFECTOR_REQUEST queued")
                     return
 
+                if payload.get("type") == "REPORT_RESYNC":
+                    # farmer zgubił raport różnicowy - następny będzie pełny
+                    self.agent.delta_reporter.request_resync()
+                    print("[SpatialAnalyzer] REPORT_RESYNC requested by farmer")
+                    return
+
             print("[Router] Ignored message:", msg)
 
     class ProfileConsumerBehaviour(CyclicBehaviour):
         async def run(self):
-            msg = await self.agent.profile_queue.get()
+            try:
+                msg = await asyncio.wait_for(self.agent.profile_queue.get(), timeout=max(REORDER_WINDOW, 0.1))
+            except asyncio.TimeoutError:
+                await self.agent.release_profiles()
+                return
+
+            data = decode_body(msg)
+            if data.get("type") == "SESSION_HELLO":
+                self.agent.save_session_metadata(data)
+                return
+
+            if data.get("type") == "PROFILE_BACKFILL":
+                self.agent.save_backfill(data)
+                return
 
-            data = json.loads(msg.body)
+            aggregator_jid = str(msg.sender).split("/")[0]
+            for room_part_name in data:
+                self.agent.aggregators[room_part_name] = aggregator_jid
+
+            if msg.get_metadata("encoding") == "compact":
+                await self.request_missing_metadata(data, aggregator_jid)
             await self.agent.save_profile(data)
 
+        async def request_missing_metadata(self, message_data, aggregator_jid):
+            metadata = self.agent.data["room_parts"]["metadata"]
+            if all(room_part_name in metadata for room_part_name in message_data):
+                self.agent.hello_requests.pop(aggregator_jid, None)
+                return
+            if not self.agent.should_request_hello(aggregator_jid, time.time()):
+                return
+
+            reply = Message(to=aggregator_jid)
+            reply.set_metadata("performative", "inform")
+            encode_body(reply, {"type": "SESSION_HELLO_REQUEST"})
+            await self.send(reply)
+
+    def should_request_hello(self, aggregator_jid, now):
+        # wolne lub zgubione powitanie nie może zamienić każdego profilu w kolejną prośbę
+        retry_at, delay = self.hello_requests.get(aggregator_jid, (0, HELLO_RETRY / 2))
+        if now < retry_at:
+            return False
+        delay = min(delay * 2, HELLO_RETRY_MAX)
+        self.hello_requests[aggregator_jid] = (now + delay, delay)
+        return True
+
+    def save_session_metadata(self, hello):
+        self.data["room_parts"]["metadata"][hello["name"]] = {
+            "position_x": hello["position_x"],
+            "position_y": hello["position_y"]
+        }
+        print(f"[SpatialAnalyzer] Session metadata for {hello['name']}: {hello}")
+
 
     async def save_profile(self, message_data):
+        received_at = time.time()
         for room_part_name, sensors in message_data.items():
+            sources = sensors.pop("sources", None)
+            summary = sensors.pop("summary", None)
+            if not self.link_monitor.observe(room_part_name, sources, received_at):
+                continue
+
+            timestamp = max(source["timestamp"] for source in sources.values()) if sources else received_at
             profile = {
-                "timestamp": datetime.utcnow().isoformat(),
+                "timestamp": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(),
+                "received_at": datetime.fromtimestamp(received_at, timezone.utc).isoformat(),
                 "sensors": sensors
             }
+            if summary:
+                profile["summary"] = summary
+            if sources:
+                profile["changed"] = list(sources)
+            self.link_monitor.push(room_part_name, timestamp, profile)
+        await self.release_profiles()
+
+    def save_backfill(self, message_data):
+        channels = message_data["channels"]
+        for room_part_name, rows in message_data["profiles"].items():
+            if not rows:
+                continue
+            # podsumowania okien zbuforowanych profili - trafiają do WAL i do okna kroczącego
+            summaries = {timestamp: summary for timestamp, summary in message_data.get("summaries", {}).get(room_part_name, [])}
+            backfill = []
+            for row in rows:
+                profile = {"sensors": {channel: value for channel, value in zip(channels, row[1:]) if value is not None}}
+                if row[0] in summaries:
+                    profile["summary"] = summaries[row[0]]
+                backfill.append((row[0], profile))
+            if self.wal is not None:
+                for timestamp, profile in backfill:
+                    self.wal.append(room_part_name, timestamp, profile)
+            self.pending_backfill.setdefault(room_part_name, []).extend(backfill)
+
+        # sources niesie tylko ostatnia paczka - historię i okno scalamy raz na całe odtworzenie, nie co paczkę
+        if "sources" not in message_data:
+            return
+        for room_part_name, backfill in self.pending_backfill.items():
+            # zaległe profile wpinamy w historię jednym scaleniem i bez zdarzeń - na stare dane nie reagujemy
+            history = self.data["room_parts"]["history"].merge(room_part_name, backfill)
+            self.data["room_parts"]["current"][room_part_name] = history[-1]
+            # kolumny historii nie mają podsumowań okien - do okna kroczącego dokładamy tylko zaległe wpisy
+            self.rolling_for(room_part_name).merge(backfill)
+            print(f"[Backfill] {room_part_name}: {len(backfill)} profiles")
+        self.pending_backfill = {}
+
+        for room_part_name, sources in message_data["sources"].items():
+            self.link_monitor.observe(room_part_name, sources, received_at=None)
+
+    def restore_history(self):
+        started = time.time()
+        replayed = {}
+        for room_part_name, timestamp, sensors, summary in self.wal.replay(since=started - HISTORY_RETENTION):
+            profile = {"timestamp": datetime.fromtimestamp(timestamp, timezone.utc).isoformat(), "sensors": sensors}
+            if summary:
+                profile["summary"] = summary
+            replayed.setdefault(room_part_name, []).append((timestamp, profile))
+
+        for room_part_name, entries in replayed.items():
+            # zaległe profile dopisywane były po nowszych - porządkujemy przed wpięciem
+            entries.sort(key=lambda entry: entry[0])
+            self.data["room_parts"]["history"].merge(room_part_name, entries)
+            self.data["room_parts"]["current"][room_part_name] = entries[-1][1]
+            rolling = self.rolling_for(room_part_name)
+            for timestamp, profile in entries:
+                rolling.add(timestamp, profile)
+
+        count = sum(len(entries) for entries in replayed.values())
+        print(f"[History] Restored {count} profiles of {len(replayed)} entities in {time.time() - started:.2f}s")
+
+    class FlushHistoryBehaviour(PeriodicBehaviour):
+        async def run(self):
+            batch = self.agent.wal.take_batch()
+            if batch:
+                # zapis i fsync w wątku - pętla zdarzeń nie czeka na dysk
+                await asyncio.get_running_loop().run_in_executor(None, self.agent.wal.write_batch, batch)
+
+        async def on_end(self):
+            self.agent.wal.write_batch(self.agent.wal.take_batch())
+            self.agent.wal.close()
+
+    def rolling_for(self, room_part_name):
+        rolling = self.rolling.get(room_part_name)
+        if rolling is None:
+            rolling = self.rolling[room_part_name] = RollingProfile(CHANNELS, REPORT_WINDOW.total_seconds())
+        return rolling
+
+    async def release_profiles(self):
+        for room_part_name, timestamp, profile in self.link_monitor.pop_ready(time.time()):
             self.data["room_parts"]["current"][room_part_name] = profile
-            self.data["room_parts"]["history"].setdefault(room_part_name, []).append(profile)
+            self.data["room_parts"]["history"].append(room_part_name, timestamp, profile)
+            self.rolling_for(room_part_name).add(timestamp, profile)
+            if self.wal is not None:
+                self.wal.append(room_part_name, timestamp, profile)
             await self.events.put({
                 "type": "PROFILE_UPDATED",
-                "room_part_name": room_part_name
+                "room_part_name": room_part_name,
+                "channels": profile.get("changed")
                 })    
     
     class AnalyzeProfilesBehaviour(CyclicBehaviour):
         async def on_start(self):
-            self.rules = [
+            self.rules = RuleIndex([
                 TemperatureAnalysis(),
                 HumidityAnalysis()
-            ]
+            ])
         
         async def run(self):
             event = await self.agent.events.get()
@@ -109,12 +316,32 @@ class SpatialAnalyzer(Agent):
 
         async def handle_profile_update(self, event):
             room_part_name = event["room_part_name"]
-            history = self.agent.data["room_parts"]["history"].get(room_part_name, [])
+            series = self.agent.data["room_parts"]["history"].get(room_part_name)
+            if len(series) < HISTORY_DEPTH:
+                return
+            # warunki reguł liczone wprost na kolumnach ostatnich wpisów
+            readings = series.tail(HISTORY_DEPTH)
+
+            for rule in self.rules.affected(event.get("channels")):
+                if np.all(rule.condition(readings)):
+                    await self.agent.events.put(rule.request(room_part_name, series.sensors(series.end - 1)))
+                    await self.send_watch_hint(room_part_name)
+
+        async def send_watch_hint(self, room_part_name):
+            aggregator_jid = self.agent.aggregators.get(room_part_name)
+            now = time.time()
+            if aggregator_jid is None or now - self.agent.watch_hints.get(room_part_name, 0) < WATCH_DURATION / 2:
+                return
 
-            for rule in self.rules:
-                result = rule.analyze(room_part_name, history)
-                if result:
-                    await self.agent.events.put(result)
+            self.agent.watch_hints[room_part_name] = now
+            msg = Message(to=aggregator_jid)
+            msg.set_metadata("performative", "inform")
+            encode_body(msg, {
+                "type": "WATCH_CLOSELY",
+                "room_part_name": room_part_name,
+                "duration": WATCH_DURATION
+            })
+            await self.send(msg)
 
         async def handle_effector_request(self, event):
             room_part_name = event["room_part_name"]
@@ -122,6 +349,11 @@ class SpatialAnalyzer(Agent):
             turn_on = event.get("turn_on")
             reason = event.get("reason", "unknown")
 
+            key = (room_part_name, effector, turn_on)
+            # polecenie farmera jest świadome - pomija okres karencji, ale nie trwającą rozmowę
+            if not self.agent.command_tracker.should_send(key, time.time(), ignore_cooldown=reason == "farmer_request"):
+                return
+
             conversation = EffectorConversation(
                 room_part_name=room_part_name,
                 effector=effector,
@@ -135,6 +367,7 @@ class SpatialAnalyzer(Agent):
             template.set_metadata("conversation-id", conversation.conversation_id)
 
             self.agent.add_behaviour(conversation, template)
+            self.agent.command_tracker.start(key, conversation.conversation_id, time.time())
 
 
             print(
@@ -165,51 +398,81 @@ class SpatialAnalyzer(Agent):
             )
 
             if perf == "agree":
+                self.agent.conversations.transition(cid, AGREED, time.time())
                 return
 
             if perf == "refuse":
                 await self.inform_farmer(conversation, "REFUSED")
-                self.finish(cid)
+                self.finish(cid, REFUSED)
                 return
 
             if perf == "done":
-                await self.inform_farmer(conversation, "SUCCESS", msg.body)
-                self.finish(cid)
+                await self.inform_farmer(conversation, "SUCCESS", decode_body(msg) if msg.body else None)
+                self.finish(cid, DONE)
                 return
 
             if perf == "failure":
                 await self.inform_farmer(conversation, "FAILURE", msg.body)
-                self.finish(cid)
+                self.finish(cid, FAILED)
                 return
 
+        def finish(self, cid, state):
+            now = time.time()
+            self.agent.conversations.transition(cid, state, now)
+            self.agent.command_tracker.finish(cid, now)
+
 
         async def inform_farmer(self, conversation, status, details=None):
-            msg = Message(to="farmer@xmpp_server")
-            msg.set_metadata("performative", "inform")
+            await self.send(self.agent.farmer_inform(conversation, status, details))
 
-            msg.body = json.dumps({
-                "room_part_name": conversation["room_part_name"],
-                "effector": conversation["effector"],
-                "status": status,
-                "reason": conversation["reason"],
-                "details": details,
-                "timestamp": datetime.utcnow().isoformat()
-            })
+    class LoopLagBehaviour(CyclicBehaviour):
+        async def run(self):
+            # o ile później niż powinien wraca sen - miara zablokowania pętli zdarzeń
+            started = time.monotonic()
+            await asyncio.sleep(LOOP_LAG_INTERVAL)
+            self.agent.loop_lag.record(time.monotonic() - started - LOOP_LAG_INTERVAL)
 
-            await self.send(msg)
+    class ConversationTimeoutBehaviour(PeriodicBehaviour):
+        async def run(self):
+            now = time.time()
+            for cid, conversation in self.agent.conversations.expire(now):
+                self.agent.command_tracker.finish(cid, now)
+                details = f"No reply from effector (state: {conversation['timed_out_in']})"
+                await self.send(self.agent.farmer_inform(conversation, "TIMEOUT", details))
 
-            print(
-                f"[Farmer] room_part={conversation['room_part_name']} "
-                f"effector={conversation['effector']} "
-                f"status={status}"
-            )
+    def farmer_inform(self, conversation, status, details=None):
+        msg = Message(to="farmer@xmpp_server")
+        msg.set_metadata("performative", "inform")
+
+        encode_body(msg, {
+            "room_part_name": conversation["room_part_name"],
+            "effector": conversation["effector"],
+            "status": status,
+            "reason": conversation["reason"],
+            "details": details,
+            "timestamp": datetime.utcnow().isoformat()
+        })
+
+        print(
+            f"[Farmer] room_part={conversation['room_part_name']} "
+            f"effector={conversation['effector']} "
+            f"status={status}"
+        )
+        return msg
 
     async def setup(self) -> None:
+        # agregatory subskrybują naszą obecność, żeby wiedzieć, kiedy buforować profile
+        self.presence.approve_all = True
+        if self.wal is not None:
+            self.restore_history()
+            self.add_behaviour(self.FlushHistoryBehaviour(period=HISTORY_FLUSH_PERIOD), no_messages())
         self.add_behaviour(self.MessageRouterBehaviour())
-        self.add_behaviour(self.ProfileConsumerBehaviour())
-        self.add_behaviour(self.AnalyzeProfilesBehaviour())
-        self.add_behaviour(self.EffectorResponseHandler())
-        self.add_behaviour(PeriodicReportBehaviour(period=15))
+        self.add_behaviour(self.ProfileConsumerBehaviour(), no_messages())
+        self.add_behaviour(self.AnalyzeProfilesBehaviour(), no_messages())
+        self.add_behaviour(self.EffectorResponseHandler(), no_messages())
+        self.add_behaviour(PeriodicReportBehaviour(period=15), no_messages())
+        self.add_behaviour(self.ConversationTimeoutBehaviour(period=1), no_messages())
+        self.add_behaviour(self.LoopLagBehaviour(), no_messages())
 
 
 class EffectorConversation(OneShotBehaviour):
@@ -228,13 +491,13 @@ class EffectorConversation(OneShotBehaviour):
         self.farmer_jid = "farmer@xmpp_server"
 
     async def run(self):
-        self.agent.conversations[self.conversation_id] = {
+        self.agent.conversations.start(self.conversation_id, {
             "room_part_name": self.room_part_name,
             "effector": self.effector,
             "turn_on": self.turn_on,
             "reason": self.reason,
             "started_at": datetime.utcnow().isoformat()
-        }
+        }, time.time())
         await self.send_request()
 
 
@@ -244,7 +507,7 @@ class EffectorConversation(OneShotBehaviour):
         msg.set_metadata("performative", "request")
         msg.set_metadata("conversation-id", self.conversation_id)
 
-        msg.body = json.dumps({
+        encode_body(msg, {
             "room_part_name": self.room_part_name,
             "turn_on": self.turn_on,
             "reason": self.reason,
@@ -261,110 +524,114 @@ class EffectorConversation(OneShotBehaviour):
 class PeriodicReportBehaviour(PeriodicBehaviour):
 
     async def run(self):
-        report = self.build_report()
-
-        msg = Message(to="farmer@xmpp_server")
-        msg.set_metadata("performative", "inform")
+        # w pętli tylko zebranie migawek okien; złożenie raportu i kodowanie idą do executora
+        now = datetime.utcnow()
+        window = {"from": (now - REPORT_WINDOW).isoformat(), "to": now.isoformat()}
+        # w trybie różnicowym okno idzie raz na raport, a nie przy każdym wpisie
+        report = await offload(
+            self.agent.executor, render_report,
+            self.collect_stats(), None if DELTA_REPORTS else window
+        )
 
-        msg.body = json.dumps({
+        payload = {
             "type": "PERIODIC_REPORT",
             "timestamp": datetime.utcnow().isoformat(),
             "report": report
-        })
-
-        await self.send(msg)
-
-        print("[Report] Periodic report sent to farmer")
-        print(f"[Report] {report}")
-
-    def build_report(self):
-        report = {}
-
-        now = datetime.utcnow()
-        window_start = now - timedelta(hours=6)
-
-        history = self.agent.data["room_parts"]["history"]
+        }
+        if DELTA_REPORTS:
+            payload.update(self.agent.delta_reporter.encode(report, window))
+        chunks, size = await self.send_chunked("farmer@xmpp_server", payload)
+
+        print(f"[Report] Periodic report sent to farmer ({payload.get('mode', 'full')}, {chunks} chunks, {size} bytes)")
+        print(f"[Report] {payload['report']}")
+        print(f"[LoopLag] {self.agent.loop_lag.stats()}")
+        print(f"[Events] {self.agent.events.stats()}")
+        print(f"[Commands] {self.agent.command_tracker.stats()}")
+        self.agent.loop_lag.reset()
+
+    async def send_chunked(self, to, payload):
+        # po REPORT_CHUNK wpisów na wiadomość - rozmiar stanzy nie rośnie z wielkością stada
+        parts = list(split_report(payload, REPORT_CHUNK, str(uuid.uuid4())))
+        size = 0
+        for part in parts:
+            msg = Message(to=to)
+            msg.set_metadata("performative", "inform")
+            set_body(msg, await offload(self.agent.executor, CODEC.encode, part))
+            await self.send(msg)
+            size += len(msg.body)
+        return len(parts), size
 
-        for room_part_name, profiles in history.items():
-            recent = [
-                p for p in profiles
-                if datetime.fromisoformat(p["timestamp"]) >= window_start
-            ]
+    def collect_stats(self):
+        stats = {}
+        now_epoch = time.time()
 
-            if not recent:
+        for room_part_name, rolling in self.agent.rolling.items():
+            rolling.expire(now_epoch)
+            snapshot = rolling.snapshot()
+            if snapshot["temperature"] is None:
                 continue
+            stats[room_part_name] = (snapshot, self.agent.link_monitor.stats(room_part_name))
 
-            def stats(values):
-                return {
-                    "last": values[-1],
-                    "avg": sum(values) / len(values),
-                    "min": min(values),
-                    "max": max(values),
-                }
+        return stats
 
-            temps = [p["sensors"]["temperature"] for p in recent]
-            humidities   = [p["sensors"]["humidity"] for p in recent]
 
+def render_report(stats, window=None):
+    report = {}
 
-            report[room_part_name] = {
-                "temperature": stats(temps),
-                "humidity": stats(humidities),
-                "samples": len(recent),
-                "from": window_start.isoformat(),
-                "to": now.isoformat(),
-            }
-
-        return report
+    for room_part_name, (snapshot, link) in stats.items():
+        report[room_part_name] = {
+            "temperature": snapshot["temperature"],
+            "humidity": snapshot["humidity"],
+            "samples": snapshot["temperature"]["count"],
+            "link": link,
+        }
+        if window:
+            report[room_part_name].update(window)
 
+    return report
 
 
 class AnalysisRule:
     name = "BASE"
-    def analyze(self, room_part, history):
+    # kanały czujników czytane przez regułę - analizator liczy ją tylko, gdy któryś się zmienił
+    channels = ()
+
+    # warunek na kolumnach ostatnich odczytów z historii
+    def condition(self, readings):
+        raise NotImplementedError
+
+    def request(self, room_part, sensors):
         raise NotImplementedError
 
 class TemperatureAnalysis(AnalysisRule):
     name = "TEMPERATURE_HIGH"
-
-    def analyze(self, room_part, history):
-        if len(history) < HISTORY_DEPTH:
-            return None
-
-        temps = [
-            p["sensors"]["temperature"]
-            for p in history[-HISTORY_DEPTH:]
-        ]
-
-        if all(t > 21.0 for t in temps):
-            return {
-                "type": "EFFECTOR_REQUEST",
-                "room_part_name": room_part,
-                "effector": "air_conditioner",
-                "reason": "Temperature too high",
-                "turn_on": "True",
-                "details": f"Temperature too high:  {temps[-1]} deg Celsius"
-            }
-        return None
+    channels = ("temperature",)
+
+    def condition(self, readings):
+        return readings["temperature"] > 21.0
+
+    def request(self, room_part, sensors):
+        return {
+            "type": "EFFECTOR_REQUEST",
+            "room_part_name": room_part,
+            "effector": "air_conditioner",
+            "reason": "Temperature too high",
+            "turn_on": "True",
+            "details": f"Temperature too high:  {sensors['temperature']} deg Celsius"
+        }
 
 class HumidityAnalysis(AnalysisRule):
     name = "HUMIDITY_HIGH"
-
-    def analyze(self, room_part, history):
-        if len(history) < HISTORY_DEPTH:
-            return None
-
-        temps = [
-            p["sensors"]["humidity"]
-            for p in history[-HISTORY_DEPTH:]
-        ]
-
-        if all(t > 53.0 for t in temps):
-            return {
-                "type": "EFFECTOR_REQUEST",
-                "room_part_name": room_part,
-                "effector": "air_conditioner",
-                "turn_on": "False",
-                "reason": f"Humidity too high: {temps[-1]}"
-            }
-
-        return None
\ No newline at end of file
+    channels = ("humidity",)
+
+    def condition(self, readings):
+        return readings["humidity"] > 53.0
+
+    def request(self, room_part, sensors):
+        return {
+            "type": "EFFECTOR_REQUEST",
+            "room_part_name": room_part,
+            "effector": "air_conditioner",
+            "turn_on": "False",
+            "reason": f"Humidity too high: {sensors['humidity']}"
+        }
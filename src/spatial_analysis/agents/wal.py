@@ -0,0 +1,86 @@
+import json
+import mmap
+import os
+import struct
+
+HEADER = struct.Struct("<I")
+
+
+class WriteAheadLog:
+    def __init__(self, directory, segment_size=16 * 1024 * 1024, retention=None):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.segment_size = segment_size
+        # segmenty, których najnowszy wpis jest starszy niż retencja, są usuwane
+        self.retention = retention
+        self.pending = []
+        self.file = None
+        self.segments = {}
+        paths = self.segment_paths()
+        self.next_index = int(os.path.basename(paths[-1])[8:16]) + 1 if paths else 0
+
+    def segment_paths(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith("segment-") and name.endswith(".wal"))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def append(self, entity, timestamp, profile):
+        self.pending.append([entity, timestamp, profile["sensors"], profile.get("summary")])
+
+    def take_batch(self):
+        batch, self.pending = self.pending, []
+        return batch
+
+    def write_batch(self, batch):
+        # wywoływane w wątku executora - jeden zapis i jeden fsync na całą paczkę
+        if not batch:
+            return
+        if self.file is None or self.file.tell() >= self.segment_size:
+            self.rotate()
+        records = (json.dumps(record, separators=(",", ":")).encode("utf-8") for record in batch)
+        self.file.write(b"".join(HEADER.pack(len(record)) + record for record in records))
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+        newest = max(record[1] for record in batch)
+        self.segments[self.file.name] = max(self.segments.get(self.file.name, newest), newest)
+        self.prune(newest)
+
+    def rotate(self):
+        if self.file is not None:
+            self.file.close()
+        path = os.path.join(self.directory, f"segment-{self.next_index:08d}.wal")
+        self.next_index += 1
+        self.file = open(path, "ab")
+
+    def prune(self, now):
+        if self.retention is None:
+            return
+        for path, newest in list(self.segments.items()):
+            if path != self.file.name and newest < now - self.retention:
+                os.remove(path)
+                del self.segments[path]
+
+    def replay(self, since=float("-inf")):
+        for path in self.segment_paths():
+            if os.path.getsize(path) == 0:
+                continue
+            newest = float("-inf")
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                position = 0
+                while position + HEADER.size <= len(mm):
+                    (length,) = HEADER.unpack_from(mm, position)
+                    end = position + HEADER.size + length
+                    # urwany ostatni zapis (np. po awarii w trakcie fsync) - reszty segmentu nie ma
+                    if end > len(mm):
+                        break
+                    entity, timestamp, sensors, summary = json.loads(mm[position + HEADER.size:end])
+                    position = end
+                    newest = max(newest, timestamp)
+                    if timestamp >= since:
+                        yield entity, timestamp, sensors, summary
+            self.segments[path] = newest
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
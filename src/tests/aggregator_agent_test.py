@@ -0,0 +1,252 @@
+import asyncio
+import importlib.util
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spade")
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, os.path.join(SRC_DIR, "cow"))
+
+COW_PROFILE = {"temperature": 38.0, "pH": 6.5, "activity": 0.1, "pulse": 70}
+
+
+def load_aggregator(container):
+    # agregatory krowy i przestrzeni to oba "agents.aggregator" - ładujemy je pod osobnymi nazwami
+    path = os.path.join(SRC_DIR, container, "agents", "aggregator.py")
+    spec = importlib.util.spec_from_file_location(f"{container}_aggregator", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+cow_aggregator = load_aggregator("cow")
+space_aggregator = load_aggregator("space")
+
+
+@pytest.fixture
+def cow(monkeypatch):
+    monkeypatch.setenv("NAME", "mucka")
+    return cow_aggregator.Aggregator()
+
+
+@pytest.fixture
+def deadband_cow(monkeypatch):
+    monkeypatch.setenv("NAME", "mucka")
+    monkeypatch.setenv("DEADBAND", "True")
+    return cow_aggregator.Aggregator()
+
+
+@pytest.fixture
+def edge_cow(monkeypatch):
+    monkeypatch.setenv("NAME", "mucka")
+    monkeypatch.setattr(cow_aggregator, "EDGE_RULES", True)
+    return cow_aggregator.Aggregator()
+
+
+@pytest.fixture
+def space(monkeypatch):
+    monkeypatch.setenv("NAME", "obora1")
+    monkeypatch.setenv("POSITION_X", "1.0")
+    monkeypatch.setenv("POSITION_Y", "1.5")
+    return space_aggregator.Aggregator()
+
+
+def sent(aggregator):
+    profiles = [payload for _, payload in aggregator.outbox.pending.values()]
+    aggregator.outbox.pending.clear()
+    return profiles
+
+
+def batch(channel, values, first_seq=1):
+    return {"readings": [
+        {channel: value, "seq": first_seq + i, "timestamp": 100.0 + i}
+        for i, value in enumerate(values)
+    ]}
+
+
+def test_cow_batches_fold_into_one_profile_with_summary(cow):
+    for channel in ("temperature", "pH", "activity"):
+        cow.aggregate_data(batch(channel, [float(i) for i in range(1, 11)]))
+        assert sent(cow) == []
+    cow.aggregate_data(batch("pulse", [float(i) for i in range(1, 11)]))
+
+    [profile] = sent(cow)
+    assert {channel: profile[channel] for channel in COW_PROFILE} == {channel: 10.0 for channel in COW_PROFILE}
+    for channel in COW_PROFILE:
+        summary = profile["summary"][channel]
+        assert (summary["count"], summary["sum"], summary["min"], summary["max"]) == (10, 55.0, 1.0, 10.0)
+        assert summary["var"] == pytest.approx(8.25)
+    assert profile["sources"]["pulse"] == {"first": 1, "seq": 10, "timestamp": 109.0}
+    assert cow.data == {}
+    assert cow.profile_summarizer.channels == {}
+
+
+def test_cow_single_readings_forward_without_summary(cow):
+    cow.aggregate_data(COW_PROFILE)
+
+    [profile] = sent(cow)
+    assert profile == COW_PROFILE
+
+
+def test_cow_keeps_last_known_values(cow):
+    cow.keep_last_known = True
+    cow.aggregate_data(COW_PROFILE)
+    sent(cow)
+    cow.aggregate_data({"pulse": 80})
+
+    [profile] = sent(cow)
+    assert profile == COW_PROFILE | {"pulse": 80}
+
+
+def test_space_batches_fold_into_one_profile(space):
+    space.aggregate_data(batch("temperature", [20.0, 22.0]))
+    space.aggregate_data(batch("humidity", [50.0, 52.0, 54.0]))
+
+    [profile] = sent(space)
+    assert profile["temperature"] == 22.0 and profile["humidity"] == 54.0
+    assert profile["summary"]["humidity"]["count"] == 3
+    assert profile["summary"]["temperature"]["count"] == 2
+    assert profile["position_x"] == 1.0 and profile["position_y"] == 1.5
+    assert space.data == {}
+
+
+def test_space_forwards_reading_sources(space):
+    space.aggregate_data({"temperature": 10.0, "seq": 4, "timestamp": 100.0})
+    space.aggregate_data({"temperature": 11.0, "seq": 5, "timestamp": 101.0})
+    space.aggregate_data({"humidity": 15.0, "seq": 9, "timestamp": 101.5})
+
+    [profile] = sent(space)
+    assert profile["sources"]["temperature"] == {"first": 4, "seq": 5, "timestamp": 101.0}
+    assert profile["sources"]["humidity"] == {"first": 9, "seq": 9, "timestamp": 101.5}
+    assert profile["summary"] == {"temperature": {"count": 2, "sum": 21.0, "min": 10.0, "max": 11.0, "last": 11.0, "var": 0.25}}
+    assert space.sources == {}
+
+
+def test_cow_spooled_profile_keeps_its_summary(cow):
+    cow.analyzer_available = False
+    for channel in COW_PROFILE:
+        cow.aggregate_data(batch(channel, [1.0, 2.0]))
+
+    assert sent(cow) == []
+    [(_, _, profile)] = cow.spool.entries
+    assert profile["summary"]["pulse"]["count"] == 2
+    [message] = cow_aggregator.backfill_messages(*cow.spool.drain(), list(COW_PROFILE), 10)
+    assert message["summaries"]["mucka"][0][1] == profile["summary"]
+
+
+def test_cow_coalesced_profiles_merge_summaries(cow):
+    for values in ([1.0, 3.0], [2.0, 4.0]):
+        for channel in COW_PROFILE:
+            cow.aggregate_data(batch(channel, values))
+    cow.aggregate_data(COW_PROFILE)
+
+    [profile] = sent(cow)
+    pulse = profile["summary"]["pulse"]
+    # dwa okna po dwa odczyty i pojedynczy odczyt z ostatniego profilu
+    assert (pulse["count"], pulse["sum"], pulse["min"], pulse["max"], pulse["last"]) == (5, 80.0, 1.0, 70, 70)
+    assert profile["summary"]["temperature"]["count"] == 5
+    assert profile["pulse"] == 70
+
+
+def test_cow_with_last_known_values_sends_one_profile_per_period(deadband_cow):
+    assert deadband_cow.profile_period == cow_aggregator.PROFILE_PERIOD
+    deadband_cow.aggregate_data(COW_PROFILE)
+    for pulse in (71, 72, 73):
+        deadband_cow.aggregate_data({"pulse": pulse})
+    assert sent(deadband_cow) == []
+
+    behaviour = cow_aggregator.Aggregator.ForwardPendingProfile(deadband_cow.profile_period)
+    behaviour.set_agent(deadband_cow)
+    asyncio.run(behaviour.run())
+    asyncio.run(behaviour.run())
+
+    [profile] = sent(deadband_cow)
+    assert profile["pulse"] == 73 and profile["summary"]["pulse"]["count"] == 4
+    assert not deadband_cow.profile_pending
+
+
+def inform(body):
+    message = cow_aggregator.Message(to="aggregator-mucka@xmpp_server")
+    message.set_metadata("performative", "inform")
+    message.body = body
+    return message
+
+
+async def dispatch_readings(agent, count):
+    agent.watch_analyzer_presence = lambda: None
+    await agent.setup()
+    for i in range(count):
+        await asyncio.gather(*agent.dispatch(inform(f'{{"pulse": {i}}}')))
+    await asyncio.sleep(0)
+    return {type(behaviour).__name__: behaviour.mailbox_size() for behaviour in agent.behaviours}
+
+
+def test_cow_only_aggregate_data_queues_sensor_messages(deadband_cow):
+    mailboxes = asyncio.run(dispatch_readings(deadband_cow, 1000))
+
+    assert mailboxes == {"AggregateData": 1000, "SendProfiles": 0, "ForwardPendingProfile": 0}
+
+
+def test_space_only_aggregate_data_queues_sensor_messages(space):
+    space.profile_period = 1
+    space.send_session_hello = lambda: None
+    mailboxes = asyncio.run(dispatch_readings(space, 1000))
+
+    assert mailboxes == {"AggregateData": 1000, "SendProfiles": 0, "ForwardPendingProfile": 0}
+
+
+def escalations(aggregator):
+    sent = [behaviour.escalation for behaviour in aggregator.behaviours
+            if isinstance(behaviour, cow_aggregator.Aggregator.SendEscalation)]
+    for behaviour in list(aggregator.behaviours):
+        aggregator.behaviours.remove(behaviour)
+    return [sorted(request["reason"] for request in escalation["requests"]) for escalation in sent]
+
+
+def evaluate(aggregator, now, **sensors):
+    aggregator.data = COW_PROFILE | sensors
+    aggregator.evaluate_rules(now=now)
+
+
+def test_edge_rules_escalate_when_rule_starts_firing(edge_cow):
+    evaluate(edge_cow, 100.0)
+    assert escalations(edge_cow) == []
+
+    evaluate(edge_cow, 101.0, temperature=40.5)
+
+    [escalation] = [behaviour.escalation for behaviour in edge_cow.behaviours]
+    assert escalation["type"] == "ESCALATION" and escalation["cow_name"] == "mucka"
+    assert escalation["sensors"]["temperature"] == 40.5
+    assert escalations(edge_cow) == [["fever", "overheating"]]
+
+
+def test_edge_rules_do_not_repeat_while_rule_keeps_firing(edge_cow):
+    evaluate(edge_cow, 100.0, temperature=40.5)
+    escalations(edge_cow)
+
+    for now in (101.0, 110.0, 100.0 + cow_aggregator.ESCALATION_RETRY - 1):
+        evaluate(edge_cow, now, temperature=40.5)
+    # nowa reguła eskaluje sama, bez powtarzania tych, które już działają
+    evaluate(edge_cow, 130.0, temperature=40.5, pulse=95, activity=0.3)
+
+    assert escalations(edge_cow) == [["stress"]]
+
+
+def test_edge_rules_rearm_after_rule_clears(edge_cow):
+    evaluate(edge_cow, 100.0, temperature=40.5)
+    evaluate(edge_cow, 101.0)
+    evaluate(edge_cow, 102.0, temperature=40.5)
+
+    assert escalations(edge_cow) == [["fever", "overheating"], ["fever", "overheating"]]
+
+
+def test_edge_rules_retry_escalation_while_rule_keeps_firing(edge_cow):
+    evaluate(edge_cow, 100.0, temperature=39.5)
+    evaluate(edge_cow, 100.0 + cow_aggregator.ESCALATION_RETRY, temperature=39.5)
+    evaluate(edge_cow, 101.0 + cow_aggregator.ESCALATION_RETRY, temperature=39.5)
+    evaluate(edge_cow, 100.0 + 2 * cow_aggregator.ESCALATION_RETRY, temperature=39.5)
+
+    assert escalations(edge_cow) == [["overheating"]] * 3
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spade")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from spade.message import Message  # noqa: E402
+
+from agents import sensor  # noqa: E402
+from agents.aggregator_hub import AggregatorHub  # noqa: E402
+from agents.codec import decode_body, encode_body  # noqa: E402
+from agents.pulse_sensor import PulseSensor  # noqa: E402
+
+
+def inform(sender, to, body):
+    message = Message(to=to, sender=sender)
+    message.set_metadata("performative", "inform")
+    encode_body(message, body)
+    return message
+
+
+def deliver(behaviour, message):
+    async def receive(timeout=None):
+        return message
+    behaviour.receive = receive
+    asyncio.run(behaviour.run())
+
+
+def test_hub_forwards_watch_hint_to_cow_sensors():
+    hub = AggregatorHub(0)
+    behaviour = AggregatorHub.AggregateData()
+    behaviour.set_agent(hub)
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+    behaviour.send = send
+
+    for sensor_jid in ("mucka-PulseSensor@xmpp_server/r1", "mucka-PHSensor@xmpp_server", "krasula-PulseSensor@xmpp_server"):
+        deliver(behaviour, inform(sensor_jid, str(hub.jid), {"pulse": 70, "seq": 1, "timestamp": 100.0}))
+    deliver(behaviour, inform("cows-analyzer@xmpp_server", str(hub.jid), {"type": "WATCH_CLOSELY", "cow_name": "mucka", "duration": 90}))
+
+    assert [str(message.to) for message in sent] == ["mucka-phsensor@xmpp_server", "mucka-pulsesensor@xmpp_server"]
+    assert decode_body(sent[0]) == {"type": "WATCH_CLOSELY", "cow_name": "mucka", "duration": 90}
+
+
+def test_sensor_applies_forwarded_watch_hint(monkeypatch):
+    monkeypatch.setenv("NAME", "mucka")
+    monkeypatch.setenv("ADAPTIVE_SAMPLING", "True")
+    monkeypatch.setattr(sensor.time, "time", lambda: 1000.0)
+    pulse = PulseSensor()
+    behaviour = sensor.Sensor.ReceiveHints()
+    behaviour.set_agent(pulse)
+
+    deliver(behaviour, inform("aggregator-hub-0@xmpp_server", str(pulse.jid), {"type": "WATCH_CLOSELY", "cow_name": "mucka", "duration": 90}))
+
+    assert pulse.sampling.watch_until == 1090.0
+    assert pulse.sampling.next_period({"pulse": 60}) == pulse.sampling.fast_period
+
+
+def test_hub_forward_profiles_mailbox_stays_empty():
+    hub = AggregatorHub(0)
+
+    async def dispatch_readings():
+        await hub.setup()
+        for i in range(500):
+            message = inform(f"cow{i % 50}-PulseSensor@xmpp_server", str(hub.jid), {"pulse": 70, "seq": i, "timestamp": 100.0})
+            await asyncio.gather(*hub.dispatch(message))
+        await asyncio.sleep(0)
+        return {type(behaviour).__name__: behaviour.mailbox_size() for behaviour in hub.behaviours}
+
+    assert asyncio.run(dispatch_readings()) == {"AggregateData": 500, "ForwardProfiles": 0}
+
+
+def test_only_receive_hints_queues_forwarded_hints(monkeypatch):
+    monkeypatch.setenv("NAME", "mucka")
+    monkeypatch.setenv("ADAPTIVE_SAMPLING", "True")
+    pulse = PulseSensor()
+
+    async def dispatch_hints():
+        await pulse.setup()
+        for _ in range(20):
+            hint = inform("aggregator-hub-0@xmpp_server", str(pulse.jid), {"type": "WATCH_CLOSELY", "cow_name": "mucka", "duration": 90})
+            await asyncio.gather(*pulse.dispatch(hint))
+        await asyncio.sleep(0)
+        return {type(behaviour).__name__: behaviour.mailbox_size() for behaviour in pulse.behaviours}
+
+    assert asyncio.run(dispatch_hints()) == {"ForwardData": 0, "ReceiveHints": 20}
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("spade")
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from spade.message import Message  # noqa: E402
+
+from agents import cows_analizer  # noqa: E402
+from agents.codec import encode_body  # noqa: E402
+from agents.cows_analizer import CHANNELS, CowsAnalyzer  # noqa: E402
+
+SUMMARY = {"count": 30, "sum": 2100.0, "min": 60.0, "max": 80.0, "last": 70.0, "var": 25.0}
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("PASSWORD", "secret")
+    return CowsAnalyzer()
+
+
+def store_live(analyzer, timestamp, pulse_summary):
+    profile = {"sensors": {"temperature": 38.5, "pH": 6.5, "activity": 0.1, "pulse": 70.0}, "summary": {"pulse": pulse_summary}}
+    analyzer.data["cows"]["history"].append("mucka", timestamp, profile)
+    analyzer.rolling_for("mucka").add(timestamp, profile)
+
+
+def test_backfill_keeps_summaries_of_live_profiles(analyzer):
+    now = time.time()
+    for i in range(3):
+        store_live(analyzer, now + i, SUMMARY)
+
+    analyzer.save_backfill({
+        "type": "PROFILE_BACKFILL",
+        "channels": list(CHANNELS),
+        "profiles": {"mucka": [[now - 10, 38.0, 6.4, 0.1, 90.0], [now - 5, 38.1, 6.4, 0.1, 65.0]]},
+        "summaries": {"mucka": [[now - 5, {"pulse": SUMMARY | {"count": 10, "sum": 650.0, "last": 65.0}}]]},
+        "sources": {}
+    })
+
+    pulse = analyzer.rolling["mucka"].snapshot()["pulse"]
+    assert pulse["count"] == 3 * 30 + 1 + 10
+    assert pulse["max"] == 90.0 and pulse["min"] == 60.0
+    assert pulse["last"] == 70.0
+    assert analyzer.rolling["mucka"].snapshot()["temperature"]["count"] == 5
+    assert len(analyzer.data["cows"]["history"].get("mucka")) == 5
+
+
+def test_backfill_chunks_are_merged_once_after_the_last_one(analyzer):
+    now = time.time()
+    store_live(analyzer, now, SUMMARY)
+    chunk = {"type": "PROFILE_BACKFILL", "channels": list(CHANNELS)}
+
+    analyzer.save_backfill(chunk | {"profiles": {"mucka": [[now - 20, 38.0, 6.4, 0.1, 61.0]], "krasula": [[now - 20, 38.0, 6.4, 0.1, 62.0]]}})
+    assert analyzer.rolling["mucka"].snapshot()["pulse"]["count"] == 30
+    assert "krasula" not in analyzer.data["cows"]["history"]
+
+    analyzer.save_backfill(chunk | {"profiles": {"mucka": [[now - 10, 38.0, 6.4, 0.1, 63.0]]}, "sources": {}})
+    assert analyzer.rolling["mucka"].snapshot()["pulse"]["count"] == 32
+    assert analyzer.rolling["krasula"].snapshot()["pulse"]["count"] == 1
+    assert len(analyzer.data["cows"]["history"].get("mucka")) == 3
+    assert analyzer.pending_backfill == {}
+
+
+def test_only_router_queues_inbound_messages(analyzer, monkeypatch):
+    monkeypatch.setattr(cows_analizer, "RULE_BATCH_PERIOD", 1.0)
+    monkeypatch.setattr(analyzer, "wal", FakeWal())
+    analyzer.presence = SimpleNamespace()
+
+    async def dispatch_messages():
+        await analyzer.setup()
+        for i in range(200):
+            message = Message(to="cows-analyzer@xmpp_server", sender=f"aggregator-cow{i % 20}@xmpp_server")
+            message.set_metadata("performative", "inform")
+            await asyncio.gather(*analyzer.dispatch(message))
+        await asyncio.sleep(0)
+        return {type(behaviour).__name__: behaviour.mailbox_size() for behaviour in analyzer.behaviours}
+
+    mailboxes = asyncio.run(dispatch_messages())
+
+    assert mailboxes.pop("MessageRouterBehaviour") == 200
+    assert set(mailboxes) == {
+        "FlushHistoryBehaviour", "ProfileConsumerBehaviour", "AnalyzeProfilesBehaviour", "EffectorResponseHandler",
+        "PeriodicReportBehaviour", "ConversationTimeoutBehaviour", "LoopLagBehaviour", "BatchRulesBehaviour"
+    }
+    assert set(mailboxes.values()) == {0}
+
+
+class FakeWal:
+    def replay(self, since):
+        return []
+
+
+def test_profile_rules_read_history_columns(analyzer):
+    analyzer.data["cows"]["history"].append("mucka", 100.0, {"sensors": {"temperature": 40.5, "pH": 6.5, "activity": 0.1, "pulse": 70.0}})
+    behaviour = CowsAnalyzer.AnalyzeProfilesBehaviour()
+    behaviour.set_agent(analyzer)
+
+    async def analyze():
+        await behaviour.on_start()
+        await behaviour.handle_profile_update({"type": "PROFILE_UPDATED", "cow_name": "mucka", "channels": ["temperature"]})
+        return [analyzer.events.items.popleft() for _ in range(analyzer.events.qsize())]
+
+    requests = asyncio.run(analyze())
+
+    assert sorted(request["reason"] for request in requests) == ["fever", "overheating"]
+    assert "40.5 deg Celsius" in requests[0]["details"]
+
+
+def test_escalation_queues_requests_and_marks_edge_cow(analyzer):
+    request = {"type": "EFFECTOR_REQUEST", "cow_name": "mucka", "effector": "fan", "reason": "overheating", "turn_on": "True"}
+    message = Message(to="cows-analyzer@xmpp_server", sender="aggregator-mucka@xmpp_server/host")
+    message.set_metadata("performative", "inform")
+    message.set_metadata("devices", "fan,sprinkler")
+    encode_body(message, {"type": "ESCALATION", "cow_name": "mucka", "requests": [request], "sensors": {"temperature": 39.5}})
+    behaviour = CowsAnalyzer.ProfileConsumerBehaviour()
+    behaviour.set_agent(analyzer)
+
+    async def consume():
+        await analyzer.profile_queue.put(message)
+        await behaviour.run()
+        return [analyzer.events.items.popleft() for _ in range(analyzer.events.qsize())]
+
+    assert asyncio.run(consume()) == [request]
+    assert analyzer.edge_rules == {"mucka"}
+    assert analyzer.device_hosts["mucka"] == "aggregator-mucka@xmpp_server"
+    # krowa z regułami na brzegu nie jest już oceniana przy zwykłych profilach
+    analyzer.data["cows"]["history"].append("mucka", time.time(), {"sensors": {"temperature": 40.5, "pH": 6.5, "activity": 0.1, "pulse": 70.0}})
+    analyze = CowsAnalyzer.AnalyzeProfilesBehaviour()
+    analyze.set_agent(analyzer)
+
+    async def analyze_profile():
+        await analyze.on_start()
+        await analyze.handle_profile_update({"type": "PROFILE_UPDATED", "cow_name": "mucka", "channels": None})
+
+    asyncio.run(analyze_profile())
+    assert analyzer.events.qsize() == 0
@@ -0,0 +1,87 @@
+import base64
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents.codec import CODECS, CompactCodec, JsonCodec, SCHEMA_VERSION, decode_body  # noqa: E402
+
+
+class FakeMessage:
+    def __init__(self, body=None):
+        self.body = body
+        self.metadata = {}
+
+    def get_metadata(self, key):
+        return self.metadata.get(key)
+
+    def set_metadata(self, key, value):
+        self.metadata[key] = value
+
+
+PAYLOAD = {
+    "krasula": {"temperature": 40.25, "pH": 6.5, "activity": 1.0, "pulse": 61.5},
+    "readings": [{"humidity": 50.0, "timestamp": 1767225600.123}],
+    "type": "PERIODIC_REPORT",
+    "turn_on": True,
+    "details": None,
+    "samples": 21600,
+    "negative": -3,
+    "long_name": "x" * 300,
+    "many": list(range(40)),
+}
+
+
+@pytest.mark.parametrize("codec", list(CODECS.values()), ids=lambda codec: codec.name)
+def test_codec_round_trip(codec):
+    assert codec.decode(codec.encode(PAYLOAD)) == PAYLOAD
+
+
+def test_compact_keeps_timestamp_precision():
+    codec = CompactCodec()
+    decoded = codec.decode(codec.encode({"timestamp": 1767225600.123456}))
+    assert decoded["timestamp"] == 1767225600.123456
+
+
+def test_compact_is_smaller_than_json():
+    profile = {"krasula": {"temperature": 40.123456, "pH": 6.512345, "activity": 1.012345, "pulse": 61.123456}}
+    assert len(CompactCodec().encode(profile)) < len(JsonCodec().encode(profile))
+
+
+def test_compact_rejects_newer_schema():
+    codec = CompactCodec()
+    raw = bytearray(base64.b64decode(codec.encode({})))
+    raw[1] = SCHEMA_VERSION + 1
+    with pytest.raises(ValueError):
+        codec.decode(base64.b64encode(bytes(raw)).decode("ascii"))
+
+
+def test_decode_body_falls_back_to_json():
+    message = FakeMessage(body='{"temperature": 10.0}')
+    assert decode_body(message) == {"temperature": 10.0}
+
+    message = FakeMessage(body=CompactCodec().encode({"temperature": 10.0}))
+    message.set_metadata("encoding", "compact")
+    assert decode_body(message) == {"temperature": 10.0}
+
+
+def test_compact_keeps_ints_outside_int64():
+    codec = CompactCodec()
+    values = [2 ** 63 - 1, 2 ** 63, -2 ** 63, -2 ** 63 - 1, 10 ** 30, -(10 ** 30)]
+    assert codec.decode(codec.encode({"big": values})) == {"big": values}
+
+
+@pytest.mark.parametrize("value", [38.7, 0.1, 6.512345, 1e-9, 123456789.5, 1e300, -1e40, 16777217.0])
+def test_compact_floats_round_trip_exactly(value):
+    codec = CompactCodec()
+    assert codec.decode(codec.encode({"temperature": value}))["temperature"] == value
+
+
+def test_compact_uses_float32_only_for_exact_values():
+    codec = CompactCodec()
+    exact = base64.b64decode(codec.encode(40.25))
+    inexact = base64.b64decode(codec.encode(40.2))
+    assert len(exact) == 2 + 1 + 4
+    assert len(inexact) == 2 + 1 + 8
@@ -0,0 +1,42 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.command_tracker import CommandTracker  # noqa: E402
+
+KEY = ("mucka", "sprinkler", "True")
+
+
+def test_tracker_suppresses_duplicates_while_in_flight():
+    tracker = CommandTracker(cooldown=30)
+    assert tracker.should_send(KEY, now=0)
+    tracker.start(KEY, "c1", now=0)
+
+    assert not tracker.should_send(KEY, now=1)
+    assert tracker.should_send(("mucka", "fan", "True"), now=1)
+    assert tracker.stats() == {"in_flight": 1, "suppressed": 1}
+
+
+def test_tracker_applies_cooldown_after_finish():
+    tracker = CommandTracker(cooldown=30)
+    tracker.start(KEY, "c1", now=0)
+    tracker.finish("c1", now=5)
+
+    assert not tracker.should_send(KEY, now=20)
+    assert tracker.should_send(KEY, now=20, ignore_cooldown=True)
+    assert tracker.should_send(KEY, now=35)
+
+
+def test_tracker_keeps_command_in_flight_until_conversation_ends():
+    # rozmowa AGREED może trwać REQUEST_TIMEOUT + ACTION_TIMEOUT - polecenia nie wysyłamy ponownie w jej trakcie
+    tracker = CommandTracker(cooldown=30)
+    tracker.start(KEY, "c1", now=0)
+
+    assert not tracker.should_send(KEY, now=31)
+    assert not tracker.should_send(KEY, now=69)
+    tracker.finish("c1", now=70)
+
+    assert "c1" not in tracker.keys and KEY not in tracker.in_flight
+    assert not tracker.should_send(KEY, now=71)
+    assert tracker.should_send(KEY, now=100)
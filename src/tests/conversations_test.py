@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.conversations import AGREED, DONE, REQUESTED, TIMED_OUT, ConversationManager  # noqa: E402
+
+
+def conversation():
+    return {"cow_name": "mucka", "effector": "fan", "reason": "overheating"}
+
+
+def test_finished_conversation_is_removed():
+    manager = ConversationManager(request_timeout=10, action_timeout=60)
+    manager.start("c1", conversation(), now=0)
+    assert manager.get("c1")["state"] == REQUESTED
+
+    manager.transition("c1", AGREED, now=1)
+    finished = manager.transition("c1", DONE, now=5)
+
+    assert finished["state"] == DONE
+    assert len(manager) == 0
+    assert manager.expire(now=1000) == []
+
+
+def test_conversation_times_out_without_reply():
+    manager = ConversationManager(request_timeout=10, action_timeout=60)
+    manager.start("c1", conversation(), now=0)
+    manager.start("c2", conversation(), now=5)
+
+    expired = manager.expire(now=10)
+
+    assert [cid for cid, _ in expired] == ["c1"]
+    assert expired[0][1]["state"] == TIMED_OUT
+    assert expired[0][1]["timed_out_in"] == REQUESTED
+    assert manager.get("c2") is not None
+
+
+def test_agree_moves_deadline_to_action_timeout():
+    manager = ConversationManager(request_timeout=10, action_timeout=60)
+    manager.start("c1", conversation(), now=0)
+    manager.transition("c1", AGREED, now=2)
+
+    assert manager.expire(now=30) == []
+    expired = manager.expire(now=62)
+    assert expired[0][1]["timed_out_in"] == AGREED
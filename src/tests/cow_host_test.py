@@ -0,0 +1,119 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spade")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from spade.message import Message  # noqa: E402
+
+from agents.cow_host import CowHost  # noqa: E402
+
+
+class FakeSensor:
+    def __init__(self, channel, value, deadband_filter=None):
+        self.channel = channel
+        self.value = value
+        self.sampling = None
+        self.deadband_filter = deadband_filter
+        self.sequence = 0
+
+    def collect_data(self):
+        return {self.channel: self.value}
+
+    def stamp(self, data):
+        self.sequence += 1
+        return data | {"seq": self.sequence, "timestamp": 100.0}
+
+
+class FakeEffector:
+    def __init__(self, device):
+        self.device = device
+        self.jid = f"effector-{device}-mucka@xmpp_server"
+        self.host = None
+        self.requests = []
+
+    def attach(self, host):
+        self.host = host
+
+    def callback(self, message):
+        self.requests.append(message)
+
+
+class SilentDeadband:
+    def is_significant(self, data):
+        return False
+
+
+def make_host(monkeypatch, sensors, effectors=()):
+    monkeypatch.setenv("NAME", "mucka")
+    return CowHost(sensors, list(effectors))
+
+
+def test_read_sensors_fans_all_channels_into_one_profile(monkeypatch):
+    sensors = [FakeSensor("temperature", 38.0), FakeSensor("pH", 6.5), FakeSensor("activity", 0.1), FakeSensor("pulse", 70)]
+    host = make_host(monkeypatch, sensors)
+    batches = []
+    behaviour = CowHost.ReadSensors(sensors=sensors, data_aggregator=batches.append)
+
+    asyncio.run(behaviour.run())
+
+    assert len(batches) == 1
+    assert [list(reading)[0] for reading in batches[0]] == ["temperature", "pH", "activity", "pulse"]
+
+    host.aggregate_readings(batches[0])
+    [(_, profile)] = host.outbox.pending.values()
+    assert profile["temperature"] == 38.0 and profile["pulse"] == 70
+    assert set(profile["sources"]) == {"temperature", "pH", "activity", "pulse"}
+
+
+def test_read_sensors_skips_filtered_and_resting_sensors(monkeypatch):
+    sensors = [FakeSensor("temperature", 38.0), FakeSensor("pH", 6.5, deadband_filter=SilentDeadband()), FakeSensor("pulse", 70)]
+    make_host(monkeypatch, sensors)
+    batches = []
+    behaviour = CowHost.ReadSensors(sensors=sensors, data_aggregator=batches.append)
+    behaviour.next_sample_at[sensors[2]] = float("inf")
+
+    asyncio.run(behaviour.run())
+
+    assert batches == [[{"temperature": 38.0, "seq": 1, "timestamp": 100.0}]]
+
+
+def test_route_requests_delivers_to_device(monkeypatch):
+    sprinkler, feeder = FakeEffector("sprinkler"), FakeEffector("feeder")
+    host = make_host(monkeypatch, [], [sprinkler, feeder])
+    assert sprinkler.host is host
+    assert host.profile_metadata["devices"] == "sprinkler,feeder"
+
+    message = Message(to="aggregator-mucka@xmpp_server", sender="cows-analyzer@xmpp_server")
+    message.set_metadata("performative", "request")
+    message.set_metadata("device", "feeder")
+    behaviour = CowHost.RouteRequests(effectors=host.effectors)
+
+    async def receive(timeout=None):
+        return message
+    behaviour.receive = receive
+    asyncio.run(behaviour.run())
+
+    assert [request.get_metadata("device") for request in feeder.requests] == ["feeder"]
+    assert sprinkler.requests == []
+
+
+def test_only_routing_behaviours_queue_inbound_stanzas(monkeypatch):
+    host = make_host(monkeypatch, [FakeSensor("pulse", 70)], [FakeEffector("feeder")])
+    host.watch_analyzer_presence = lambda: None
+
+    async def dispatch_stanzas():
+        await host.setup()
+        for performative in ("request",) * 100 + ("inform",) * 10:
+            message = Message(to="aggregator-mucka@xmpp_server", sender="cows-analyzer@xmpp_server")
+            message.set_metadata("performative", performative)
+            message.set_metadata("device", "feeder")
+            await asyncio.gather(*host.dispatch(message))
+        await asyncio.sleep(0)
+        return {type(behaviour).__name__: behaviour.mailbox_size() for behaviour in host.behaviours}
+
+    assert asyncio.run(dispatch_stanzas()) == {"ReadSensors": 0, "RouteRequests": 100, "AggregateData": 10, "SendProfiles": 0}
@@ -0,0 +1,54 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.event_queue import CoalescingQueue  # noqa: E402
+
+
+def profile_updated(cow_name, channels):
+    return {"type": "PROFILE_UPDATED", "cow_name": cow_name, "channels": channels}
+
+
+def drain(queue):
+    async def collect():
+        return [await queue.get() for _ in range(queue.qsize())]
+    return asyncio.run(collect())
+
+
+def test_queue_keeps_one_profile_update_per_cow():
+    queue = CoalescingQueue("cow_name")
+    queue.put_nowait(profile_updated("mucka", ["temperature"]))
+    queue.put_nowait(profile_updated("krasula", ["pH"]))
+    queue.put_nowait(profile_updated("mucka", ["pulse", "temperature"]))
+    assert queue.stats() == {"depth": 2, "coalesced": 1}
+
+    events = drain(queue)
+
+    assert [event["cow_name"] for event in events] == ["mucka", "krasula"]
+    assert events[0]["channels"] == ["temperature", "pulse"]
+    assert queue.coalesced == 1
+
+
+def test_queue_does_not_merge_effector_requests():
+    queue = CoalescingQueue("cow_name")
+    request = {"type": "EFFECTOR_REQUEST", "cow_name": "mucka", "effector": "fan"}
+    queue.put_nowait(request)
+    queue.put_nowait(profile_updated("mucka", None))
+    queue.put_nowait(request)
+    queue.put_nowait(profile_updated("mucka", ["pH"]))
+
+    events = drain(queue)
+
+    assert [event["type"] for event in events] == ["EFFECTOR_REQUEST", "PROFILE_UPDATED", "EFFECTOR_REQUEST"]
+    assert events[1]["channels"] is None
+
+
+def test_queue_accepts_new_update_after_previous_was_taken():
+    queue = CoalescingQueue("cow_name")
+    queue.put_nowait(profile_updated("mucka", ["pH"]))
+    drain(queue)
+    queue.put_nowait(profile_updated("mucka", ["pulse"]))
+
+    assert drain(queue)[0]["channels"] == ["pulse"]
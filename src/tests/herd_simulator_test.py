@@ -0,0 +1,50 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("spade")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "herd_simulator"))
+
+from agents.herd_simulator import Herd  # noqa: E402
+
+
+def test_herd_starts_from_sensor_initial_values():
+    herd = Herd(3, "herd", seed=1)
+
+    assert herd.names == ["herd-00000", "herd-00001", "herd-00002"]
+    assert herd.profiles(0, 3)["herd-00001"] == {"temperature": 40.0, "pH": 6.5, "activity": 1.0, "pulse": 60.0}
+
+
+def test_herd_step_is_reproducible_with_seed():
+    first, second = Herd(100, "herd", seed=7), Herd(100, "herd", seed=7)
+    for _ in range(5):
+        first.step()
+        second.step()
+
+    assert first.profiles(0, 100) == second.profiles(0, 100)
+    assert first.profiles(0, 100) != Herd(100, "herd", seed=7).profiles(0, 100)
+
+
+def test_herd_step_stays_within_random_walk_bounds():
+    herd = Herd(1000, "herd", seed=3)
+    herd.step()
+
+    assert np.all(np.abs(herd.temperature - 40.0) <= 0.5)
+    assert np.all(np.abs(herd.pH - 6.5) <= 0.1)
+    assert np.all(np.abs(herd.pulse - 60.0) <= 2)
+    assert np.all((herd.activity >= 0.8) & (herd.activity <= 1.2))
+    # każda krowa dostaje własny krok, a nie jeden wspólny dla stada
+    assert len(np.unique(herd.temperature)) > 900
+
+
+def test_herd_profiles_slice_per_cow_values():
+    herd = Herd(10, "herd", seed=5)
+    herd.step()
+    profiles = herd.profiles(2, 5)
+
+    assert list(profiles) == ["herd-00002", "herd-00003", "herd-00004"]
+    assert profiles["herd-00003"]["pulse"] == herd.pulse[3]
+    assert all(isinstance(value, float) for profile in profiles.values() for value in profile.values())
@@ -0,0 +1,58 @@
+import os
+import sys
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.history import History, Series  # noqa: E402
+
+CHANNELS = ('temperature', 'pH', 'activity', 'pulse')
+
+
+def sensors(temperature):
+    return {"temperature": temperature, "pH": 6.5, "activity": 0.1, "pulse": 70}
+
+
+def test_series_keeps_newest_rows_up_to_capacity():
+    series = Series(CHANNELS, capacity=3)
+    for i in range(200):
+        series.append(float(i), sensors(38.0 + i / 100))
+
+    assert len(series) == 3
+    assert series.tail(2)["temperature"].tolist() == pytest.approx([39.98, 39.99], abs=1e-4)
+    assert len(series.timestamps) <= 2 * 64
+
+
+def test_series_expires_rows_by_time():
+    series = Series(CHANNELS, capacity=100, retention=10)
+    for i in range(30):
+        series.append(float(i), sensors(38.0))
+
+    assert series.timestamps[series.start:series.end].tolist() == [float(i) for i in range(19, 30)]
+
+
+def test_series_tail_columns_and_missing_channels():
+    series = Series(CHANNELS, capacity=10)
+    series.append(1.0, {"temperature": 38.0})
+    series.append(2.0, sensors(39.0))
+
+    readings = series.tail(5)
+    assert readings["temperature"].tolist() == [38.0, 39.0]
+    assert np.isnan(readings["pulse"][0]) and readings["pulse"][1] == 70
+    assert series[0] == {"timestamp": "1970-01-01T00:00:01+00:00", "sensors": {"temperature": 38.0}}
+    assert series.sensors(series.end - 1) == sensors(39.0) | {"pH": pytest.approx(6.5), "activity": pytest.approx(0.1)}
+
+
+def test_history_merges_backfill_in_order():
+    history = History(CHANNELS, capacity=4)
+    history.append("mucka", 1.0, {"sensors": sensors(38.1)})
+    history.append("mucka", 4.0, {"sensors": sensors(38.4)})
+
+    merged = history.merge("mucka", [(2.0, {"sensors": sensors(38.2)}), (3.0, {"sensors": sensors(38.3)}),
+                                     (5.0, {"sensors": sensors(38.5)})])
+
+    assert merged.timestamps[merged.start:merged.end].tolist() == [2.0, 3.0, 4.0, 5.0]
+    assert merged.tail(4)["temperature"].tolist() == pytest.approx([38.2, 38.3, 38.4, 38.5], abs=1e-4)
@@ -0,0 +1,46 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents.hub_table import HubTable, aggregator_jid, cow_name_from_sensor, hub_index  # noqa: E402
+
+CHANNELS = ('temperature', 'pH', 'activity', 'pulse')
+
+
+def test_hub_assignment_is_deterministic():
+    names = [f"cow{i}" for i in range(100)]
+
+    assert [hub_index(name, 4) for name in names] == [hub_index(name, 4) for name in names]
+    assert set(hub_index(name, 4) for name in names) == {0, 1, 2, 3}
+    assert aggregator_jid("cow7", hub_count=0) == "aggregator-cow7@xmpp_server"
+    assert aggregator_jid("cow7", hub_count=4) == f"aggregator-hub-{hub_index('cow7', 4)}@xmpp_server"
+
+
+def test_cow_name_is_parsed_from_sensor_jid():
+    assert cow_name_from_sensor("cow-7-TemperatureSensor@xmpp_server/resource") == "cow-7"
+
+
+def test_hub_table_collects_only_complete_profiles():
+    table = HubTable(CHANNELS)
+    table.update("mucka", {"temperature": 38.5, "pH": 6.5, "activity": 0.1, "pulse": 70})
+    table.update("krasula", {"temperature": 38.0})
+
+    profiles = table.collect()
+
+    assert profiles == {"mucka": {"temperature": 38.5, "pH": 6.5, "activity": 0.1, "pulse": 70}}
+    assert table.collect() == {}
+
+
+def test_hub_table_tracks_sources_per_cow():
+    table = HubTable(CHANNELS, keep_last_known=True)
+    table.update("mucka", {"temperature": 38.5, "pH": 6.5, "activity": 0.1, "pulse": 70})
+    table.update("mucka", {"pulse": 72, "seq": 3, "timestamp": 10.0})
+    table.update("mucka", {"pulse": 74, "seq": 4, "timestamp": 11.0})
+
+    profile = table.collect()["mucka"]
+
+    assert profile["pulse"] == 74
+    assert profile["sources"] == {"pulse": {"first": 3, "seq": 4, "timestamp": 11.0}}
+    table.update("mucka", {"temperature": 38.6})
+    assert table.collect()["mucka"]["pulse"] == 74
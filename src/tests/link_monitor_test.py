@@ -0,0 +1,73 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.link_monitor import LinkMonitor  # noqa: E402
+
+
+def source(seq, timestamp, first=None):
+    return {"first": seq if first is None else first, "seq": seq, "timestamp": timestamp}
+
+
+def test_link_monitor_counts_lost_readings():
+    monitor = LinkMonitor(reorder_window=0)
+    monitor.observe("mucka", {"pulse": source(1, 1.0)}, 1.1)
+    monitor.observe("mucka", {"pulse": source(5, 5.0)}, 5.2)
+
+    stats = monitor.stats("mucka")
+    assert stats["lost"] == 3
+    assert abs(stats["delay_max"] - 0.2) < 1e-9
+
+
+def test_link_monitor_does_not_count_collapsed_readings_as_lost():
+    monitor = LinkMonitor(reorder_window=0)
+    monitor.observe("mucka", {"pulse": source(1, 1.0)}, 1.0)
+    monitor.observe("mucka", {"pulse": source(4, 4.0, first=2)}, 4.0)
+
+    assert monitor.stats("mucka")["lost"] == 0
+
+
+def test_link_monitor_detects_duplicates_and_late_readings():
+    monitor = LinkMonitor(reorder_window=0)
+    assert monitor.observe("mucka", {"pulse": source(1, 1.0)}, 1.0)
+    assert monitor.observe("mucka", {"pulse": source(3, 3.0)}, 3.0)
+    assert not monitor.observe("mucka", {"pulse": source(3, 3.0)}, 3.1)
+    assert monitor.observe("mucka", {"pulse": source(2, 2.0)}, 3.2)
+
+    stats = monitor.stats("mucka")
+    assert stats["duplicates"] == 1
+    assert stats["late"] == 1
+    assert stats["lost"] == 0
+
+
+def test_link_monitor_resets_after_sensor_restart():
+    monitor = LinkMonitor(reorder_window=0)
+    monitor.observe("mucka", {"pulse": source(50, 50.0)}, 50.0)
+    assert monitor.observe("mucka", {"pulse": source(1, 60.0)}, 60.0)
+    monitor.observe("mucka", {"pulse": source(2, 61.0)}, 61.0)
+
+    stats = monitor.stats("mucka")
+    assert stats["late"] == 0
+    assert stats["lost"] == 0
+
+
+def test_link_monitor_reorders_within_window():
+    monitor = LinkMonitor(reorder_window=1.0)
+    monitor.push("mucka", 10.5, "second")
+    monitor.push("mucka", 10.0, "first")
+
+    assert monitor.pop_ready(now=11.0) == [("mucka", 10.0, "first")]
+    assert monitor.pop_ready(now=11.5) == [("mucka", 10.5, "second")]
+
+    monitor.push("mucka", 10.2, "too late")
+    assert monitor.pop_ready(now=20.0) == []
+
+
+def test_link_monitor_skips_delay_for_replayed_sources():
+    monitor = LinkMonitor(reorder_window=0)
+    monitor.observe("mucka", {"pulse": source(1, 1.0)}, None)
+
+    stats = monitor.stats("mucka")
+    assert stats["delay_max"] == 0.0
+    assert stats["delay_avg"] == 0.0
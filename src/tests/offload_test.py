@@ -0,0 +1,43 @@
+import asyncio
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.offload import LoopLag, make_executor, offload  # noqa: E402
+
+
+def current_thread_name():
+    return threading.current_thread().name
+
+
+def test_offload_without_executor_runs_inline():
+    assert make_executor("none") is None
+    assert asyncio.run(offload(None, current_thread_name)) == threading.current_thread().name
+
+
+def test_offload_runs_in_thread_pool():
+    executor = make_executor("thread", 1)
+    try:
+        assert asyncio.run(offload(executor, current_thread_name)).startswith("analysis")
+    finally:
+        executor.shutdown()
+
+
+def test_make_executor_rejects_unknown_kind():
+    with pytest.raises(ValueError):
+        make_executor("gpu")
+
+
+def test_loop_lag_stats_and_reset():
+    lag = LoopLag()
+    for value in (0.01, 0.03, -0.001):
+        lag.record(value)
+
+    assert lag.stats() == {"last": 0.0, "max": 0.03, "avg": round(0.04 / 3, 4), "count": 3}
+    lag.reset()
+    assert lag.stats()["count"] == 0
+    assert lag.stats()["max"] == 0.0
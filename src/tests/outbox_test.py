@@ -0,0 +1,49 @@
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents.outbox import Outbox  # noqa: E402
+
+
+def merge_first(older, newer):
+    return newer | {"first": older["first"]}
+
+
+def test_outbox_keeps_newest_profile_per_key():
+    outbox = Outbox(capacity=8)
+    outbox.put("mucka", {"temperature": 38.0, "first": 1})
+    outbox.put("krasula", {"temperature": 38.5, "first": 1})
+    outbox.put("mucka", {"temperature": 39.0, "first": 2}, merge=merge_first)
+
+    first = asyncio.run(outbox.get())
+    second = asyncio.run(outbox.get())
+
+    assert first[0] == "krasula"
+    assert second[0] == "mucka"
+    assert second[2] == {"temperature": 39.0, "first": 1}
+    assert outbox.stats()["coalesced"] == 1
+
+
+def test_outbox_drops_oldest_key_when_full():
+    outbox = Outbox(capacity=2)
+    for name in ("mucka", "krasula", "łaciata"):
+        outbox.put(name, {})
+
+    assert len(outbox) == 2
+    assert list(outbox.pending) == ["krasula", "łaciata"]
+    assert outbox.stats()["dropped"] == 1
+
+
+def test_outbox_records_send_latency():
+    outbox = Outbox(capacity=2)
+    outbox.put("mucka", {})
+    _, queued_at, _ = asyncio.run(outbox.get())
+
+    outbox.record_sent(queued_at)
+
+    stats = outbox.stats()
+    assert stats["sent"] == 1
+    assert stats["depth"] == 0
+    assert stats["latency_max"] >= 0.0
@@ -0,0 +1,97 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "cow_analysis"))
+sys.path.insert(0, os.path.join(TESTS_DIR, "..", "farmer"))
+
+from agents.report_delta import DeltaReporter, split_report  # noqa: E402
+from agents.report_state import ReportState  # noqa: E402
+
+WINDOW = {"from": "2024-01-01T00:00:00", "to": "2024-01-01T06:00:00"}
+
+
+def entry(temperature, samples=1):
+    stats = {"last": temperature, "avg": temperature, "min": temperature, "max": temperature, "var": 0.0, "count": samples}
+    return {"temperature": stats, "pH": None, "samples": samples}
+
+
+def test_delta_reporter_sends_only_changed_entries():
+    reporter = DeltaReporter(("temperature", "pH"), tolerance=0.05, full_every=10)
+
+    full = reporter.encode({"mucka": entry(38.0), "krasula": entry(38.5)}, WINDOW)
+    delta = reporter.encode({"mucka": entry(38.01, samples=2), "krasula": entry(39.0)}, WINDOW)
+
+    assert full["mode"] == "full" and full["seq"] == 1
+    assert delta["mode"] == "delta" and delta["seq"] == 2
+    assert list(delta["report"]) == ["krasula"]
+    assert delta["removed"] == []
+
+
+def test_delta_reporter_sends_full_snapshot_periodically_and_on_resync():
+    reporter = DeltaReporter(("temperature",), tolerance=0.05, full_every=2)
+    modes = [reporter.encode({"mucka": entry(38.0)}, WINDOW)["mode"] for _ in range(4)]
+    assert modes == ["full", "delta", "delta", "full"]
+
+    reporter.request_resync()
+    assert reporter.encode({"mucka": entry(38.0)}, WINDOW)["mode"] == "full"
+
+
+def test_report_state_reassembles_deltas():
+    reporter = DeltaReporter(("temperature", "pH"), tolerance=0.05, full_every=10)
+    state = ReportState()
+
+    state.apply(reporter.encode({"mucka": entry(38.0), "krasula": entry(38.5)}, WINDOW))
+    state.apply(reporter.encode({"mucka": entry(39.2)}, WINDOW))
+
+    assert state.report == {"mucka": entry(39.2)}
+    assert state.window == WINDOW
+
+
+def test_report_state_requests_resync_once_after_gap():
+    reporter = DeltaReporter(("temperature",), tolerance=0.05, full_every=10)
+    state = ReportState()
+    state.apply(reporter.encode({"mucka": entry(38.0)}, WINDOW))
+    reporter.encode({"mucka": entry(38.5)}, WINDOW)
+
+    assert state.apply(reporter.encode({"mucka": entry(39.0)}, WINDOW)) is True
+    assert state.awaiting_full
+    assert state.apply(reporter.encode({"mucka": entry(39.5)}, WINDOW)) is False
+
+    reporter.request_resync()
+    assert state.apply(reporter.encode({"mucka": entry(39.5)}, WINDOW)) is False
+    assert not state.awaiting_full
+    assert state.report == {"mucka": entry(39.5)}
+
+
+def test_split_report_bounds_chunk_size():
+    payload = {"type": "PERIODIC_REPORT", "report": {f"cow-{i}": entry(38.0) for i in range(5)}, "removed": ["mucka"]}
+    parts = list(split_report(payload, 2, "r1"))
+
+    assert [len(part["report"]) for part in parts] == [2, 2, 1]
+    assert [(part["chunk"], part["total"], part["report_id"]) for part in parts] == [(0, 3, "r1"), (1, 3, "r1"), (2, 3, "r1")]
+    assert parts[0]["removed"] == ["mucka"] and "removed" not in parts[1]
+    assert len(list(split_report(payload, 0, "r2"))) == 1
+
+
+def test_report_state_reassembles_chunks_incrementally():
+    reporter = DeltaReporter(("temperature",), tolerance=0.05, full_every=10)
+    state = ReportState()
+    state.report = {"stara": entry(37.0)}
+
+    parts = list(split_report(reporter.encode({f"cow-{i}": entry(38.0) for i in range(3)}, WINDOW), 2, "r1"))
+    state.apply(parts[0])
+    assert "cow-0" in state.report and "stara" in state.report
+    state.apply(parts[1])
+    assert sorted(state.report) == ["cow-0", "cow-1", "cow-2"]
+    assert state.seq == 1
+
+
+def test_report_state_requests_resync_after_lost_chunk():
+    reporter = DeltaReporter(("temperature",), tolerance=0.05, full_every=10)
+    state = ReportState()
+    parts = list(split_report(reporter.encode({f"cow-{i}": entry(38.0) for i in range(3)}, WINDOW), 1, "r1"))
+
+    state.apply(parts[0])
+    assert state.apply(parts[2]) is True
+    assert state.awaiting_full
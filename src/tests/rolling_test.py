@@ -0,0 +1,78 @@
+import os
+import statistics
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.rolling import RollingProfile, RollingStats  # noqa: E402
+from agents.summary import reading_summary  # noqa: E402
+
+
+def test_rolling_stats_match_window_after_eviction():
+    values = [5, 1, 4, 9, 2, 6, 3, 8]
+    stats = RollingStats(span=3)
+    for timestamp, value in enumerate(values):
+        stats.add(float(timestamp), reading_summary(value))
+
+    window = values[-4:]
+    snapshot = stats.snapshot()
+    assert snapshot["count"] == 4
+    assert snapshot["min"] == min(window)
+    assert snapshot["max"] == max(window)
+    assert snapshot["last"] == 8
+    assert abs(snapshot["avg"] - statistics.mean(window)) < 1e-9
+    assert abs(snapshot["var"] - statistics.pvariance(window)) < 1e-9
+
+
+def test_rolling_stats_empty_after_window_passes():
+    stats = RollingStats(span=10)
+    stats.add(0.0, reading_summary(38.5))
+
+    stats.expire(100.0)
+
+    assert stats.snapshot() is None
+
+
+def test_rolling_profile_uses_window_summaries():
+    rolling = RollingProfile(("temperature", "humidity"), span=60)
+    rolling.add(1.0, {
+        "sensors": {"temperature": 20.0, "humidity": 50.0},
+        "summary": {"temperature": {"count": 3, "sum": 60.0, "min": 19.0, "max": 21.0, "last": 20.0, "var": 0.5}}
+    })
+    rolling.add(2.0, {"sensors": {"temperature": 22.0, "humidity": 52.0}})
+
+    snapshot = rolling.snapshot()
+    assert snapshot["temperature"]["count"] == 4
+    assert snapshot["temperature"]["max"] == 22.0
+    assert snapshot["humidity"]["count"] == 2
+
+
+def test_rolling_stats_merge_inserts_older_samples():
+    stats, expected = RollingStats(span=10), RollingStats(span=10)
+    for timestamp, value in ((5.0, 4), (7.0, 1), (12.0, 6)):
+        stats.add(timestamp, reading_summary(value))
+    stats.merge([(8.0, reading_summary(9)), (1.0, reading_summary(0)), (3.0, reading_summary(2))])
+
+    for timestamp, value in ((1.0, 0), (3.0, 2), (5.0, 4), (7.0, 1), (8.0, 9), (12.0, 6)):
+        expected.add(timestamp, reading_summary(value))
+    assert stats.snapshot() == pytest.approx(expected.snapshot())
+    assert stats.snapshot()["count"] == 5 and stats.snapshot()["last"] == 6
+
+
+def test_rolling_stats_memory_does_not_grow_with_samples():
+    stats = RollingStats(span=3600, buckets=60)
+    values = [float(i % 17) for i in range(20000)]
+    for i, value in enumerate(values):
+        stats.add(i * 0.5, reading_summary(value))
+
+    assert len(stats.buckets) <= 61
+    assert len(stats.minimums) <= 61 and len(stats.maximums) <= 61
+    # okno zaczyna się od kubełka zawierającego chwilę (ostatnia próbka - span): 9999.5 - 3600 -> od 6360 s
+    window = values[int(6360 / 0.5):]
+    snapshot = stats.snapshot()
+    assert snapshot["count"] == len(window)
+    assert snapshot["min"] == 0.0 and snapshot["max"] == 16.0 and snapshot["last"] == values[-1]
+    assert abs(snapshot["avg"] - statistics.mean(window)) < 1e-6
+    assert abs(snapshot["var"] - statistics.pvariance(window)) < 1e-6
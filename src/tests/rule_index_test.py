@@ -0,0 +1,26 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.rule_index import RuleIndex  # noqa: E402
+from agents.rules import default_rules  # noqa: E402
+
+
+def names(rules):
+    return [rule.name for rule in rules]
+
+
+def test_rule_index_selects_rules_reading_changed_channels():
+    index = RuleIndex(default_rules())
+
+    assert names(index.affected(["temperature"])) == ["FEVER", "OVERHEATING"]
+    assert names(index.affected(["activity"])) == ["STRESS", "HUNGER"]
+    assert names(index.affected(["pH", "pulse"])) == ["STRESS", "HUNGER"]
+    assert index.affected([]) == []
+
+
+def test_rule_index_runs_everything_without_change_information():
+    index = RuleIndex(default_rules())
+
+    assert names(index.affected(None)) == ["FEVER", "OVERHEATING", "STRESS", "HUNGER"]
@@ -0,0 +1,47 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents.rules import default_rules  # noqa: E402
+
+
+def profile(temperature=38.5, ph=6.5, activity=0.1, pulse=70):
+    return {"sensors": {"temperature": temperature, "pH": ph, "activity": activity, "pulse": pulse}}
+
+
+def fired(history):
+    return sorted(result["reason"] for rule in default_rules() if (result := rule.analyze("mucka", history)))
+
+
+def test_rules_stay_quiet_for_normal_profile():
+    assert fired([profile()]) == []
+
+
+def test_rules_fire_on_their_thresholds():
+    assert fired([profile(temperature=40.5)]) == ["fever", "overheating"]
+    assert fired([profile(pulse=95, activity=0.3)]) == ["stress"]
+    assert fired([profile(ph=5.8, activity=0.3)]) == ["hunger"]
+
+
+def test_rules_need_history():
+    assert fired([]) == []
+
+
+def test_rule_conditions_match_analyze_on_herd_columns():
+    np = pytest.importorskip("numpy")
+    rng = np.random.default_rng(7)
+    herd = {
+        "temperature": rng.uniform(37.5, 41.0, 200).astype(np.float32),
+        "pH": rng.uniform(5.5, 7.0, 200).astype(np.float32),
+        "activity": rng.uniform(0.0, 0.5, 200).astype(np.float32),
+        "pulse": rng.uniform(60, 110, 200).astype(np.float32),
+    }
+
+    for rule in default_rules():
+        mask = rule.condition(herd)
+        for i in range(200):
+            sensors = {channel: float(values[i]) for channel, values in herd.items()}
+            assert bool(mask[i]) == bool(rule.analyze("mucka", [{"sensors": sensors}]))
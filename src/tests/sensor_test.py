@@ -0,0 +1,127 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spade")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents import sensor  # noqa: E402
+from agents.pedometer_sensor import PedometerSensor  # noqa: E402
+from agents.ph_sensor import PHSensor  # noqa: E402
+from agents.pulse_sensor import PulseSensor  # noqa: E402
+from agents.sensor import AdaptiveSampling, Deadband  # noqa: E402
+
+FAST, SLOW = 1, 5
+
+
+def sampling(sensor_class):
+    return AdaptiveSampling(sensor_class.normal_band, sensor_class.watch_margin, FAST, SLOW, sensor_class.watch_thresholds)
+
+
+def test_upper_band_switches_to_fast_within_margin():
+    pulse = sampling(PulseSensor)
+
+    assert pulse.next_period({"pulse": 60}) == SLOW
+    assert pulse.next_period({"pulse": 80}) == SLOW
+    assert pulse.next_period({"pulse": 80.5}) == FAST
+    assert pulse.next_period({"pulse": 95}) == FAST
+    assert pulse.next_period({"pulse": 70}) == SLOW
+
+
+def test_lower_band_switches_to_fast_within_margin():
+    ph = sampling(PHSensor)
+
+    assert ph.next_period({"pH": 6.5}) == SLOW
+    assert ph.next_period({"pH": 6.15}) == FAST
+    assert ph.next_period({"pH": 5.8}) == FAST
+    assert ph.next_period({"pH": 6.3}) == SLOW
+
+
+def test_pedometer_samples_fast_near_stress_and_hunger_threshold():
+    activity = sampling(PedometerSensor)
+
+    assert activity.next_period({"activity": 0.1}) == SLOW
+    assert activity.next_period({"activity": 0.16}) == FAST
+    assert activity.next_period({"activity": 0.24}) == FAST
+    # zdrowa krowa z aktywnością ok. 1.0 zostaje przy wolnym próbkowaniu
+    assert activity.next_period({"activity": 1.0}) == SLOW
+
+
+def test_watch_closely_forces_fast_period_until_it_expires(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sensor.time, "time", lambda: now[0])
+    pulse = sampling(PulseSensor)
+
+    pulse.watch_closely(120)
+    assert pulse.next_period({"pulse": 60}) == FAST
+
+    pulse.watch_closely(30)
+    now[0] += 119
+    assert pulse.next_period({"pulse": 60}) == FAST
+
+    now[0] += 2
+    assert pulse.next_period({"pulse": 60}) == SLOW
+
+
+def test_deadband_absolute_threshold():
+    deadband = Deadband(threshold=0.1)
+
+    assert deadband.is_significant({"temperature": 38.0})
+    assert not deadband.is_significant({"temperature": 38.05})
+    assert deadband.is_significant({"temperature": 38.15})
+    # porównujemy z ostatnią wysłaną wartością, a nie z ostatnim odczytem
+    assert not deadband.is_significant({"temperature": 38.2})
+
+
+def test_deadband_relative_threshold():
+    deadband = Deadband(threshold=0.1, relative=True)
+
+    assert deadband.is_significant({"activity": 1.0})
+    assert not deadband.is_significant({"activity": 1.09})
+    assert deadband.is_significant({"activity": 0.85})
+    assert not deadband.is_significant({"activity": 0.9})
+
+
+def test_deadband_heartbeat_after_max_silence(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sensor.time, "time", lambda: now[0])
+    deadband = Deadband(threshold=1.0, max_silence=60)
+
+    assert deadband.is_significant({"pulse": 60})
+    now[0] += 59
+    assert not deadband.is_significant({"pulse": 60})
+    now[0] += 1
+    assert deadband.is_significant({"pulse": 60})
+    assert not deadband.is_significant({"pulse": 60})
+
+
+def test_batch_window_flushes_on_filtered_reading(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(sensor.time, "time", lambda: now[0])
+    monkeypatch.setenv("BATCH_WINDOW", "5")
+    readings = iter([60, 70, 70.5])
+    behaviour = sensor.Sensor.ForwardData(
+        data_provider=lambda: {"pulse": next(readings)},
+        stamp=lambda data: data | {"timestamp": now[0]},
+        deadband_filter=Deadband(threshold=1.0, max_silence=60)
+    )
+    sent = []
+
+    async def forward_data(data):
+        sent.append(data)
+    behaviour.forward_data = forward_data
+
+    asyncio.run(behaviour.run())
+    now[0] += 1
+    asyncio.run(behaviour.run())
+    assert sent == []
+
+    # okno minęło, a kolejny odczyt mieści się w deadbandzie - paczka i tak wychodzi
+    now[0] += 5
+    asyncio.run(behaviour.run())
+
+    assert sent == [{"readings": [{"pulse": 60, "timestamp": 1000.0}, {"pulse": 70, "timestamp": 1001.0}]}]
+    assert behaviour.batch == []
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("spade")
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.cows_analizer import CowsAnalyzer  # noqa: E402
+from agents.report_delta import split_report  # noqa: E402
+
+
+def shard_parts(report_id, cows, chunk_size=1):
+    payload = {"type": "SHARD_REPORT", "shard": 1, "report": {cow: {"samples": 1} for cow in cows}}
+    return list(split_report(payload, chunk_size, report_id))
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("PASSWORD", "secret")
+    return CowsAnalyzer()
+
+
+def test_shard_report_is_committed_only_when_complete(analyzer):
+    parts = shard_parts("r1", ["mucka", "krasula", "bella"])
+
+    analyzer.receive_shard_report(parts[0])
+    analyzer.receive_shard_report(parts[1])
+    assert analyzer.shard_reports == {}
+
+    analyzer.receive_shard_report(parts[2])
+    assert sorted(analyzer.shard_reports[1][1]) == ["bella", "krasula", "mucka"]
+    assert analyzer.shard_chunks == {}
+
+
+def test_shard_report_drops_out_of_order_and_mixed_chunks(analyzer):
+    first, second = shard_parts("r1", ["mucka", "krasula"]), shard_parts("r2", ["bella", "mucka"])
+
+    analyzer.receive_shard_report(first[1])
+    assert analyzer.shard_reports == {} and analyzer.shard_chunks == {}
+
+    # ostatni kawałek innego raportu nie domyka rozpoczętego
+    analyzer.receive_shard_report(first[0])
+    analyzer.receive_shard_report(second[1])
+    assert analyzer.shard_reports == {}
+
+    for part in second:
+        analyzer.receive_shard_report(part)
+    assert sorted(analyzer.shard_reports[1][1]) == ["bella", "mucka"]
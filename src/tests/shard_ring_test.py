@@ -0,0 +1,50 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents.shard_ring import HashRing, analyzer_jid, merge_shard_reports, split_by_analyzer  # noqa: E402
+
+COWS = [f"cow-{i}" for i in range(2000)]
+
+
+def test_ring_spreads_cows_over_shards():
+    ring = HashRing(range(4))
+    counts = {}
+    for cow_name in COWS:
+        shard = ring.shard_for(cow_name)
+        counts[shard] = counts.get(shard, 0) + 1
+
+    assert sorted(counts) == [0, 1, 2, 3]
+    assert min(counts.values()) > len(COWS) / 4 * 0.6
+
+
+def test_adding_shard_moves_only_cows_taken_by_new_shard():
+    before = HashRing(range(4))
+    after = HashRing(range(5))
+    moved = [cow_name for cow_name in COWS if before.shard_for(cow_name) != after.shard_for(cow_name)]
+
+    assert all(after.shard_for(cow_name) == 4 for cow_name in moved)
+    assert len(moved) < len(COWS) / 5 * 1.5
+
+
+def test_analyzer_jid_without_shards_is_single_analyzer():
+    assert analyzer_jid("mucka", 0) == "cows-analyzer@xmpp_server"
+    assert analyzer_jid("mucka", 3).startswith("cows-analyzer-")
+
+
+def test_split_by_analyzer_groups_profiles():
+    profiles = {cow_name: {"temperature": 38.0} for cow_name in COWS[:50]}
+    groups = split_by_analyzer(profiles, 3)
+
+    assert sum(len(group) for group in groups.values()) == 50
+    for jid, group in groups.items():
+        assert all(analyzer_jid(cow_name, 3) == jid for cow_name in group)
+
+
+def test_merge_shard_reports_drops_stale_shards():
+    shard_reports = {1: (100.0, {"krasula": {"samples": 3}}), 2: (10.0, {"mucka": {"samples": 1}})}
+    merged = merge_shard_reports({"laciata": {"samples": 2}}, shard_reports, now=110.0, max_age=45)
+
+    assert sorted(merged) == ["krasula", "laciata"]
+    assert list(shard_reports) == [1]
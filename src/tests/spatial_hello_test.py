@@ -0,0 +1,60 @@
+import asyncio
+import os
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("spade")
+pytest.importorskip("numpy")
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "spatial_analysis"))
+
+from spade.message import Message  # noqa: E402
+
+from agents.spatial_analizer import HELLO_RETRY, HELLO_RETRY_MAX, SpatialAnalyzer  # noqa: E402
+
+AGGREGATOR = "aggregator-obora1@xmpp_server"
+
+
+@pytest.fixture
+def analyzer(monkeypatch):
+    monkeypatch.setenv("PASSWORD", "secret")
+    return SpatialAnalyzer()
+
+
+def test_hello_request_backs_off_per_aggregator(analyzer):
+    assert analyzer.should_request_hello(AGGREGATOR, now=0)
+    assert not analyzer.should_request_hello(AGGREGATOR, now=1)
+    assert analyzer.should_request_hello("aggregator-obora2@xmpp_server", now=1)
+
+    assert analyzer.should_request_hello(AGGREGATOR, now=HELLO_RETRY)
+    assert not analyzer.should_request_hello(AGGREGATOR, now=HELLO_RETRY * 2.5)
+    assert analyzer.should_request_hello(AGGREGATOR, now=HELLO_RETRY * 3)
+
+
+def test_hello_request_backoff_is_capped(analyzer):
+    now = 0
+    for _ in range(20):
+        assert analyzer.should_request_hello(AGGREGATOR, now)
+        now = analyzer.hello_requests[AGGREGATOR][0]
+
+    assert analyzer.hello_requests[AGGREGATOR][1] == HELLO_RETRY_MAX
+
+
+def test_only_router_queues_inbound_messages(analyzer):
+    analyzer.presence = SimpleNamespace()
+
+    async def dispatch_messages():
+        await analyzer.setup()
+        for _ in range(200):
+            message = Message(to="spacial-analyzer@xmpp_server", sender=AGGREGATOR)
+            message.set_metadata("performative", "inform")
+            await asyncio.gather(*analyzer.dispatch(message))
+        await asyncio.sleep(0)
+        return {type(behaviour).__name__: behaviour.mailbox_size() for behaviour in analyzer.behaviours}
+
+    mailboxes = asyncio.run(dispatch_messages())
+
+    assert mailboxes.pop("MessageRouterBehaviour") == 200
+    assert len(mailboxes) == 6 and set(mailboxes.values()) == {0}
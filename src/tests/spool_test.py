@@ -0,0 +1,71 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents.spool import Spool, backfill_messages  # noqa: E402
+
+CHANNELS = ('temperature', 'pH', 'activity', 'pulse')
+
+
+def profile(value):
+    return {"temperature": value, "pH": 6.5, "activity": 0.1, "pulse": 70}
+
+
+def test_spool_overflows_oldest_entries_to_disk(tmp_path):
+    spool = Spool(capacity=2, overflow_path=str(tmp_path / "mucka.spool"), overflow_capacity=10)
+    for i in range(5):
+        spool.put("mucka", float(i), profile(38.0 + i))
+
+    assert len(spool) == 5
+    entries, _ = spool.drain()
+
+    assert [entry[1] for entry in entries] == [0.0, 1.0, 2.0, 3.0, 4.0]
+    assert len(spool) == 0
+    assert not os.path.exists(tmp_path / "mucka.spool")
+
+
+def test_spool_drops_entries_without_overflow_file():
+    spool = Spool(capacity=2)
+    for i in range(5):
+        spool.put("mucka", float(i), profile(38.0))
+
+    entries, _ = spool.drain()
+
+    assert [entry[1] for entry in entries] == [3.0, 4.0]
+    assert spool.dropped == 3
+
+
+def test_spool_merges_sequence_ranges():
+    spool = Spool(capacity=10)
+    spool.put("mucka", 1.0, profile(38.0), {"pulse": {"first": 1, "seq": 2, "timestamp": 1.0}})
+    spool.put("mucka", 2.0, profile(38.0), {"pulse": {"first": 3, "seq": 5, "timestamp": 2.0}})
+
+    _, sources = spool.drain()
+
+    assert sources == {"mucka": {"pulse": {"first": 1, "seq": 5, "timestamp": 2.0}}}
+
+
+def test_backfill_messages_are_chunked_and_carry_sources_last():
+    entries = [("mucka", float(i), profile(38.0 + i)) for i in range(5)]
+    sources = {"mucka": {"pulse": {"first": 1, "seq": 5, "timestamp": 4.0}}}
+
+    messages = backfill_messages(entries, sources, CHANNELS, chunk_size=2)
+
+    assert len(messages) == 3
+    assert messages[0]["profiles"]["mucka"][0] == [0.0, 38.0, 6.5, 0.1, 70]
+    assert "sources" not in messages[0]
+    assert messages[-1]["sources"] == sources
+
+
+def test_backfill_messages_carry_window_summaries(tmp_path):
+    summary = {"pulse": {"count": 2, "sum": 150, "min": 70, "max": 80, "last": 80, "var": 25.0}}
+    spool = Spool(capacity=1, overflow_path=str(tmp_path / "spool.jsonl"), overflow_capacity=5)
+    spool.put("mucka", 0.0, profile(38.0) | {"summary": summary})
+    spool.put("mucka", 1.0, profile(38.5))
+    entries, sources = spool.drain()
+
+    [message] = backfill_messages(entries, sources, CHANNELS, chunk_size=10)
+
+    assert message["profiles"]["mucka"][0] == [0.0, 38.0, 6.5, 0.1, 70]
+    assert message["summaries"] == {"mucka": [[0.0, summary]]}
@@ -0,0 +1,60 @@
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow"))
+
+from agents.summary import WindowSummarizer, combine_summaries, reading_summary  # noqa: E402
+
+
+def test_window_summary_matches_batch_statistics():
+    values = [38.1, 38.4, 38.2, 39.0, 38.7]
+    summarizer = WindowSummarizer(window=60, thresholds={})
+    for value in values:
+        summarizer.add("temperature", value)
+
+    summary = summarizer.flush()["temperature"]
+
+    assert summary["count"] == 5
+    assert summary["min"] == 38.1
+    assert summary["max"] == 39.0
+    assert summary["last"] == 38.7
+    assert abs(summary["var"] - statistics.pvariance(values)) < 1e-9
+    assert summarizer.flush() == {}
+
+
+def test_window_summarizer_reports_threshold_crossings_only():
+    summarizer = WindowSummarizer(window=60, thresholds={"temperature": (None, 39.0)})
+
+    assert not summarizer.add("temperature", 38.5)
+    assert summarizer.add("temperature", 39.5)
+    assert not summarizer.add("temperature", 39.6)
+    assert summarizer.add("temperature", 38.9)
+
+
+def test_window_summarizer_is_due_after_window():
+    summarizer = WindowSummarizer(window=10, thresholds={})
+    assert not summarizer.is_due()
+
+    summarizer.add("pulse", 70)
+
+    assert not summarizer.is_due(now=summarizer.started_at + 5)
+    assert summarizer.is_due(now=summarizer.started_at + 10)
+
+
+def test_combine_summaries_keeps_snapshot_format():
+    first = WindowSummarizer(window=60, thresholds={})
+    for value in (60, 70, 80):
+        first.add("pulse", value)
+    second = WindowSummarizer(window=60, thresholds={})
+    second.add("pulse", 90)
+    second.add("pulse", 100)
+    second.add("temperature", 38.5)
+
+    combined = combine_summaries(first.flush(), second.flush())
+
+    assert combined["pulse"]["count"] == 5 and combined["pulse"]["sum"] == 400
+    assert combined["pulse"]["min"] == 60 and combined["pulse"]["max"] == 100
+    assert combined["pulse"]["last"] == 100
+    assert abs(combined["pulse"]["var"] - statistics.pvariance([60, 70, 80, 90, 100])) < 1e-9
+    assert combined["temperature"] == reading_summary(38.5)
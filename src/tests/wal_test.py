@@ -0,0 +1,58 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cow_analysis"))
+
+from agents.wal import WriteAheadLog  # noqa: E402
+
+
+def profile(value):
+    return {"sensors": {"temperature": value, "pulse": 70}}
+
+
+def test_wal_replays_batches_after_restart(tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    wal.append("mucka", 1.0, profile(38.0))
+    wal.append("krasula", 2.0, {"sensors": {"temperature": 38.5}, "summary": {"temperature": {"count": 3}}})
+    wal.write_batch(wal.take_batch())
+    wal.close()
+
+    restarted = WriteAheadLog(str(tmp_path))
+    records = list(restarted.replay())
+
+    assert records == [
+        ("mucka", 1.0, {"temperature": 38.0, "pulse": 70}, None),
+        ("krasula", 2.0, {"temperature": 38.5}, {"temperature": {"count": 3}}),
+    ]
+    assert restarted.pending == []
+
+
+def test_wal_skips_torn_record_at_segment_end(tmp_path):
+    wal = WriteAheadLog(str(tmp_path))
+    wal.append("mucka", 1.0, profile(38.0))
+    wal.append("mucka", 2.0, profile(38.1))
+    wal.write_batch(wal.take_batch())
+    wal.close()
+
+    path = WriteAheadLog(str(tmp_path)).segment_paths()[0]
+    with open(path, "r+b") as f:
+        f.truncate(os.path.getsize(path) - 3)
+
+    assert [record[1] for record in WriteAheadLog(str(tmp_path)).replay()] == [1.0]
+
+
+def test_wal_rolls_segments_and_prunes_expired(tmp_path):
+    wal = WriteAheadLog(str(tmp_path), segment_size=1, retention=18)
+    for timestamp in (0.0, 5.0, 20.0):
+        wal.append("mucka", timestamp, profile(38.0))
+        wal.write_batch(wal.take_batch())
+
+    assert len(wal.segment_paths()) == 2
+    assert [record[1] for record in wal.replay()] == [5.0, 20.0]
+    assert [record[1] for record in wal.replay(since=10.0)] == [20.0]
+    wal.close()
+
+    restarted = WriteAheadLog(str(tmp_path))
+    restarted.append("mucka", 21.0, profile(38.0))
+    restarted.write_batch(restarted.take_batch())
+    assert len(restarted.segment_paths()) == 3